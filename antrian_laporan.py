@@ -0,0 +1,181 @@
+"""
+Antrian latar belakang untuk pembuatan laporan PDF.
+
+Halaman Diagnosa mengirim tugas laporan lalu langsung lanjut; rendering
+(matplotlib + FPDF) dikerjakan oleh pool worker. UI memeriksa status
+secara berkala dan menampilkan tombol unduh setelah tugas selesai.
+
+    antrian = AntrianLaporan(n_worker=2)
+    id_tugas = antrian.kirim("Budi", 24, hasil, "Tinggi")
+    antrian.status(id_tugas)   # 'antri' / 'proses' / 'selesai' / 'gagal' / 'tidak_ada'
+    antrian.ambil(id_tugas)    # bytes PDF setelah selesai
+
+- Tugas dengan isi identik (nama, umur, hasil, risiko, interval,
+  penjelasan) yang masih berjalan atau sudah selesai tidak dikirim ulang:
+  id yang sama dikembalikan.
+- Jumlah tugas yang belum selesai dibatasi maks_antrian; selebihnya
+  ditolak dengan AntrianPenuh (pemanggil bisa membuat PDF langsung).
+- Hasil disimpan paling lama ttl detik dan paling banyak maks_selesai entri.
+- Pool yang rusak (worker mati, mis. kehabisan memori) dibuat ulang saat
+  tugas berikutnya dikirim; tugas yang sedang berjalan berstatus 'gagal'.
+
+mode='proses' (default) memakai proses worker (start method spawn, aman
+untuk proses server yang memiliki banyak thread) sehingga rendering tidak
+berebut GIL dengan thread sesi Streamlit; mode='thread' untuk lingkungan
+yang tidak mengizinkan proses anak. Rentang instrumentasi di worker proses
+(generate_pdf, generate_prob_chart) dikirim balik bersama hasil dan dicatat
+di registri proses induk.
+"""
+
+import collections
+import functools
+import hashlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from instrumentasi import REGISTRI, catat_rentang, hitung, rekam_rentang
+
+REGISTRI.bantuan['carestunt_laporan_total'] = "Tugas laporan PDF per status (dikirim/duplikat/ditolak/selesai/gagal)"
+REGISTRI.bantuan['carestunt_laporan_pool_ulang_total'] = "Jumlah pool worker laporan yang dibuat ulang karena rusak"
+
+# Renderer grafik milik worker (diisi oleh _init_worker)
+_RENDERER = None
+
+
+class AntrianPenuh(RuntimeError):
+    pass
+
+
+def _init_worker(renderer):
+    global _RENDERER
+    import laporan
+    _RENDERER = renderer or laporan.RENDERER_GRAFIK_PDF
+    # Pemanasan: font, backend Agg dan struktur FPDF dimuat sekali per worker
+    hasil = {'Rendah': 100 / 3, 'Sedang': 100 / 3, 'Tinggi': 100 / 3}
+    laporan.generate_pdf("-", 0, hasil, 'Rendah', _RENDERER)
+
+
+def _render(nama, umur, hasil, risiko, ketidakpastian, penjelasan):
+    # Hasil: (bytes PDF, rentang yang dicatat selama rendering)
+    import laporan
+    with rekam_rentang() as rekaman:
+        data = laporan.generate_pdf(nama, umur, hasil, risiko, _RENDERER, ketidakpastian, penjelasan)
+    return data, rekaman
+
+
+def kunci_tugas(nama, umur, hasil, risiko, ketidakpastian=None, penjelasan=None):
+    # Id tugas = hash isi laporan, sehingga permintaan identik mendapat id sama
+    isi = repr((nama, umur, sorted(hasil.items()), risiko,
+                None if ketidakpastian is None else sorted(ketidakpastian['interval'].items()),
+                None if penjelasan is None else sorted(penjelasan['log_rasio'].items())))
+    return hashlib.sha1(isi.encode('utf-8')).hexdigest()[:16]
+
+
+class AntrianLaporan:
+    def __init__(self, n_worker=2, maks_antrian=32, mode='proses', renderer=None,
+                 maks_selesai=256, ttl=900):
+        self.maks_antrian = maks_antrian
+        self.maks_selesai = maks_selesai
+        self.ttl = ttl
+        self.mode = mode
+        if mode == 'proses':
+            self._buat_pool = functools.partial(
+                ProcessPoolExecutor, max_workers=n_worker, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(renderer,),
+            )
+        elif mode == 'thread':
+            self._buat_pool = functools.partial(
+                ThreadPoolExecutor, max_workers=n_worker, thread_name_prefix='laporan',
+                initializer=_init_worker, initargs=(renderer,),
+            )
+        else:
+            raise ValueError(f"mode antrian laporan tidak dikenal: {mode!r} (pilih 'proses' atau 'thread')")
+        self._pool = self._buat_pool()
+
+        self._kunci = threading.Lock()
+        self._berjalan = {}                          # id -> (future, waktu kirim)
+        self._selesai = collections.OrderedDict()   # id -> (waktu selesai, data, galat)
+
+    # PENGIRIMAN
+    def kirim(self, nama, umur, hasil, risiko, ketidakpastian=None, penjelasan=None):
+        id_tugas = kunci_tugas(nama, umur, hasil, risiko, ketidakpastian, penjelasan)
+        with self._kunci:
+            self._bersihkan()
+            selesai = self._selesai.get(id_tugas)
+            if id_tugas in self._berjalan or (selesai is not None and selesai[2] is None):
+                hitung('carestunt_laporan_total', status='duplikat')
+                return id_tugas
+            if len(self._berjalan) >= self.maks_antrian:
+                hitung('carestunt_laporan_total', status='ditolak')
+                raise AntrianPenuh(f"antrian laporan penuh ({self.maks_antrian} tugas)")
+
+            self._selesai.pop(id_tugas, None)  # tugas gagal sebelumnya dicoba lagi
+            tugas = (_render, nama, umur, dict(hasil), risiko, ketidakpastian, penjelasan)
+            try:
+                future = self._pool.submit(*tugas)
+            except BrokenExecutor:
+                # Worker mati: pool lama tidak bisa dipakai lagi, buat ulang sekali
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._buat_pool()
+                hitung('carestunt_laporan_pool_ulang_total')
+                future = self._pool.submit(*tugas)
+            self._berjalan[id_tugas] = (future, time.perf_counter())
+            hitung('carestunt_laporan_total', status='dikirim')
+        # Dipasang di luar kunci: callback langsung jalan jika future sudah selesai
+        future.add_done_callback(functools.partial(self._tugas_selesai, id_tugas))
+        return id_tugas
+
+    def _tugas_selesai(self, id_tugas, future):
+        galat = None if future.cancelled() else future.exception()
+        data = rekaman = None
+        if not future.cancelled() and galat is None:
+            data, rekaman = future.result()
+        with self._kunci:
+            _, dikirim = self._berjalan.pop(id_tugas, (None, time.perf_counter()))
+            self._selesai[id_tugas] = (time.monotonic(), data, None if data is not None else repr(galat))
+            self._selesai.move_to_end(id_tugas)
+        if rekaman and self.mode == 'proses':
+            catat_rentang(rekaman)  # mode thread: sudah tercatat di registri yang sama
+        # Waktu dari kirim sampai PDF siap (termasuk menunggu di antrian)
+        REGISTRI.catat('carestunt_rentang_ms', (time.perf_counter() - dikirim) * 1000, rentang='laporan_antrian')
+        hitung('carestunt_laporan_total', status='selesai' if data is not None else 'gagal')
+
+    def _bersihkan(self):
+        # Dipanggil dengan kunci dipegang
+        batas = time.monotonic() - self.ttl
+        while self._selesai:
+            id_tugas, (waktu, _, _) = next(iter(self._selesai.items()))
+            if waktu >= batas and len(self._selesai) <= self.maks_selesai:
+                break
+            self._selesai.popitem(last=False)
+
+    # PEMBACAAN
+    def status(self, id_tugas):
+        with self._kunci:
+            selesai = self._selesai.get(id_tugas)
+            if selesai is not None:
+                return 'selesai' if selesai[2] is None else 'gagal'
+            berjalan = self._berjalan.get(id_tugas)
+        if berjalan is None:
+            return 'tidak_ada'
+        return 'proses' if berjalan[0].running() else 'antri'
+
+    def ambil(self, id_tugas):
+        # Bytes PDF, atau None jika belum selesai / gagal / sudah dibuang
+        with self._kunci:
+            selesai = self._selesai.get(id_tugas)
+        return None if selesai is None else selesai[1]
+
+    def galat(self, id_tugas):
+        with self._kunci:
+            selesai = self._selesai.get(id_tugas)
+        return None if selesai is None else selesai[2]
+
+    def jumlah_berjalan(self):
+        with self._kunci:
+            return len(self._berjalan)
+
+    def tutup(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,12 @@
 import streamlit as st  # type: ignore
-import pandas as pd  # type: ignore
-from fpdf import FPDF  # type: ignore
-import matplotlib.pyplot as plt # type: ignore
-import tempfile  # type: ignore
-from model_stunting import BayesianNetworkStunting
+import io
+import os
 
-# LOAD CSS FILE
-def load_css(path):
-    with open(path, "r") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-load_css("CSS/stale.css")
+from instrumentasi import diukur, ekspor_file, hitung, profil, rentang
+
+# Modul berat (fpdf, matplotlib) tidak diimpor di sini: Streamlit
+# menjalankan ulang skrip ini setiap interaksi, jadi modul tersebut baru
+# dimuat di halaman Diagnosa saat grafik atau laporan dibutuhkan.
 
 # KONFIGURASI HALAMAN
 st.set_page_config(
@@ -19,187 +16,222 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# FUNGSI SARAN TINDAKAN
-def get_saran(risiko):
-    if risiko == "Tinggi":
-        return [
-            "Konsultasi ke tenaga kesehatan atau puskesmas terdekat untuk pemeriksaan lanjutan.",
-            "Lakukan penimbangan berat badan dan pengukuran tinggi badan setiap bulan.",
-            "Perbaiki asupan gizi harian dengan menambahkan sumber protein (telur, ikan, daging), zat besi, dan zinc.",
-            "Pastikan balita mendapatkan ASI atau susu sesuai usia dan kebutuhan gizi.",
-            "Jaga kebersihan lingkungan, air minum, dan sanitasi untuk mencegah infeksi berulang.",
-            "Ikuti kegiatan posyandu secara rutin untuk pemantauan tumbuh kembang."
-        ]
-
-    elif risiko == "Sedang":
-        return [
-            "Tingkatkan kualitas pola makan dengan menu bergizi seimbang setiap hari.",
-            "Pastikan jadwal imunisasi balita lengkap dan tepat waktu.",
-            "Pantau berat dan tinggi badan minimal setiap 2 - 3 bulan.",
-            "Kurangi risiko infeksi dengan menjaga kebersihan diri dan lingkungan rumah.",
-            "Berikan makanan tambahan jika diperlukan sesuai anjuran tenaga kesehatan."
-        ]
-
-    else:  # Rendah
-        return [
-            "Pertahankan pola makan sehat dan bergizi seimbang sesuai usia balita.",
-            "Lanjutkan pemantauan pertumbuhan secara rutin di posyandu atau fasilitas kesehatan.",
-            "Pastikan kebersihan lingkungan tetap terjaga.",
-            "Tetap berikan stimulasi dan perhatian terhadap tumbuh kembang balita."
-        ]
-
-def interpretasi_model(hasil, risiko):
-    confidence_percent = round(hasil[risiko], 2)
-
-    # Urutkan probabilitas
-    sorted_risk = sorted(hasil.items(), key=lambda x: x[1], reverse=True)
-    second_risk, second_val = sorted_risk[1]
-    gap = (hasil[risiko] - second_val) * 100
+# LOAD CSS FILE (dibaca dari disk sekali, rerun memakai cache)
+@st.cache_data(show_spinner=False)
+def baca_css(path):
+    with open(path, "r") as f:
+        return f.read()
 
-    if gap >= 20:
-        tingkat = "sangat kuat"
-    elif gap >= 10:
-        tingkat = "cukup kuat"
-    else:
-        tingkat = "perlu perhatian karena selisih antar risiko relatif kecil"
+def load_css(path):
+    with rentang("css"):
+        st.markdown(f"<style>{baca_css(path)}</style>", unsafe_allow_html=True)
+load_css("CSS/stale.css")
 
-    return (
-        f"Model Bayesian Network menunjukkan bahwa risiko stunting berada pada kategori "
-        f"{risiko} dengan tingkat keyakinan {confidence_percent:.2f}%. "
-        f"Hasil ini {tingkat} dibandingkan kategori risiko lainnya "
-        f"berdasarkan distribusi probabilitas pada grafik."
+# MODEL BERSAMA
+# Satu instance per proses untuk semua sesi. Tabel posterior hanya dibaca
+# setelah konstruksi, jadi aman dipakai bersamaan oleh thread sesi Streamlit.
+# CPT dari file (CARESTUNT_CPT=cpt/cpt_stunting.json atau .npy) dipantau dan
+# dimuat ulang otomatis tanpa restart. Lewat peluncur.py, model sudah
+# dibangun di proses induk sebelum fork (dibagi copy-on-write antar worker).
+@st.cache_resource(show_spinner=False)
+def muat_model():
+    from model_stunting import BayesianNetworkStunting
+    from peluncur import model_pra_muat
+
+    path_cpt = os.environ.get("CARESTUNT_CPT")
+    model = model_pra_muat()
+    if not path_cpt:
+        return model or BayesianNetworkStunting()
+
+    from penyimpanan_cpt import muat, PengawasCPT
+    if model is None:
+        model = BayesianNetworkStunting(cpt=muat(path_cpt))
+    PengawasCPT(path_cpt, model).start()  # thread pengawas per worker (thread tidak ikut fork)
+    return model
+muat_model()  # warm-up saat start, bukan saat klik pertama
+
+# RIWAYAT DIAGNOSA (SQLite, ditulis oleh thread latar belakang)
+@st.cache_resource(show_spinner=False)
+def muat_riwayat():
+    from riwayat_diagnosa import PenyimpanRiwayat
+    return PenyimpanRiwayat(os.environ.get("CARESTUNT_RIWAYAT_DB", "riwayat_diagnosa.db"))
+
+# PELACAKAN PER BALITA (risiko terhaluskan antar kunjungan, per ID anak)
+@st.cache_resource(show_spinner=False)
+def muat_pelacak():
+    from pelacakan_anak import PelacakAnak
+    return PelacakAnak(os.environ.get("CARESTUNT_PELACAKAN_DB", "pelacakan_anak.db"), model=muat_model())
+
+# ANTRIAN LAPORAN PDF (dirender worker latar belakang, bukan thread sesi)
+@st.cache_resource(show_spinner=False)
+def muat_antrian_laporan():
+    from antrian_laporan import AntrianLaporan
+    return AntrianLaporan(
+        n_worker=int(os.environ.get("CARESTUNT_LAPORAN_WORKER", "2")),
+        mode=os.environ.get("CARESTUNT_LAPORAN_MODE", "proses"),
     )
 
-# FUNGSI GRAFIK PROBABILITAS
-def generate_prob_chart(hasil):
-    labels = list(hasil.keys())
-    values = list(hasil.values())
-
-    fig, ax = plt.subplots(figsize=(6, 4))
-    bars = ax.bar(labels, values, color=["#22c55e", "#facc15", "#ef4444"])
-
-    ax.set_ylim(0, 100)
-    ax.set_ylabel("Persentase (%)")
-    ax.set_title("Distribusi Probabilitas Risiko Stunting")
-
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            height + 1,
-            f"{height:.2f}%",
-            ha="center",
-            fontsize=9
-        )
-
-    plt.tight_layout()
-
-    tmpfile = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    plt.savefig(tmpfile.name, dpi=150)
-    plt.close()
-
-    return tmpfile.name
-
-
-# FUNGSI PDF 
-def generate_pdf(nama, umur, hasil, risiko):
-    pdf = FPDF()
-    pdf.add_page()
-
-    # HEADER
-    pdf.set_fill_color(30, 64, 175)
-    pdf.rect(0, 0, 210, 40, 'F')
-
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 20, "LAPORAN HASIL ANALISIS CARESTUNT", ln=True, align="C")
-    pdf.ln(10)
-
-    # IDENTITAS
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "IDENTITAS BALITA", ln=True)
-
-    pdf.set_font("Arial", "", 11)
-    pdf.cell(40, 8, "Nama Balita", border=1)
-    pdf.cell(0, 8, f" : {nama}", border=1, ln=True)
-
-    pdf.cell(40, 8, "Umur", border=1)
-    pdf.cell(0, 8, f" : {umur} Bulan", border=1, ln=True)
-
-    # HASIL RISIKO
-    pdf.ln(5)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "HASIL ANALISIS RISIKO", ln=True)
-
-    if risiko == "Tinggi":
-        pdf.set_text_color(239, 68, 68)
-    elif risiko == "Sedang":
-        pdf.set_text_color(217, 119, 6)
-    else:
-        pdf.set_text_color(22, 163, 74)
-
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, risiko.upper(), ln=True)
-    pdf.set_text_color(0, 0, 0)
+# KUBUS AGREGAT DASBOR (diperbarui inkremental dari riwayat)
+PATH_KUBUS = os.environ.get("CARESTUNT_KUBUS", "kubus_kohort.npz")
+
+@st.cache_resource(show_spinner=False)
+def muat_kubus():
+    from kubus_kohort import KubusKohort
+    return KubusKohort.muat(PATH_KUBUS)
+
+# Pilihan "Tidak Diketahui" = evidence kosong, dimarginalkan oleh model
+TIDAK_DIKETAHUI = "Tidak Diketahui"
+
+def kodekan_input(umur, pola, sakit, sanitasi):
+    # Input form -> EvidenceBalita (kode integer), sekali per diagnosa.
+    # Label yang tidak dikenal -> ValueError.
+    from model_stunting import EvidenceBalita
+    return EvidenceBalita.dari_label(
+        umur, pola,
+        None if sakit == TIDAK_DIKETAHUI else sakit,
+        None if sanitasi == TIDAK_DIKETAHUI else sanitasi,
+    )
 
-    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-    pdf.ln(5)
+@diukur("inferensi")
+def hitung_posterior(ev):
+    # Posterior + kontribusi tiap faktor (mode penjelasan), satu lookup ke model
+    hasil, _, penjelasan = muat_model().inferensi_jelaskan(ev)
+    return hasil, penjelasan
 
-    # GRAFIK (MATPLOTLIB)
-    chart_path = generate_prob_chart(hasil)
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 8, "Visualisasi Distribusi Probabilitas:", ln=True)
-    pdf.image(chart_path, x=20, w=170)
-    pdf.ln(5)
+# SIMULASI INTERVENSI (what-if)
+NAMA_FAKTOR = {"pola_makan": "Pola makan", "riwayat_penyakit": "Riwayat infeksi", "lingkungan": "Sanitasi"}
 
-    # DETAIL PROBABILITAS
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 8, "Detail Nilai Probabilitas:", ln=True)
+@diukur("intervensi")
+def simulasi_intervensi(ev, n=5):
+    # Perubahan 1-2 faktor yang paling menurunkan risiko Tinggi (dihitung
+    # sekaligus dan di-cache oleh model)
+    hasil = muat_model().analisis_intervensi(ev, hanya_perbaikan=True)
+    return [h for h in hasil if h["delta"] < 0][:n]
 
-    pdf.set_font("Arial", "", 10)
-    for k, v in hasil.items():
-        pdf.cell(0, 6, f"- {k}: {v:.2f}%", ln=True)
+@diukur("interval_kredibel")
+def hitung_interval(ev):
+    # Interval kredibel per level (sampel CPT Dirichlet, di-cache per evidence di model)
+    return muat_model().interval_kredibel(ev)
 
-    # INTERPRETASI MODEL
-    pdf.ln(6)
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 8, "Interpretasi Model Bayesian Network:", ln=True)
+def interpretasi_model(hasil, risiko, ketidakpastian=None):
+    confidence_percent = round(hasil[risiko], 2)
 
-    confidence = hasil[risiko]
+    # Urutkan probabilitas
     sorted_risk = sorted(hasil.items(), key=lambda x: x[1], reverse=True)
     second_risk, second_val = sorted_risk[1]
-    gap = confidence - second_val
+    gap = (hasil[risiko] - second_val) * 100
 
-    if gap >= 20:
-        kekuatan = "sangat kuat"
-    elif gap >= 10:
-        kekuatan = "cukup kuat"
+    if ketidakpastian:
+        # Seberapa sering kategori ini tetap teratas saat CPT disampel
+        stabil = ketidakpastian["peluang_teratas"][risiko]
+        if stabil >= 0.95:
+            tingkat = "sangat kuat"
+        elif stabil >= 0.8:
+            tingkat = "cukup kuat"
+        else:
+            tingkat = "perlu perhatian karena kategori risiko teratas belum stabil"
+        bawah, atas = ketidakpastian["interval"][risiko]
+        dasar = (
+            f"karena kategori ini tetap tertinggi pada {stabil:.0%} sampel CPT "
+            f"(interval kredibel {ketidakpastian['tingkat']:.0%}: {bawah:.1f}%–{atas:.1f}%)."
+        )
     else:
-        kekuatan = "relatif lemah dan perlu perhatian"
-
-    interpretasi = (
-        f"Berdasarkan hasil inferensi menggunakan metode Bayesian Network, "
-        f"balita berada pada kategori risiko stunting {risiko} "
-        f"dengan tingkat keyakinan sebesar {confidence:.2f}%. "
-        f"Hasil ini dinilai {kekuatan} dibandingkan kategori risiko lainnya "
-        f"berdasarkan selisih nilai probabilitas."
-    )
+        if gap >= 20:
+            tingkat = "sangat kuat"
+        elif gap >= 10:
+            tingkat = "cukup kuat"
+        else:
+            tingkat = "perlu perhatian karena selisih antar risiko relatif kecil"
+        dasar = "berdasarkan distribusi probabilitas pada grafik."
 
-    pdf.set_font("Arial", "", 10)
-    pdf.multi_cell(0, 7, interpretasi)
+    return (
+        f"Model Bayesian Network menunjukkan bahwa risiko stunting berada pada kategori "
+        f"{risiko} dengan tingkat keyakinan {confidence_percent:.2f}%. "
+        f"Hasil ini {tingkat} dibandingkan kategori risiko lainnya "
+        f"{dasar}"
+    )
 
-    # REKOMENDASI
-    pdf.ln(6)
-    pdf.set_fill_color(240, 240, 240)
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 8, "REKOMENDASI TINDAKAN", ln=True, fill=True)
+# CACHE GRAFIK & LAPORAN
+# Kunci cache = input diagnosa (+ generasi CPT agar hasil lama tidak dipakai
+# setelah CPT dimuat ulang), entri terlama dibuang jika melebihi max_entries
+@st.cache_data(max_entries=128, show_spinner=False)
+def grafik_diagnosa_png(ev, generasi_cpt=0):
+    from laporan import muat_pyplot
+    plt = muat_pyplot()
+
+    hasil, _ = hitung_posterior(ev)
+
+    with rentang("grafik_matplotlib"):
+        labels = list(hasil.keys())
+        values = list(hasil.values())
+
+        fig, ax = plt.subplots(figsize=(12, 8))
+        bars = ax.bar(labels, values, color=["#22c55e", "#facc15", "#ef4444"])
+
+        ax.set_ylim(0, 100)
+        ax.set_ylabel("Persentase (%)")
+        ax.set_title("Distribusi Probabilitas Risiko Stunting")
+
+        # Tampilkan nilai persen di atas bar
+        for bar, val in zip(bars, values):
+            ax.text(
+                bar.get_x() + bar.get_width() / 2,
+                val + 1,
+                f"{val:.1f}%",
+                ha="center",
+                va="bottom",
+                fontsize=10,
+                fontweight="bold"
+            )
 
-    pdf.set_font("Arial", "", 10)
-    for s in get_saran(risiko):
-        pdf.multi_cell(0, 7, f"- {s}")
+        # Styling agar rapi
+        ax.spines["top"].set_visible(False)
+        ax.spines["right"].set_visible(False)
+        ax.grid(axis="y", alpha=0.3)
+
+        # Setara dengan st.pyplot (bbox_inches="tight", dpi=200)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+        plt.close(fig)
+        return buf.getvalue()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def laporan_pdf(ev, nama, generasi_cpt=0):
+    from laporan import generate_pdf
+
+    hasil, penjelasan = hitung_posterior(ev)
+    risiko = max(hasil, key=hasil.get)
+    return generate_pdf(nama, ev.umur_bulan, hasil, risiko, ketidakpastian=hitung_interval(ev),
+                        penjelasan=penjelasan)
+
+# Selama tugas laporan masih antri / diproses, status diperiksa tiap detik
+# oleh fragment (tanpa menjalankan ulang halaman). Setelah itu app dijalankan
+# ulang sekali sehingga timer fragment berhenti dan tombol unduh dirender di
+# luar fragment; data PDF baru dikirim ke browser saat tombol diklik
+@st.fragment(run_every=1.0)
+def tunggu_laporan(id_tugas):
+    if muat_antrian_laporan().status(id_tugas) in ("antri", "proses"):
+        st.download_button("⏳ Menyiapkan Laporan PDF...", data=b"", disabled=True)
+        return
+    st.rerun()
 
-    return pdf.output(dest="S").encode("latin-1")
+def unduh_laporan(id_tugas, nama, cadangan):
+    antrian = muat_antrian_laporan()
+    status = antrian.status(id_tugas) if id_tugas else "tidak_ada"
+    if status in ("antri", "proses"):
+        tunggu_laporan(id_tugas)
+        return
+    if status == "gagal":
+        st.caption("⚠️ Laporan latar belakang gagal dibuat; PDF dibuat langsung saat diunduh.")
+    # Selesai, atau gagal / ditolak: PDF dibuat langsung saat diklik
+    st.download_button(
+        "📄 Unduh Laporan PDF",
+        data=lambda: antrian.ambil(id_tugas) or cadangan(),
+        file_name=f"Laporan_CareStunt_{nama}.pdf",
+        mime="application/pdf",
+        on_click="ignore"
+    )
 
 # NAVIGATION STATE
 if "page" not in st.session_state:
@@ -219,8 +251,8 @@ with st.sidebar:
 
     menu = st.radio(
         "Menu",
-        ["Beranda", "Diagnosa", "Edukasi", "Tentang"],
-        index=["Beranda", "Diagnosa", "Edukasi", "Tentang"].index(st.session_state.page)
+        ["Beranda", "Diagnosa", "Riwayat", "Dasbor", "Edukasi", "Tentang"],
+        index=["Beranda", "Diagnosa", "Riwayat", "Dasbor", "Edukasi", "Tentang"].index(st.session_state.page)
     )
 
     if menu != st.session_state.page:
@@ -295,195 +327,413 @@ elif st.session_state.page == "Diagnosa":
 
     with col1:
         nama = st.text_input("Nama Balita", placeholder="Contoh: Budi")
+        id_anak = st.text_input("ID Anak (opsional)", placeholder="No. KIA / NIK, untuk pelacakan kunjungan")
         umur = st.number_input("Umur (Bulan)", 0, 60, 24)
         pola = st.selectbox("Pola Makan", ["Baik", "Cukup", "Kurang"])
 
     with col2:
-        sakit = st.selectbox("Riwayat Infeksi", ["Tidak Ada", "Jarang", "Sering"])
-        sanitasi = st.selectbox("Sanitasi Lingkungan", ["Baik", "Cukup", "Kurang"])
+        sakit = st.selectbox("Riwayat Infeksi", ["Tidak Ada", "Jarang", "Sering", TIDAK_DIKETAHUI])
+        sanitasi = st.selectbox("Sanitasi Lingkungan", ["Baik", "Cukup", "Kurang", TIDAK_DIKETAHUI])
 
     st.markdown("<br>", unsafe_allow_html=True)
     btn = st.button("Hitung Risiko Stunting")
 
-    # PROSES DIAGNOSA
+    # Hasil tetap tampil saat app dijalankan ulang (mis. setelah laporan PDF
+    # selesai) selama input tidak berubah; pencatatan hanya saat tombol diklik
+    masukan = (nama, id_anak, umur, pola, sakit, sanitasi)
     if btn:
+        st.session_state.diagnosa_tampil = masukan
+    tampil = btn or st.session_state.get("diagnosa_tampil") == masukan
+
+    # PROSES DIAGNOSA
+    if tampil:
+        # Input dikodekan & divalidasi sekali di sini; hilir memakai kode integer
+        try:
+            ev, galat_input = kodekan_input(umur, pola, sakit, sanitasi), None
+        except ValueError as e:
+            ev, galat_input = None, str(e)
+
         if not nama:
             st.error("Nama balita wajib diisi.")
+        elif ev is None:
+            st.error(f"Input tidak valid: {galat_input}")
         else:
-            with st.spinner("Sedang menganalisis data..."):
+            with profil("diagnosa"), rentang("diagnosa"):
+                with st.spinner("Sedang menganalisis data..."):
                 
-                model = BayesianNetworkStunting()
-                hasil, _ = model.inferensi(umur, pola, sakit, sanitasi)
-
-                # RISIKO & CONFIDENCE
-                risiko = max(hasil, key=hasil.get)
-                confidence = hasil[risiko]
-                confidence_percent = round(confidence, 2)
-
-            # WARNA RISIKO
-            color_map = {
-                "Rendah": "#22c55e",
-                "Sedang": "#facc15",
-                "Tinggi": "#ef4444"
-            }
-            res_color = color_map[risiko]
-
-            # GRAFIK PROBABILITAS
-            labels = list(hasil.keys())
-            values = list(hasil.values())
-
-            colors = [color_map[l] for l in labels]
-
-            fig, ax = plt.subplots(figsize=(12, 8))
-            bars = ax.bar(labels, values, color=colors)
-
-            ax.set_ylim(0, 100)
-            ax.set_ylabel("Persentase (%)")
-            ax.set_title("Distribusi Probabilitas Risiko Stunting")
-
-            # Tampilkan nilai persen di atas bar
-            for bar, val in zip(bars, values):
-                ax.text(
-                    bar.get_x() + bar.get_width() / 2,
-                    val + 1,
-                    f"{val:.1f}%",
-                    ha="center",
-                    va="bottom",
-                    fontsize=10,
-                    fontweight="bold"
-                )
+                    model = muat_model()
+                    hasil, penjelasan = hitung_posterior(ev)
+                    label = ev.label()
+
+                    # RISIKO & CONFIDENCE
+                    risiko = max(hasil, key=hasil.get)
+                    if btn:
+                        hitung("carestunt_diagnosa_total", risiko=risiko)
+                        muat_riwayat().catat(
+                            nama, ev.umur_bulan, label["pola_makan"], label["riwayat_penyakit"],
+                            label["lingkungan"], hasil, risiko, model.cpt.versi,
+                        )
+                        # Kunjungan dilacak per ID anak; diagnosa ulang pada umur
+                        # yang sama menggantikan kunjungan itu
+                        if id_anak.strip():
+                            muat_pelacak().tambah_kunjungan(
+                                id_anak.strip(), ev.umur_bulan, label["pola_makan"],
+                                label["riwayat_penyakit"], label["lingkungan"], hasil=hasil,
+                            )
+                    confidence = hasil[risiko]
+                    confidence_percent = round(confidence, 2)
+                    ketidakpastian = hitung_interval(ev)
+                    ci_bawah, ci_atas = ketidakpastian["interval"][risiko]
+
+                # WARNA RISIKO
+                color_map = {
+                    "Rendah": "#22c55e",
+                    "Sedang": "#facc15",
+                    "Tinggi": "#ef4444"
+                }
+                res_color = color_map[risiko]
+
+                # GRAFIK PROBABILITAS
+                with rentang("grafik_streamlit"):
+                    st.image(grafik_diagnosa_png(ev, model.generasi_cpt), width="stretch")
 
-            # Styling agar rapi
-            ax.spines["top"].set_visible(False)
-            ax.spines["right"].set_visible(False)
-            ax.grid(axis="y", alpha=0.3)
-
-            st.pyplot(fig)
-
-            # CONFIDENCE CIRCLE
-            confidence_value = confidence_percent
-            circle_color = res_color
-            st.markdown(f"""
-            <div style="
-                margin:30px auto;
-                padding:30px;
-                border-radius:18px;
-                background: radial-gradient(circle at top, #020617, #020617);
-                box-shadow: 0 20px 50px rgba(0,0,0,0.45);
-                text-align:center;
-                max-width:420px;
-            ">
-                <p style="margin:0; font-size:14px; opacity:0.7; color:white;">
-                    Tingkat Keyakinan Sistem
-                </p>
+                # CONFIDENCE CIRCLE
+                confidence_value = confidence_percent
+                circle_color = res_color
+                st.markdown(f"""
                 <div style="
-                    position: relative;
-                    width:160px;
-                    height:160px;
-                    margin:20px auto;
-                    border-radius:50%;
-                    background: conic-gradient(
-                        {circle_color} {confidence_value}%,
-                        rgba(255,255,255,0.12) 0%
-                    );
-                    display:flex;
-                    align-items:center;
-                    justify-content:center;
+                    margin:30px auto;
+                    padding:30px;
+                    border-radius:18px;
+                    background: radial-gradient(circle at top, #020617, #020617);
+                    box-shadow: 0 20px 50px rgba(0,0,0,0.45);
+                    text-align:center;
+                    max-width:420px;
                 ">
+                    <p style="margin:0; font-size:14px; opacity:0.7; color:white;">
+                        Tingkat Keyakinan Sistem
+                    </p>
                     <div style="
-                        width:120px;
-                        height:120px;
-                        background:#020617;
+                        position: relative;
+                        width:160px;
+                        height:160px;
+                        margin:20px auto;
                         border-radius:50%;
+                        background: conic-gradient(
+                            {circle_color} {confidence_value}%,
+                            rgba(255,255,255,0.12) 0%
+                        );
                         display:flex;
                         align-items:center;
                         justify-content:center;
-                        flex-direction:column;
                     ">
-                        <span style="
-                            font-size:32px;
-                            font-weight:800;
-                            color:{circle_color};
+                        <div style="
+                            width:120px;
+                            height:120px;
+                            background:#020617;
+                            border-radius:50%;
+                            display:flex;
+                            align-items:center;
+                            justify-content:center;
+                            flex-direction:column;
                         ">
-                            {confidence_value:.2f}%
-                        </span>
-                        <span style="font-size:12px; opacity:0.6; color:white;">
-                            Confidence
-                        </span>
+                            <span style="
+                                font-size:32px;
+                                font-weight:800;
+                                color:{circle_color};
+                            ">
+                                {confidence_value:.2f}%
+                            </span>
+                            <span style="font-size:12px; opacity:0.6; color:white;">
+                                Confidence
+                            </span>
+                        </div>
                     </div>
+                    <p style="margin:0 0 6px 0; font-size:14px; opacity:0.85; color:white;">
+                        Interval kredibel {ketidakpastian["tingkat"]:.0%}: {ci_bawah:.1f}% – {ci_atas:.1f}%
+                    </p>
+                    <p style="margin:0; font-size:13px; opacity:0.6; color:white;">
+                        Berdasarkan inferensi Bayesian Network
+                    </p>
                 </div>
-                <p style="margin:0; font-size:13px; opacity:0.6; color:white;">
-                    Berdasarkan inferensi Bayesian Network
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # INTERPRETASI OTOMATIS
-            interpretasi = interpretasi_model(hasil, risiko)
-
-            st.markdown(f"""
-            <div style="
-                margin-top:18px;
-                padding:20px;
-                border-radius:14px;
-                background: rgba(15,23,42,0.85);
-                border-left: 5px solid {res_color};
-            ">
-                <h4 style="margin-top:0; color:white;">Kesimpulan Analisis Model</h4>
-                <p style="margin-bottom:0; font-size:15px; line-height:1.6; color:white;">
-                    {interpretasi}
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # HASIL RISIKO
-            st.markdown("## Rekomendasi Tindakan")
-            for i, s in enumerate(get_saran(risiko), start=1):
-                st.markdown(f"**{i}.** {s}")
-
-            st.markdown("""
-                <style>
-                /* DOWNLOAD BUTTON*/
-                div[data-testid="stDownloadButton"] > button {
-                    width: auto !important;
-                    display: inline-flex !important;
-                    justify-content: center;
-                    align-items: center;
-                }
+                """, unsafe_allow_html=True)
 
-                /* Text tetap putih */
-                div[data-testid="stDownloadButton"] > button span {
-                    color: #ffffff !important;
-                }
-                        
-                /* HOVER */
-                div[data-testid="stDownloadButton"] > button:hover {
-                    background: linear-gradient(135deg, #22c55e, #16a34a) !important;
-                    box-shadow: 0 12px 30px rgba(34,197,94,0.35);
-                }
+                # INTERPRETASI OTOMATIS
+                interpretasi = interpretasi_model(hasil, risiko, ketidakpastian)
 
-                /* ACTIVE / CLICK */
-                div[data-testid="stDownloadButton"] > button:active,
-                div[data-testid="stDownloadButton"] > button:focus {
-                    background: linear-gradient(135deg, #22c55e, #16a34a) !important;
-                    color: #ffffff !important;
-                    box-shadow: none !important;
-                    outline: none !important;
-                }
-                </>
+                st.markdown(f"""
+                <div style="
+                    margin-top:18px;
+                    padding:20px;
+                    border-radius:14px;
+                    background: rgba(15,23,42,0.85);
+                    border-left: 5px solid {res_color};
+                ">
+                    <h4 style="margin-top:0; color:white;">Kesimpulan Analisis Model</h4>
+                    <p style="margin-bottom:0; font-size:15px; line-height:1.6; color:white;">
+                        {interpretasi}
+                    </p>
+                </div>
                 """, unsafe_allow_html=True)
 
+                # KONTRIBUSI FAKTOR (mode penjelasan)
+                from laporan import NAMA_FAKTOR_PENJELASAN, rincian_kontribusi
+                baris_kontribusi = "".join(
+                    f"<li style='margin-bottom:6px;'><b>{nama_faktor}</b>: {teks}</li>"
+                    for _, nama_faktor, _, teks in rincian_kontribusi(penjelasan)
+                )
+                st.markdown(f"""
+                <div style="
+                    margin-top:18px;
+                    padding:20px;
+                    border-radius:14px;
+                    background: rgba(15,23,42,0.85);
+                    border-left: 5px solid {res_color};
+                ">
+                    <h4 style="margin-top:0; color:white;">Mengapa Risiko {risiko}?</h4>
+                    <p style="font-size:14px; opacity:0.8; color:white;">
+                        Kontribusi tiap faktor terhadap perbandingan {risiko} dengan
+                        {penjelasan["pembanding"]}, dari yang paling berpengaruh:
+                    </p>
+                    <ul style="margin-bottom:0; font-size:15px; line-height:1.6; color:white;">
+                        {baris_kontribusi}
+                    </ul>
+                </div>
+                """, unsafe_allow_html=True)
+                with st.expander("Rincian log-likelihood per kategori risiko"):
+                    st.dataframe(
+                        [{"Faktor": NAMA_FAKTOR_PENJELASAN[f], **{k: round(v, 3) for k, v in suku.items()}}
+                         for f, suku in penjelasan["kontribusi"].items()],
+                        hide_index=True, width="stretch",
+                    )
+                    st.caption("Log natural tiap suku jaringan; -inf = kategori mustahil menurut faktor itu. "
+                               "Jumlah per kolom = log skor sebelum normalisasi.")
+
+                # SIMULASI INTERVENSI
+                intervensi = simulasi_intervensi(ev)
+                if intervensi:
+                    baris_intervensi = "".join(
+                        "<li style='margin-bottom:6px;'>"
+                        + ", ".join(
+                            f"{NAMA_FAKTOR[f]}: {lama or TIDAK_DIKETAHUI} &rarr; <b>{baru}</b>"
+                            for f, (lama, baru) in h["perubahan"].items()
+                        )
+                        + f" &nbsp;<span style='color:#22c55e;'>({h['delta']:+.1f} poin)</span></li>"
+                        for h in intervensi
+                    )
+                    st.markdown(f"""
+                    <div style="
+                        margin-top:18px;
+                        padding:20px;
+                        border-radius:14px;
+                        background: rgba(15,23,42,0.85);
+                        border-left: 5px solid #22c55e;
+                    ">
+                        <h4 style="margin-top:0; color:white;">Simulasi Perbaikan Faktor</h4>
+                        <p style="font-size:14px; opacity:0.8; color:white;">
+                            Perubahan yang paling menurunkan peluang risiko Tinggi
+                            (saat ini {hasil["Tinggi"]:.1f}%):
+                        </p>
+                        <ol style="margin-bottom:0; font-size:15px; line-height:1.6; color:white;">
+                            {baris_intervensi}
+                        </ol>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                # HASIL RISIKO
+                st.markdown("## Rekomendasi Tindakan")
+                from laporan import get_saran
+                for i, s in enumerate(get_saran(risiko), start=1):
+                    st.markdown(f"**{i}.** {s}")
+
+                st.markdown("""
+                    <style>
+                    /* DOWNLOAD BUTTON*/
+                    div[data-testid="stDownloadButton"] > button {
+                        width: auto !important;
+                        display: inline-flex !important;
+                        justify-content: center;
+                        align-items: center;
+                    }
+
+                    /* Text tetap putih */
+                    div[data-testid="stDownloadButton"] > button span {
+                        color: #ffffff !important;
+                    }
+                        
+                    /* HOVER */
+                    div[data-testid="stDownloadButton"] > button:hover {
+                        background: linear-gradient(135deg, #22c55e, #16a34a) !important;
+                        box-shadow: 0 12px 30px rgba(34,197,94,0.35);
+                    }
+
+                    /* ACTIVE / CLICK */
+                    div[data-testid="stDownloadButton"] > button:active,
+                    div[data-testid="stDownloadButton"] > button:focus {
+                        background: linear-gradient(135deg, #22c55e, #16a34a) !important;
+                        color: #ffffff !important;
+                        box-shadow: none !important;
+                        outline: none !important;
+                    }
+                    </>
+                    """, unsafe_allow_html=True)
+
+
+                # PDF: dikirim ke antrian latar belakang, tombol muncul setelah selesai
+                from antrian_laporan import AntrianPenuh
+                if btn:
+                    try:
+                        id_laporan = muat_antrian_laporan().kirim(nama, umur, hasil, risiko,
+                                                                  ketidakpastian, penjelasan)
+                    except AntrianPenuh:
+                        id_laporan = None
+                    except Exception as e:
+                        # Antrian tidak bisa dipakai (mis. worker gagal dibuat ulang):
+                        # PDF tetap bisa dibuat langsung saat tombol diklik
+                        hitung("carestunt_laporan_total", status="gagal")
+                        st.warning(f"Antrian laporan tidak tersedia ({type(e).__name__}); "
+                                   "PDF dibuat saat diunduh.")
+                        id_laporan = None
+                    st.session_state.diagnosa_laporan = id_laporan
+                else:
+                    id_laporan = st.session_state.get("diagnosa_laporan")
+                unduh_laporan(
+                    id_laporan, nama,
+                    lambda: laporan_pdf(ev, nama, model.generasi_cpt),
+                )
+            ekspor_file()  # hanya jika CARESTUNT_METRIK_FILE diisi
+
+
+# HALAMAN RIWAYAT
+elif st.session_state.page == "Riwayat":
+    st.markdown("## Riwayat Diagnosa")
 
-            # PDF
-            pdf_bytes = generate_pdf(nama, umur, hasil, risiko)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        cari_nama = st.text_input("Nama Balita", placeholder="Kosongkan untuk semua").strip()
+    with col2:
+        cari_id = st.text_input("ID Anak", placeholder="Untuk risiko terhaluskan").strip()
+    with col3:
+        cari_risiko = st.selectbox("Risiko", ["Semua", "Rendah", "Sedang", "Tinggi"])
+
+    # Keyset pagination: tumpukan kursor (waktu, id) halaman yang sudah dilihat,
+    # diulang dari awal jika filter berubah
+    filter_riwayat = (cari_nama, cari_risiko)
+    if st.session_state.get("riwayat_filter") != filter_riwayat:
+        st.session_state.riwayat_filter = filter_riwayat
+        st.session_state.riwayat_kursor = [None]
+
+    riwayat = muat_riwayat()
+    baris, berikutnya = riwayat.halaman(
+        st.session_state.riwayat_kursor[-1], n=20, nama=cari_nama or None,
+        risiko=None if cari_risiko == "Semua" else cari_risiko,
+    )
 
-            st.download_button(
-                "📄 Unduh Laporan PDF",
-                data=pdf_bytes,
-                file_name=f"Laporan_CareStunt_{nama}.pdf",
-                mime="application/pdf"
+    if baris:
+        st.dataframe(
+            [{
+                "Waktu": b["waktu"], "Nama": b["nama"], "Umur (bulan)": b["umur_bulan"],
+                "Pola Makan": b["pola_makan"], "Riwayat Infeksi": b["riwayat_penyakit"],
+                "Sanitasi": b["lingkungan"], "Risiko": b["risiko"],
+                "Tinggi (%)": round(b["p_tinggi"], 1),
+            } for b in baris],
+            hide_index=True, width="stretch",
+        )
+    else:
+        st.info("Belum ada riwayat diagnosa yang cocok.")
+
+    col_prev, col_hal, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("← Sebelumnya", disabled=len(st.session_state.riwayat_kursor) == 1):
+            st.session_state.riwayat_kursor.pop()
+            st.rerun()
+    with col_hal:
+        st.markdown(f"<p style='text-align:center;'>Halaman {len(st.session_state.riwayat_kursor)}</p>",
+                    unsafe_allow_html=True)
+    with col_next:
+        if st.button("Berikutnya →", disabled=berikutnya is None):
+            st.session_state.riwayat_kursor.append(berikutnya)
+            st.rerun()
+
+    # Tren satu balita
+    if cari_nama:
+        tren = riwayat.tren(cari_nama)
+        if len(tren) > 1:
+            st.markdown(f"### Tren Risiko {cari_nama}")
+            st.line_chart(
+                {level: [t[f"p_{level.lower()}"] for t in tren] for level in ("Rendah", "Sedang", "Tinggi")},
+                color=["#22c55e", "#facc15", "#ef4444"],
             )
 
+    # Risiko terhaluskan satu balita (filter antar kunjungan, urut umur)
+    if cari_id:
+        kunjungan = muat_pelacak().riwayat(cari_id)
+        status = muat_pelacak().status(cari_id)
+        if status and len(kunjungan) > 1:
+            st.markdown(f"### Risiko Tinggi Terhaluskan ({cari_id})")
+            st.caption(
+                f"Status terakhir: {status['risiko']} (tren {status['tren']}), "
+                f"{status['n_kunjungan']} kunjungan"
+            )
+            st.line_chart(
+                {
+                    "Umur (bulan)": [k["umur_bulan"] for k in kunjungan],
+                    "Kunjungan": [k["p_tinggi"] for k in kunjungan],
+                    "Terhaluskan": [k["f_tinggi"] for k in kunjungan],
+                },
+                x="Umur (bulan)", color=["#94a3b8", "#ef4444"],
+            )
+
+
+# HALAMAN DASBOR
+elif st.session_state.page == "Dasbor":
+    st.markdown("## Dasbor Kohort")
+
+    # File kubus dibaca ulang jika berubah (mis. impor CLI), lalu hanya
+    # diagnosa baru (id > id terakhir) yang ditambahkan dan disimpan
+    kubus = muat_kubus()
+    with rentang("dasbor_sinkron"):
+        kubus.sinkron_file(PATH_KUBUS, muat_riwayat())
+
+    nama_dimensi = {
+        "Kategori Umur": "umur",
+        "Pola Makan": "pola_makan",
+        "Riwayat Penyakit": "riwayat_penyakit",
+        "Sanitasi Lingkungan": "lingkungan",
+    }
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Diagnosa", f"{kubus.total():,}",
+                  help="Jumlah baris diagnosa & registri di kubus, bukan jumlah balita unik")
+    with col2:
+        st.metric("Dilewati", f"{kubus.n_dilewati:,}",
+                  help="Data dengan isian 'Tidak Diketahui' / tidak dikenal, tidak masuk agregat")
+    with col3:
+        pilihan = st.selectbox("Kelompokkan menurut", list(nama_dimensi))
+
+    ringkasan = kubus.ringkasan(nama_dimensi[pilihan])
+    if kubus.total():
+        st.markdown("### Distribusi Kelas Risiko")
+        st.bar_chart(
+            {
+                pilihan: [r["nilai"] for r in ringkasan],
+                **{level: [r["risiko"][level] for r in ringkasan] for level in ("Rendah", "Sedang", "Tinggi")},
+            },
+            x=pilihan,
+            color=["#22c55e", "#facc15", "#ef4444"],
+        )
+        st.dataframe(
+            [{
+                pilihan: r["nilai"], "Jumlah": r["n"],
+                **{f"Rata-rata {level} (%)": round(r["rata_posterior"][level], 1)
+                   for level in ("Rendah", "Sedang", "Tinggi")},
+            } for r in ringkasan],
+            hide_index=True, width="stretch",
+        )
+    else:
+        st.info("Belum ada data kohort. Lakukan diagnosa atau jalankan "
+                "`python kubus_kohort.py tambah kubus_kohort.npz registri.csv`.")
+
 
 # HALAMAN EDUKASI
 elif st.session_state.page == "Edukasi":
@@ -0,0 +1,241 @@
+"""
+Benchmark inferensi, grafik dan PDF (tanpa Streamlit).
+
+Metrik (waktu terbaik dari --ulang percobaan, seperti timeit):
+    inferensi_skalar_us      : satu panggilan BayesianNetworkStunting.inferensi
+    batch_dataset_baris_per_s: inferensi_batch atas data_stunting.csv
+    batch_sintetis_baris_per_s / batch_sintetis_ms : --baris baris acak (default 10^6)
+    batch_sintetis_puncak_mb : puncak alokasi (tracemalloc) selama batch sintetis
+    grafik_ms                : laporan.generate_prob_chart
+    pdf_<renderer>_ms / pdf_<renderer>_byte : laporan.generate_pdf
+    rss_maks_mb              : RSS maksimum proses benchmark
+
+Hasil ditulis sebagai JSON. Dengan --baseline, hasil dibandingkan dengan file
+hasil sebelumnya; metrik yang memburuk lebih dari --toleransi (relatif) dan
+lebih dari AMBANG_MUTLAK metrik itu (mis. 1 us / 1 ms, derau pengukuran)
+dilaporkan dan proses keluar dengan kode 1.
+
+Sebelum pengukuran, inferensi() dan inferensi_batch() dicek identik (bit demi
+bit) atas grid umur x varian label (label model, varian LABEL_EVIDENCE, huruf
+kecil/besar, label tak dikenal); jika berbeda proses keluar dengan kode 1.
+
+Contoh:
+    python benchmark/inti.py --output benchmark/hasil.json
+    python benchmark/inti.py --baseline benchmark/baseline.json --toleransi 0.25
+    python benchmark/inti.py --baris 100000 --output benchmark/baseline.json   # buat baseline baru
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # type: ignore  # noqa: E402
+
+from model_stunting import (  # noqa: E402
+    BayesianNetworkStunting, LABEL_EVIDENCE, LEVEL_STUNTING, LINGKUNGAN, POLA_MAKAN, RIWAYAT_PENYAKIT,
+)
+
+# Arah metrik: 'min' = lebih kecil lebih baik, 'maks' = lebih besar lebih baik
+ARAH = {
+    'inferensi_skalar_us': 'min',
+    'batch_dataset_baris_per_s': 'maks',
+    'batch_sintetis_baris_per_s': 'maks',
+    'batch_sintetis_ms': 'min',
+    'batch_sintetis_puncak_mb': 'min',
+    'grafik_ms': 'min',
+    'pdf_matplotlib_ms': 'min',
+    'pdf_matplotlib_byte': 'min',
+    'pdf_vektor_ms': 'min',
+    'pdf_vektor_byte': 'min',
+    'rss_maks_mb': 'min',
+}
+
+# Selisih absolut (dalam satuan metrik) yang dianggap derau, bukan regresi:
+# metrik skala mikrodetik mudah bergeser puluhan persen tanpa perubahan kode
+AMBANG_MUTLAK = {
+    'inferensi_skalar_us': 1.0,
+    'batch_sintetis_ms': 1.0,
+    'batch_sintetis_puncak_mb': 1.0,
+    'grafik_ms': 1.0,
+    'pdf_matplotlib_ms': 1.0,
+    'pdf_vektor_ms': 1.0,
+    'rss_maks_mb': 5.0,
+}
+
+
+def waktu_terbaik(fungsi, ulang, per_panggilan=1):
+    # Detik per panggilan, minimum dari `ulang` percobaan (paling tahan gangguan)
+    hasil = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        for _ in range(per_panggilan):
+            fungsi()
+        hasil.append((time.perf_counter() - mulai) / per_panggilan)
+    return min(hasil)
+
+
+def data_sintetis(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'umur_bulan': rng.integers(0, 61, n).astype(np.float64),
+        'pola_makan': np.array(POLA_MAKAN, dtype=object)[rng.integers(0, len(POLA_MAKAN), n)],
+        'riwayat_penyakit': np.array(RIWAYAT_PENYAKIT, dtype=object)[rng.integers(0, len(RIWAYAT_PENYAKIT), n)],
+        'lingkungan': np.array(LINGKUNGAN, dtype=object)[rng.integers(0, len(LINGKUNGAN), n)],
+    }
+
+
+def _varian_label(kolom, nilai):
+    varian = set(nilai) | set(LABEL_EVIDENCE[kolom])
+    varian |= {v.title() for v in varian} | {v.upper() for v in varian} | {f" {v} " for v in nilai}
+    return sorted(varian) + ['tidak dikenal']
+
+
+def cek_paritas(model):
+    # Hasil: list pesan baris yang berbeda antara inferensi() dan inferensi_batch()
+    grid = itertools.product(
+        [float(u) for u in range(0, 61)] + [21.5, 33.5],
+        _varian_label('pola_makan', POLA_MAKAN),
+        _varian_label('riwayat_penyakit', RIWAYAT_PENYAKIT),
+        _varian_label('lingkungan', LINGKUNGAN),
+    )
+    baris = list(grid)
+    kolom = dict(zip(('umur_bulan', 'pola_makan', 'riwayat_penyakit', 'lingkungan'),
+                     (np.array(k, dtype=object) for k in zip(*baris))))
+    kolom['umur_bulan'] = kolom['umur_bulan'].astype(np.float64)
+    probs, kategori = model.inferensi_batch(kolom)
+
+    beda = []
+    for i, b in enumerate(baris):
+        hasil, kat = model.inferensi(*b)
+        if [hasil[k] for k in LEVEL_STUNTING] != probs[i].tolist() or kat != kategori[i]:
+            beda.append(f"{b}: skalar {hasil} {kat}, batch {probs[i].tolist()} {kategori[i]}")
+    return beda, len(baris)
+
+
+def bench_inferensi(model, ulang, n_baris):
+    hasil = {}
+    hasil['inferensi_skalar_us'] = waktu_terbaik(
+        lambda: model.inferensi(24, 'Kurang', 'Sering Diare', 'Kurang'), ulang, 10_000) * 1e6
+
+    import pandas as pd  # type: ignore
+    from skor_massal import siapkan_evidence
+    df = pd.read_csv(os.path.join(ROOT, 'data_stunting.csv'), sep=';', encoding='utf-8-sig',
+                     dtype=str, keep_default_na=False)
+    evidence = siapkan_evidence(df)
+    detik = waktu_terbaik(lambda: model.inferensi_batch(evidence), ulang, 100)
+    hasil['batch_dataset_baris_per_s'] = len(df) / detik
+
+    sintetis = data_sintetis(n_baris)
+    detik = waktu_terbaik(lambda: model.inferensi_batch(sintetis), ulang)
+    hasil['batch_sintetis_baris_per_s'] = n_baris / detik
+    hasil['batch_sintetis_ms'] = detik * 1000
+
+    tracemalloc.start()
+    model.inferensi_batch(sintetis)
+    hasil['batch_sintetis_puncak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return hasil
+
+
+def bench_laporan(model, ulang):
+    import laporan
+
+    hasil_inferensi, _ = model.inferensi(24, 'Kurang', 'Sering Diare', 'Kurang')
+    risiko = max(hasil_inferensi, key=hasil_inferensi.get)
+    laporan.generate_prob_chart(hasil_inferensi)  # pemanasan (impor, font)
+
+    hasil = {'grafik_ms': waktu_terbaik(lambda: laporan.generate_prob_chart(hasil_inferensi), ulang) * 1000}
+    for renderer in ('matplotlib', 'vektor'):
+        buat = lambda: laporan.generate_pdf("Budi", 24, hasil_inferensi, risiko, renderer)  # noqa: E731
+        hasil[f'pdf_{renderer}_byte'] = len(buat())
+        hasil[f'pdf_{renderer}_ms'] = waktu_terbaik(buat, ulang) * 1000
+    return hasil
+
+
+def rss_maks_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 1024
+
+
+def bandingkan(hasil, baseline, toleransi):
+    # Hasil: list pesan regresi
+    regresi = []
+    for nama, nilai in hasil['metrik'].items():
+        lama = baseline.get('metrik', {}).get(nama)
+        if nilai is None or not lama:
+            continue
+        rasio = nilai / lama
+        if ARAH.get(nama) == 'maks':
+            buruk = rasio < 1 - toleransi
+        else:
+            buruk = rasio > 1 + toleransi
+        if buruk and abs(nilai - lama) >= AMBANG_MUTLAK.get(nama, 0.0):
+            regresi.append(f"{nama}: {lama:,.2f} -> {nilai:,.2f} ({(rasio - 1) * 100:+.1f}%)")
+    return regresi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inferensi, grafik dan PDF CareStunt")
+    parser.add_argument('--ulang', type=int, default=5)
+    parser.add_argument('--baris', type=int, default=1_000_000, help="jumlah baris batch sintetis")
+    parser.add_argument('--tanpa-laporan', action='store_true', help="lewati benchmark grafik & PDF")
+    parser.add_argument('--output', default=None, help="tulis hasil JSON ke file ini")
+    parser.add_argument('--baseline', default=None, help="file hasil JSON pembanding")
+    parser.add_argument('--toleransi', type=float, default=0.2, help="batas perubahan relatif (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    model = BayesianNetworkStunting()
+    beda, n_grid = cek_paritas(model)
+    for b in beda[:20]:
+        print(f"PARITAS: {b}", file=sys.stderr)
+    if beda:
+        print(f"{len(beda)} dari {n_grid} baris grid berbeda antara inferensi() dan inferensi_batch()",
+              file=sys.stderr)
+        return 1
+
+    metrik = bench_inferensi(model, args.ulang, args.baris)
+    if not args.tanpa_laporan:
+        metrik.update(bench_laporan(model, args.ulang))
+    metrik['rss_maks_mb'] = rss_maks_mb()
+
+    hasil = {
+        'waktu': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'mesin': platform.machine(),
+        'numpy': np.__version__,
+        'baris_sintetis': args.baris,
+        'metrik': metrik,
+    }
+    teks = json.dumps(hasil, indent=2)
+    print(teks)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(teks + '\n')
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('baris_sintetis') != args.baris:
+        print(f"Peringatan: baseline memakai {baseline.get('baris_sintetis')} baris sintetis, "
+              f"sekarang {args.baris}", file=sys.stderr)
+    regresi = bandingkan(hasil, baseline, args.toleransi)
+    for r in regresi:
+        print(f"REGRESI: {r}", file=sys.stderr)
+    return 1 if regresi else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark waktu start dan rerun app.py.
+
+Setiap percobaan berjalan di proses Python baru (cache impor kosong):
+    cold_start_ms : run pertama app.py (halaman Beranda), termasuk impor
+    rerun_ms      : run berikutnya pada sesi yang sama
+    modul_berat   : modul berat yang ikut termuat di halaman Beranda
+
+Contoh:
+    python benchmark/startup.py
+    python benchmark/startup.py --ulang 5 --batas-cold-ms 1500 --batas-rerun-ms 100
+
+Keluar dengan kode 1 jika median melewati batas atau ada modul berat
+yang termuat sebelum halaman Diagnosa dibuka.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# model_stunting/numpy sengaja dimuat saat start (warm-up model bersama)
+MODUL_BERAT = ['pandas', 'matplotlib', 'fpdf', 'laporan']
+
+_KODE_PERCOBAAN = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+t0 = time.perf_counter()
+at.run()
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({
+    'cold_start_ms': (t1 - t0) * 1000,
+    'rerun_ms': (t2 - t1) * 1000,
+    'modul_berat': [m for m in sys.argv[2].split(',') if m in sys.modules],
+}))
+"""
+
+
+def satu_percobaan():
+    hasil = subprocess.run(
+        [sys.executable, '-c', _KODE_PERCOBAAN, os.path.join(ROOT, 'app.py'), ','.join(MODUL_BERAT)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(hasil.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark start & rerun app.py")
+    parser.add_argument('--ulang', type=int, default=3)
+    parser.add_argument('--batas-cold-ms', type=float, default=None)
+    parser.add_argument('--batas-rerun-ms', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    percobaan = [satu_percobaan() for _ in range(args.ulang)]
+    ringkasan = {
+        'cold_start_ms': statistics.median(p['cold_start_ms'] for p in percobaan),
+        'rerun_ms': statistics.median(p['rerun_ms'] for p in percobaan),
+        'modul_berat': sorted({m for p in percobaan for m in p['modul_berat']}),
+    }
+    print(json.dumps(ringkasan, indent=2))
+
+    gagal = []
+    if args.batas_cold_ms is not None and ringkasan['cold_start_ms'] > args.batas_cold_ms:
+        gagal.append(f"cold start {ringkasan['cold_start_ms']:.0f} ms > {args.batas_cold_ms:.0f} ms")
+    if args.batas_rerun_ms is not None and ringkasan['rerun_ms'] > args.batas_rerun_ms:
+        gagal.append(f"rerun {ringkasan['rerun_ms']:.0f} ms > {args.batas_rerun_ms:.0f} ms")
+    if ringkasan['modul_berat']:
+        gagal.append(f"modul berat termuat di Beranda: {', '.join(ringkasan['modul_berat'])}")
+
+    for g in gagal:
+        print(f"REGRESI: {g}", file=sys.stderr)
+    return 1 if gagal else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Ekstraksi evidence dari catatan teks bebas (kolom "Data Teks").
+
+Semua petunjuk (umur, pola makan, riwayat penyakit, sanitasi) digabung
+menjadi SATU regex terkompilasi (kata kunci disusun sebagai trie), sehingga
+tiap catatan cukup dipindai sekali, berapa pun jumlah kata kuncinya. Untuk
+data massal, catatan yang sama persis (umum pada catatan lapangan) hanya
+diekstrak sekali.
+
+Aturan:
+    - umur: kemunculan pertama "<n> bulan" / "<n> tahun [<m> bulan]"
+    - jika satu variabel punya beberapa petunjuk, dipilih yang paling berat
+      (urutan nilai pada model_stunting: indeks terbesar = paling berisiko)
+    - variabel tanpa petunjuk bernilai None
+
+Contoh:
+    python ekstraktor_teks.py "Balita 2 tahun jarang protein dan sering diare"
+    python ekstraktor_teks.py --csv data_stunting.csv
+"""
+
+import argparse
+import re
+import sys
+
+from model_stunting import LINGKUNGAN, POLA_MAKAN, RIWAYAT_PENYAKIT
+
+KOLOM_HASIL = ('umur_bulan', 'pola_makan', 'riwayat_penyakit', 'lingkungan')
+
+# KATA KUNCI -> (kolom evidence, nilai model)
+KATA_KUNCI = {
+    # Pola makan
+    'makan bergizi': ('pola_makan', 'Baik'),
+    'gizi seimbang': ('pola_makan', 'Baik'),
+    'pola makan seimbang': ('pola_makan', 'Baik'),
+    'pola makan baik': ('pola_makan', 'Baik'),
+    'asi eksklusif': ('pola_makan', 'Baik'),
+    'asupan cukup': ('pola_makan', 'Cukup'),
+    'pola makan cukup': ('pola_makan', 'Cukup'),
+    'jarang protein': ('pola_makan', 'Kurang'),
+    'kurang protein': ('pola_makan', 'Kurang'),
+    'protein kurang': ('pola_makan', 'Kurang'),
+    'asupan kurang': ('pola_makan', 'Kurang'),
+    'kurang gizi': ('pola_makan', 'Kurang'),
+    'gizi kurang': ('pola_makan', 'Kurang'),
+    'gizi buruk': ('pola_makan', 'Kurang'),
+    'menolak makan': ('pola_makan', 'Kurang'),
+    'susah makan': ('pola_makan', 'Kurang'),
+    'pola makan kurang': ('pola_makan', 'Kurang'),
+    # Riwayat penyakit
+    'tidak pernah sakit': ('riwayat_penyakit', 'Tidak Ada'),
+    'tidak ada riwayat penyakit': ('riwayat_penyakit', 'Tidak Ada'),
+    'jarang sakit': ('riwayat_penyakit', 'Jarang'),
+    'kadang sakit': ('riwayat_penyakit', 'Jarang'),
+    'sering sakit': ('riwayat_penyakit', 'Sering Infeksi'),
+    'sering infeksi': ('riwayat_penyakit', 'Sering Infeksi'),
+    'infeksi berulang': ('riwayat_penyakit', 'Sering Infeksi'),
+    'ispa': ('riwayat_penyakit', 'Sering Infeksi'),
+    'batuk pilek': ('riwayat_penyakit', 'Sering Infeksi'),
+    'diare': ('riwayat_penyakit', 'Sering Diare'),
+    'sering diare': ('riwayat_penyakit', 'Sering Diare'),
+    'diare berulang': ('riwayat_penyakit', 'Sering Diare'),
+    # Sanitasi lingkungan
+    'lingkungan bersih': ('lingkungan', 'Baik'),
+    'sanitasi baik': ('lingkungan', 'Baik'),
+    'sanitasi bersih': ('lingkungan', 'Baik'),
+    'air bersih': ('lingkungan', 'Baik'),
+    'cukup bersih': ('lingkungan', 'Cukup'),
+    'sanitasi cukup': ('lingkungan', 'Cukup'),
+    'tidak bersih': ('lingkungan', 'Kurang'),
+    'lingkungan kotor': ('lingkungan', 'Kurang'),
+    'sanitasi buruk': ('lingkungan', 'Kurang'),
+    'sanitasi kurang': ('lingkungan', 'Kurang'),
+    'kumuh': ('lingkungan', 'Kurang'),
+    'tanpa jamban': ('lingkungan', 'Kurang'),
+}
+
+# Tingkat keparahan = indeks nilai pada model (petunjuk terberat yang dipakai)
+_TINGKAT = {
+    'pola_makan': {v: i for i, v in enumerate(POLA_MAKAN)},
+    'riwayat_penyakit': {v: i for i, v in enumerate(RIWAYAT_PENYAKIT)},
+    'lingkungan': {v: i for i, v in enumerate(LINGKUNGAN)},
+}
+
+
+def _pola_trie(daftar_kata):
+    # Kata kunci disusun menjadi trie lalu ditulis sebagai regex: awalan yang
+    # sama ("sering sakit" / "sering diare") hanya dicoba sekali per posisi,
+    # cabang terpanjang dicoba lebih dulu ("tidak bersih" menang atas "bersih")
+    akar = {}
+    for kata in daftar_kata:
+        simpul = akar
+        for huruf in ' '.join(kata.lower().split()):
+            simpul = simpul.setdefault(huruf, {})
+        simpul[''] = True
+
+    def tulis(simpul):
+        cabang = [(r'\s+' if h == ' ' else re.escape(h)) + tulis(anak)
+                  for h, anak in sorted(simpul.items()) if h]
+        if not cabang:
+            return ''
+        pola = cabang[0] if len(cabang) == 1 else '(?:' + '|'.join(cabang) + ')'
+        return f'(?:{pola})?' if '' in simpul else pola
+
+    return tulis(akar)
+
+
+def _kompilasi_regex(kata_kunci):
+    # \b di depan: pencocokan hanya dicoba di awal kata / angka
+    return re.compile(
+        r'\b(?:(?P<tahun>\d+(?:[.,]\d+)?)\s*(?:tahun|thn|th)\b'
+        r'(?:\s*(?:dan\s+)?(?P<tahun_bulan>\d+)\s*(?:bulan|bln)\b)?'
+        r'|(?P<bulan>\d+(?:[.,]\d+)?)\s*(?:bulan|bln)\b'
+        r'|(?P<kata>' + _pola_trie(kata_kunci) + r')\b)',
+        re.IGNORECASE,
+    )
+
+
+_REGEX = _kompilasi_regex(KATA_KUNCI)
+
+
+def _angka(teks):
+    return float(teks.replace(',', '.'))
+
+
+def ekstrak(teks):
+    # Satu catatan -> dict KOLOM_HASIL (None jika tidak ada petunjuk)
+    hasil = dict.fromkeys(KOLOM_HASIL)
+    if not isinstance(teks, str):
+        return hasil
+
+    for m in _REGEX.finditer(teks):
+        kata = m.group('kata')
+        if kata is not None:
+            kolom, nilai = KATA_KUNCI[' '.join(kata.lower().split())]
+            lama = hasil[kolom]
+            if lama is None or _TINGKAT[kolom][nilai] > _TINGKAT[kolom][lama]:
+                hasil[kolom] = nilai
+        elif hasil['umur_bulan'] is None:
+            if m.group('tahun') is not None:
+                umur = _angka(m.group('tahun')) * 12
+                if m.group('tahun_bulan') is not None:
+                    umur += int(m.group('tahun_bulan'))
+            else:
+                umur = _angka(m.group('bulan'))
+            hasil['umur_bulan'] = umur
+    return hasil
+
+
+def ekstrak_batch(teks):
+    # Series teks -> DataFrame KOLOM_HASIL (indeks sama dengan input).
+    # Regex hanya dijalankan pada catatan unik.
+    import pandas as pd  # type: ignore
+
+    kode, unik = pd.factorize(teks, use_na_sentinel=False)
+    tabel = pd.DataFrame([ekstrak(t) for t in unik], columns=list(KOLOM_HASIL))
+    tabel['umur_bulan'] = tabel['umur_bulan'].astype('float64')
+
+    hasil = tabel.take(kode)
+    hasil.index = teks.index
+    return hasil
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekstraksi evidence dari catatan teks bebas.")
+    parser.add_argument('teks', nargs='*', help="catatan yang akan diekstrak")
+    parser.add_argument('--csv', default=None, help="file berformat data_stunting.csv (kolom 'Data Teks')")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        import pandas as pd  # type: ignore
+        df = pd.read_csv(args.csv, sep=';', encoding='utf-8-sig', dtype=str, keep_default_na=False)
+        hasil = ekstrak_batch(df['Data Teks'])
+        hasil.insert(0, 'Data Teks', df['Data Teks'])
+        hasil.to_csv(sys.stdout, sep=';', index=False)
+    for teks in args.teks:
+        print(teks, '->', ekstrak(teks))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
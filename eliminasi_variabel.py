@@ -0,0 +1,121 @@
+"""
+Mesin inferensi umum berbasis faktor (variable elimination).
+
+Dipakai BayesianNetworkStunting untuk evidence yang tidak lengkap dan
+query sembarang, mis. P(Penyakit | Stunting=Tinggi).
+
+Setiap pola query (variabel yang ditanya + variabel yang diamati) dikompilasi
+sekali menjadi "rencana": tabel posterior untuk SEMUA kombinasi nilai
+variabel yang diamati. Query berikutnya dengan pola yang sama hanya
+berupa satu indexing array.
+"""
+
+import string
+import threading
+
+import numpy as np  # type: ignore
+
+
+class Faktor:
+    __slots__ = ('variabel', 'nilai')
+
+    def __init__(self, variabel, nilai):
+        self.variabel = tuple(variabel)
+        self.nilai = np.asarray(nilai, dtype=np.float64)
+        if self.nilai.ndim != len(self.variabel):
+            raise ValueError(f"dimensi faktor {self.nilai.shape} tidak cocok dengan {self.variabel}")
+
+    def kali(self, lain):
+        semua = self.variabel + tuple(v for v in lain.variabel if v not in self.variabel)
+        huruf = {v: string.ascii_letters[i] for i, v in enumerate(semua)}
+        rumus = '{},{}->{}'.format(
+            ''.join(huruf[v] for v in self.variabel),
+            ''.join(huruf[v] for v in lain.variabel),
+            ''.join(huruf[v] for v in semua),
+        )
+        return Faktor(semua, np.einsum(rumus, self.nilai, lain.nilai))
+
+    def jumlahkan(self, var):
+        i = self.variabel.index(var)
+        return Faktor(self.variabel[:i] + self.variabel[i + 1:], self.nilai.sum(axis=i))
+
+    def urutkan(self, variabel):
+        return np.transpose(self.nilai, [self.variabel.index(v) for v in variabel])
+
+
+class MesinEliminasi:
+    def __init__(self, faktor, kardinalitas):
+        # faktor: list Faktor, kardinalitas: dict nama variabel -> jumlah nilai.
+        # Variabel tanpa faktor prior dianggap seragam.
+        self.faktor = list(faktor)
+        self.kardinalitas = dict(kardinalitas)
+        self._rencana = {}
+        self._kunci = threading.Lock()
+
+    def urutan_eliminasi(self, dihapus):
+        # Heuristik min-degree pada graf interaksi faktor
+        tetangga = {v: set() for v in self.kardinalitas}
+        for f in self.faktor:
+            for v in f.variabel:
+                tetangga[v].update(u for u in f.variabel if u != v)
+
+        sisa, urutan = set(dihapus), []
+        while sisa:
+            v = min(sisa, key=lambda x: (len(tetangga[x]), x))
+            for u in tetangga[v]:
+                tetangga[u].update(w for w in tetangga[v] if w != u)
+                tetangga[u].discard(v)
+            sisa.remove(v)
+            urutan.append(v)
+        return urutan
+
+    def _kompilasi(self, query, diamati):
+        disimpan = set(query) | set(diamati)
+        faktor = list(self.faktor)
+        for v in self.urutan_eliminasi([v for v in self.kardinalitas if v not in disimpan]):
+            terkait = [f for f in faktor if v in f.variabel]
+            faktor = [f for f in faktor if v not in f.variabel]
+            if not terkait:
+                continue  # variabel seragam tanpa faktor, konstanta saja
+            hasil = terkait[0]
+            for f in terkait[1:]:
+                hasil = hasil.kali(f)
+            faktor.append(hasil.jumlahkan(v))
+
+        gabungan = Faktor((), np.float64(1.0))
+        for f in faktor:
+            gabungan = gabungan.kali(f)
+        # Variabel yang tersisa tanpa faktor (seragam) ditambahkan sebagai dimensi
+        for v in disimpan:
+            if v not in gabungan.variabel:
+                gabungan = gabungan.kali(Faktor((v,), np.ones(self.kardinalitas[v])))
+
+        tabel = gabungan.urutkan(tuple(diamati) + tuple(query))
+        sumbu_query = tuple(range(len(diamati), len(diamati) + len(query)))
+        total = tabel.sum(axis=sumbu_query, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tabel = np.where(total > 0, tabel / total, 0.0)
+        tabel.flags.writeable = False
+        return tabel
+
+    def rencana(self, query, diamati):
+        kunci = (tuple(query), tuple(diamati))
+        tabel = self._rencana.get(kunci)
+        if tabel is None:
+            with self._kunci:
+                tabel = self._rencana.get(kunci)
+                if tabel is None:
+                    tabel = self._kompilasi(*kunci)
+                    self._rencana[kunci] = tabel
+        return tabel
+
+    def posterior(self, query, evidence):
+        # query: tuple nama variabel, evidence: dict nama -> indeks nilai.
+        # Rencana yang sudah ada diambil langsung (tanpa kunci thread).
+        # Hasil: array distribusi bersama variabel query (urutan = query)
+        diamati = tuple(sorted(evidence))
+        kunci = (query, diamati)
+        tabel = self._rencana.get(kunci)
+        if tabel is None:
+            tabel = self.rencana(query, diamati)
+        return tabel[tuple(evidence[v] for v in diamati)]
@@ -0,0 +1,250 @@
+"""
+Instrumentasi ringan: rentang waktu (span), counter dan ekspor Prometheus.
+
+    from instrumentasi import diukur, rentang, hitung
+    with rentang('inferensi'):
+        ...
+    @diukur('generate_pdf')
+    def generate_pdf(...): ...
+    hitung('carestunt_diagnosa_total', risiko='Tinggi')
+
+Semua metrik disimpan di satu registri per proses (aman dipakai bersamaan
+oleh thread sesi Streamlit) dan bisa diekspor dalam format teks Prometheus:
+    - layanan_api.py : GET /metrics/prometheus
+    - app.py         : file, jika CARESTUNT_METRIK_FILE diisi (mis. untuk
+                       textfile collector node_exporter)
+
+Profiling opsional lewat environment:
+    CARESTUNT_PROFIL=cprofile|pyinstrument   profil setiap blok profil(...)
+    CARESTUNT_PROFIL_DIR=profil/             folder hasil (default: profil)
+File .prof (cProfile) dibuka dengan `python -m pstats` / snakeviz,
+file .html (pyinstrument) dengan browser.
+"""
+
+import bisect
+import contextlib
+import functools
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+PROFIL = os.environ.get("CARESTUNT_PROFIL", "").lower()
+FOLDER_PROFIL = os.environ.get("CARESTUNT_PROFIL_DIR", "profil")
+FILE_METRIK = os.environ.get("CARESTUNT_METRIK_FILE")
+
+# File metrik ditulis paling sering sekali per interval ini (detik)
+_INTERVAL_FILE = 1.0
+
+
+class Histogram:
+    # Histogram kumulatif sederhana (batas bucket dalam milidetik)
+    BUCKET_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self, bucket=BUCKET_MS):
+        self.bucket = tuple(bucket)
+        self.jumlah_per_bucket = [0] * (len(self.bucket) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def catat(self, nilai):
+        self.jumlah_per_bucket[bisect.bisect_left(self.bucket, nilai)] += 1
+        self.total += nilai
+        self.n += 1
+
+    def ringkasan(self):
+        kumulatif, buckets = 0, {}
+        for batas, jumlah in zip(self.bucket + ('+Inf',), self.jumlah_per_bucket):
+            kumulatif += jumlah
+            buckets[str(batas)] = kumulatif
+        return {'n': self.n, 'total': self.total, 'rata_rata': self.total / self.n if self.n else 0.0,
+                'bucket': buckets}
+
+
+def _label_teks(label):
+    if not label:
+        return ''
+    isi = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                   for k, v in label)
+    return '{' + isi + '}'
+
+
+class Registri:
+    def __init__(self):
+        self._kunci = threading.Lock()
+        self.counter = {}    # (nama, label) -> nilai
+        self.histogram = {}  # (nama, label) -> Histogram
+        self.bantuan = {}    # nama -> teks HELP
+
+    def hitung(self, nama, nilai=1, **label):
+        kunci = (nama, tuple(sorted(label.items())))
+        with self._kunci:
+            self.counter[kunci] = self.counter.get(kunci, 0) + nilai
+
+    def catat(self, nama, nilai, **label):
+        kunci = (nama, tuple(sorted(label.items())))
+        with self._kunci:
+            h = self.histogram.get(kunci)
+            if h is None:
+                h = self.histogram[kunci] = Histogram()
+            h.catat(nilai)
+
+    def ke_prometheus(self):
+        baris = []
+        with self._kunci:
+            counter = sorted(self.counter.items())
+            histogram = sorted((k, h.ringkasan()) for k, h in self.histogram.items())
+
+        sudah = set()
+        for (nama, label), nilai in counter:
+            if nama not in sudah:
+                sudah.add(nama)
+                if nama in self.bantuan:
+                    baris.append(f"# HELP {nama} {self.bantuan[nama]}")
+                baris.append(f"# TYPE {nama} counter")
+            baris.append(f"{nama}{_label_teks(label)} {nilai}")
+
+        for (nama, label), r in histogram:
+            if nama not in sudah:
+                sudah.add(nama)
+                if nama in self.bantuan:
+                    baris.append(f"# HELP {nama} {self.bantuan[nama]}")
+                baris.append(f"# TYPE {nama} histogram")
+            for batas, kumulatif in r['bucket'].items():
+                baris.append(f"{nama}_bucket{_label_teks(label + (('le', batas),))} {kumulatif}")
+            baris.append(f"{nama}_sum{_label_teks(label)} {r['total']}")
+            baris.append(f"{nama}_count{_label_teks(label)} {r['n']}")
+        return '\n'.join(baris) + '\n'
+
+
+REGISTRI = Registri()
+REGISTRI.bantuan['carestunt_rentang_ms'] = "Durasi blok kode yang diinstrumentasi (milidetik)"
+REGISTRI.bantuan['carestunt_diagnosa_total'] = "Jumlah diagnosa per kelas risiko"
+REGISTRI.bantuan['carestunt_http_latensi_ms'] = "Latensi permintaan layanan_api (milidetik)"
+
+
+def hitung(nama, nilai=1, **label):
+    REGISTRI.hitung(nama, nilai, **label)
+
+
+@contextlib.contextmanager
+def rentang(nama):
+    # Durasi blok dicatat ke histogram carestunt_rentang_ms{rentang=nama},
+    # termasuk jika blok berakhir dengan exception
+    mulai = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - mulai) * 1000
+        REGISTRI.catat('carestunt_rentang_ms', ms, rentang=nama)
+        rekaman = getattr(_rekaman, 'daftar', None)
+        if rekaman is not None:
+            rekaman.append((nama, ms))
+
+
+_rekaman = threading.local()
+
+
+@contextlib.contextmanager
+def rekam_rentang():
+    # List (nama, milidetik) semua rentang yang selesai di thread ini selama
+    # blok, mis. untuk dikirim worker proses ke registri proses induk
+    daftar, lama = [], getattr(_rekaman, 'daftar', None)
+    _rekaman.daftar = daftar
+    try:
+        yield daftar
+    finally:
+        _rekaman.daftar = lama
+
+
+def catat_rentang(rekaman):
+    # Masukkan hasil rekam_rentang() (dari proses lain) ke registri proses ini
+    for nama, ms in rekaman:
+        REGISTRI.catat('carestunt_rentang_ms', ms, rentang=nama)
+
+
+def diukur(nama):
+    # Dekorator: seluruh pemanggilan fungsi dicatat sebagai rentang `nama`
+    def dekorator(fungsi):
+        @functools.wraps(fungsi)
+        def pembungkus(*args, **kwargs):
+            with rentang(nama):
+                return fungsi(*args, **kwargs)
+        return pembungkus
+    return dekorator
+
+
+def ke_prometheus():
+    return REGISTRI.ke_prometheus()
+
+
+_terakhir_ditulis = 0.0
+
+
+def ekspor_file(path=None, paksa=False):
+    # Tulis metrik ke file (atomik); dibatasi sekali per _INTERVAL_FILE detik
+    global _terakhir_ditulis
+    path = path or FILE_METRIK
+    if not path:
+        return False
+    sekarang = time.monotonic()
+    if not paksa and sekarang - _terakhir_ditulis < _INTERVAL_FILE:
+        return False
+    _terakhir_ditulis = sekarang
+
+    isi = ke_prometheus().encode('utf-8')
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.metrik-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(isi)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
+
+
+_nomor_profil = itertools.count(1)
+
+
+@contextlib.contextmanager
+def profil(nama):
+    # Tanpa CARESTUNT_PROFIL blok dijalankan apa adanya (tanpa biaya)
+    if PROFIL not in ('cprofile', 'pyinstrument'):
+        yield
+        return
+
+    os.makedirs(FOLDER_PROFIL, exist_ok=True)
+    dasar = os.path.join(
+        FOLDER_PROFIL, f"{nama}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_nomor_profil)}")
+
+    if PROFIL == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler  # type: ignore
+        except ImportError:
+            print("CARESTUNT_PROFIL=pyinstrument membutuhkan paket 'pyinstrument' "
+                  "(pip install pyinstrument).", file=sys.stderr)
+            yield
+            return
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(dasar + '.html', 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(dasar + '.prof')
@@ -0,0 +1,288 @@
+"""
+Kubus agregat kohort untuk dasbor kabupaten.
+
+Alih-alih groupby atas ratusan ribu baris mentah di setiap rerun, setiap
+baris (diagnosa / registri) yang sudah diskor langsung dijumlahkan ke grid
+evidence 5 (umur) x 3 (pola makan) x 4 (riwayat penyakit) x 3 (lingkungan):
+    n        [umur, pola, riwayat, lingkungan]          jumlah baris
+    n_risiko [umur, pola, riwayat, lingkungan, level]   jumlah per kelas risiko
+    posterior[umur, pola, riwayat, lingkungan, level]   jumlah posterior (persen)
+Rata-rata posterior = posterior / n. Dasbor hanya membaca kubus ini.
+
+Sumber data (keduanya inkremental):
+    - riwayat_diagnosa.db : hanya baris dengan id > id_terakhir yang dibaca
+    - file registri CSV   : diskor per chunk dengan inferensi_batch
+
+File kubus bisa ditulis beberapa proses (worker app, CLI). Setiap penulis
+memegang kunci file <kubus>.lock, membaca ulang file, menambahkan datanya,
+lalu menyimpan; tidak ada hitungan yang tertimpa (lihat sinkron_file dan
+gabung_ke_file). Di Windows (tanpa fcntl) kunci antar proses tidak ada.
+
+Contoh:
+    python kubus_kohort.py tambah kubus_kohort.npz registri_kabupaten.csv
+    python kubus_kohort.py sinkron kubus_kohort.npz riwayat_diagnosa.db
+    python kubus_kohort.py ringkas kubus_kohort.npz --dimensi lingkungan
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import threading
+
+import numpy as np  # type: ignore
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from model_stunting import (
+    BayesianNetworkStunting, KATEGORI_UMUR, LEVEL_STUNTING, LINGKUNGAN, POLA_MAKAN, RIWAYAT_PENYAKIT,
+)
+
+# Dimensi kubus -> nilai (urutan = sumbu)
+DIMENSI = {
+    'umur': KATEGORI_UMUR,
+    'pola_makan': POLA_MAKAN,
+    'riwayat_penyakit': RIWAYAT_PENYAKIT,
+    'lingkungan': LINGKUNGAN,
+}
+BENTUK = tuple(len(v) for v in DIMENSI.values())
+
+
+def _kosong_teks(nilai):
+    return nilai is None or (isinstance(nilai, float) and nilai != nilai) or str(nilai).strip() == ''
+
+
+@contextlib.contextmanager
+def kunci_file(path):
+    # Kunci eksklusif antar proses selama baca ulang - tambah - simpan kubus
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _tanda_file(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class KubusKohort:
+    def __init__(self):
+        self.n = np.zeros(BENTUK, dtype=np.int64)
+        self.n_risiko = np.zeros(BENTUK + (len(LEVEL_STUNTING),), dtype=np.int64)
+        self.posterior = np.zeros(BENTUK + (len(LEVEL_STUNTING),), dtype=np.float64)
+        self.n_dilewati = 0     # evidence tidak lengkap / tidak dikenal
+        self.id_terakhir = 0    # id riwayat_diagnosa terakhir yang sudah masuk
+        self._tanda = None      # tanda file saat terakhir dimuat / disimpan
+        self._model = None
+        self._kunci = threading.Lock()  # sinkron() dari beberapa sesi sekaligus
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = BayesianNetworkStunting()
+        return self._model
+
+    @classmethod
+    def muat(cls, path):
+        kubus = cls()
+        kubus._muat_ulang(path)
+        return kubus
+
+    def _muat_ulang(self, path):
+        # Baca ulang file jika berubah sejak dimuat / disimpan proses ini
+        tanda = _tanda_file(path)
+        if tanda is None or tanda == self._tanda:
+            return False
+        with np.load(path) as data:
+            self.n = data['n'].copy()
+            self.n_risiko = data['n_risiko'].copy()
+            self.posterior = data['posterior'].copy()
+            self.n_dilewati = int(data['n_dilewati'])
+            self.id_terakhir = int(data['id_terakhir'])
+        self._tanda = tanda
+        return True
+
+    def simpan(self, path):
+        # Menimpa file dengan isi kubus ini; penulis bersamaan memakai
+        # sinkron_file / gabung_ke_file
+        with self._kunci:
+            self._simpan(path)
+
+    def _simpan(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"  # per proses: beberapa worker bisa menyimpan bersamaan
+        np.savez(tmp, n=self.n, n_risiko=self.n_risiko, posterior=self.posterior,
+                 n_dilewati=self.n_dilewati, id_terakhir=self.id_terakhir)
+        os.replace(tmp, path)
+        self._tanda = _tanda_file(path)
+
+    def sinkron_file(self, path, riwayat, ukuran=50_000):
+        # Muat ulang file (mis. setelah `kubus_kohort.py tambah`), tambahkan
+        # diagnosa baru dari riwayat, lalu simpan; semua di bawah kunci file
+        with self._kunci, kunci_file(path):
+            self._muat_ulang(path)
+            id_lama = self.id_terakhir
+            n = self._sinkron(riwayat, ukuran)
+            if self.id_terakhir != id_lama:
+                self._simpan(path)
+        return n
+
+    def gabung(self, lain):
+        # Tambahkan hitungan kubus lain (id_terakhir tidak berubah)
+        self.n += lain.n
+        self.n_risiko += lain.n_risiko
+        self.posterior += lain.posterior
+        self.n_dilewati += lain.n_dilewati
+
+    def gabung_ke_file(self, path):
+        # Tambahkan isi kubus ini (mis. hasil skor CSV) ke kubus di file.
+        # Hasil: kubus gabungan yang tersimpan
+        with kunci_file(path):
+            kubus = KubusKohort.muat(path)
+            kubus.gabung(self)
+            kubus._simpan(path)
+        return kubus
+
+    # PEMBARUAN
+    def tambah_kode(self, umur, pola, riwayat, lingkungan, probs):
+        # Array kode (seperti kodekan_batch) + posterior N x 3 (persen).
+        # Baris dengan kode di luar grid dilewati.
+        valid = (pola < BENTUK[1]) & (riwayat < BENTUK[2]) & (lingkungan < BENTUK[3])
+        sel = np.ravel_multi_index((umur[valid], pola[valid], riwayat[valid], lingkungan[valid]), BENTUK)
+        probs = np.asarray(probs, dtype=np.float64)[valid]
+        n_sel = int(np.prod(BENTUK))
+        n_level = len(LEVEL_STUNTING)
+
+        self.n += np.bincount(sel, minlength=n_sel).reshape(BENTUK)
+        idx_risiko = sel * n_level + probs.argmax(axis=1)
+        self.n_risiko += np.bincount(idx_risiko, minlength=n_sel * n_level).reshape(self.n_risiko.shape)
+        for j in range(n_level):
+            self.posterior[..., j] += np.bincount(sel, weights=probs[:, j], minlength=n_sel).reshape(BENTUK)
+
+        n_valid = int(valid.sum())
+        self.n_dilewati += len(valid) - n_valid
+        return n_valid
+
+    def tambah_batch(self, evidence, probs=None):
+        # evidence: kolom seperti inferensi_batch; probs dihitung jika tidak diberikan
+        if probs is None:
+            probs, _ = self.model.inferensi_batch(evidence)
+        umur, pola, riwayat, lingkungan = self.model.kodekan_batch(evidence)
+        # Riwayat kosong tidak boleh jatuh ke 'Tidak Ada' (fallback normalisasi)
+        kosong = np.fromiter((_kosong_teks(v) for v in evidence['riwayat_penyakit']), dtype=bool,
+                             count=len(riwayat))
+        riwayat = np.where(kosong, BENTUK[2], riwayat)
+        return self.tambah_kode(umur, pola, riwayat, lingkungan, probs)
+
+    def tambah_dari_csv(self, path, chunksize=100_000):
+        import pandas as pd  # type: ignore
+        from skor_massal import siapkan_evidence
+
+        n = 0
+        for chunk in pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str,
+                                 keep_default_na=False, chunksize=chunksize):
+            n += self.tambah_batch(siapkan_evidence(chunk))
+        return n
+
+    def sinkron(self, riwayat, ukuran=50_000):
+        # Tambahkan diagnosa baru dari PenyimpanRiwayat (id > id_terakhir)
+        with self._kunci:
+            return self._sinkron(riwayat, ukuran)
+
+    def _sinkron(self, riwayat, ukuran):
+        kon = riwayat._koneksi_baca()
+        n = 0
+        while True:
+            baris = kon.execute(
+                "SELECT id, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,"
+                " p_rendah, p_sedang, p_tinggi FROM diagnosa WHERE id > ? ORDER BY id LIMIT ?",
+                (self.id_terakhir, ukuran),
+            ).fetchall()
+            if not baris:
+                return n
+            kolom = list(zip(*baris))
+            evidence = {
+                'umur_bulan': np.array(kolom[1], dtype=np.float64),
+                'pola_makan': kolom[2], 'riwayat_penyakit': kolom[3], 'lingkungan': kolom[4],
+            }
+            n += self.tambah_batch(evidence, np.column_stack(kolom[5:8]))
+            self.id_terakhir = kolom[0][-1]
+
+    # PEMBACAAN
+    def ringkasan(self, dimensi):
+        # Agregat per nilai satu dimensi: list dict (nilai, n, distribusi
+        # kelas risiko, rata-rata posterior)
+        sumbu = list(DIMENSI).index(dimensi)
+        lain = tuple(i for i in range(len(BENTUK)) if i != sumbu)
+        n = self.n.sum(axis=lain)
+        n_risiko = self.n_risiko.sum(axis=lain)
+        posterior = self.posterior.sum(axis=lain)
+
+        hasil = []
+        for i, nilai in enumerate(DIMENSI[dimensi]):
+            rata = posterior[i] / n[i] if n[i] else np.zeros(len(LEVEL_STUNTING))
+            hasil.append({
+                'nilai': nilai,
+                'n': int(n[i]),
+                'risiko': dict(zip(LEVEL_STUNTING, n_risiko[i].tolist())),
+                'rata_posterior': dict(zip(LEVEL_STUNTING, rata.tolist())),
+            })
+        return hasil
+
+    def total(self):
+        return int(self.n.sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kubus agregat kohort untuk dasbor CareStunt.")
+    sub = parser.add_subparsers(dest='perintah', required=True)
+
+    p_tambah = sub.add_parser('tambah', help="skor file registri CSV dan tambahkan ke kubus")
+    p_tambah.add_argument('kubus')
+    p_tambah.add_argument('input', nargs='+')
+
+    p_sinkron = sub.add_parser('sinkron', help="tambahkan diagnosa baru dari riwayat_diagnosa.db")
+    p_sinkron.add_argument('kubus')
+    p_sinkron.add_argument('db')
+
+    p_ringkas = sub.add_parser('ringkas', help="tampilkan agregat per dimensi")
+    p_ringkas.add_argument('kubus')
+    p_ringkas.add_argument('--dimensi', choices=list(DIMENSI), default='umur')
+    args = parser.parse_args(argv)
+
+    if args.perintah == 'tambah':
+        # Skor di kubus terpisah (tanpa kunci), lalu digabung ke file
+        tambahan = KubusKohort()
+        for path in args.input:
+            print(f"{path}: {tambahan.tambah_dari_csv(path)} baris ditambahkan")
+        kubus = tambahan.gabung_ke_file(args.kubus)
+    elif args.perintah == 'sinkron':
+        from riwayat_diagnosa import PenyimpanRiwayat
+        riwayat = PenyimpanRiwayat(args.db)
+        kubus = KubusKohort()
+        print(f"{kubus.sinkron_file(args.kubus, riwayat)} diagnosa baru ditambahkan "
+              f"(id terakhir {kubus.id_terakhir})")
+        riwayat.tutup()
+    else:
+        kubus = KubusKohort.muat(args.kubus)
+        for r in kubus.ringkasan(args.dimensi):
+            distribusi = '  '.join(f"{k} {v:>7}" for k, v in r['risiko'].items())
+            print(f"{r['nilai']:<16} n={r['n']:>8}  {distribusi}  "
+                  f"rata Tinggi {r['rata_posterior']['Tinggi']:.1f}%")
+    print(f"Total {kubus.total()} baris ({kubus.n_dilewati} dilewati)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""
+Pembuatan laporan PDF CareStunt (grafik probabilitas, interpretasi, saran).
+
+Dipakai oleh halaman Diagnosa di app.py dan oleh laporan_massal.py,
+sehingga modul ini tidak boleh bergantung pada Streamlit.
+"""
+
+import io
+import math
+import os
+import tempfile
+
+from fpdf import FPDF, FPDF_VERSION  # type: ignore
+
+from instrumentasi import diukur
+
+
+def muat_pyplot():
+    # matplotlib baru diimpor saat grafik pertama benar-benar dirender
+    import matplotlib  # type: ignore
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt  # type: ignore
+    return plt
+
+
+# FUNGSI SARAN TINDAKAN
+def get_saran(risiko):
+    if risiko == "Tinggi":
+        return [
+            "Konsultasi ke tenaga kesehatan atau puskesmas terdekat untuk pemeriksaan lanjutan.",
+            "Lakukan penimbangan berat badan dan pengukuran tinggi badan setiap bulan.",
+            "Perbaiki asupan gizi harian dengan menambahkan sumber protein (telur, ikan, daging), zat besi, dan zinc.",
+            "Pastikan balita mendapatkan ASI atau susu sesuai usia dan kebutuhan gizi.",
+            "Jaga kebersihan lingkungan, air minum, dan sanitasi untuk mencegah infeksi berulang.",
+            "Ikuti kegiatan posyandu secara rutin untuk pemantauan tumbuh kembang."
+        ]
+
+    elif risiko == "Sedang":
+        return [
+            "Tingkatkan kualitas pola makan dengan menu bergizi seimbang setiap hari.",
+            "Pastikan jadwal imunisasi balita lengkap dan tepat waktu.",
+            "Pantau berat dan tinggi badan minimal setiap 2 - 3 bulan.",
+            "Kurangi risiko infeksi dengan menjaga kebersihan diri dan lingkungan rumah.",
+            "Berikan makanan tambahan jika diperlukan sesuai anjuran tenaga kesehatan."
+        ]
+
+    else:  # Rendah
+        return [
+            "Pertahankan pola makan sehat dan bergizi seimbang sesuai usia balita.",
+            "Lanjutkan pemantauan pertumbuhan secara rutin di posyandu atau fasilitas kesehatan.",
+            "Pastikan kebersihan lingkungan tetap terjaga.",
+            "Tetap berikan stimulasi dan perhatian terhadap tumbuh kembang balita."
+        ]
+
+
+# KONTRIBUSI FAKTOR (mode penjelasan model)
+NAMA_FAKTOR_PENJELASAN = {
+    "pola_makan_riwayat": "Pola makan & riwayat penyakit",
+    "lingkungan": "Sanitasi lingkungan",
+    "umur": "Umur",
+}
+
+
+def rincian_kontribusi(penjelasan):
+    # Penjelasan dari model.inferensi_jelaskan -> list (faktor, nama, log_rasio, teks),
+    # diurutkan dari faktor yang paling mendorong kategori teratas
+    teratas, pembanding = penjelasan["teratas"], penjelasan["pembanding"]
+    baris = []
+    for faktor, lr in sorted(penjelasan["log_rasio"].items(), key=lambda x: -x[1]):
+        if math.isinf(lr):
+            teks = (f"hanya sesuai dengan kategori {teratas}, bukan {pembanding}" if lr > 0
+                    else f"tidak sesuai dengan kategori {teratas}")
+        elif abs(lr) < 0.01:
+            teks = f"tidak membedakan {teratas} dan {pembanding}"
+            if faktor == "lingkungan":
+                teks += " (pengaruhnya lewat riwayat penyakit yang sudah diketahui)"
+        elif lr > 0:
+            teks = f"{math.exp(lr):.1f}x lebih mendukung {teratas} dibanding {pembanding}"
+        else:
+            teks = f"{math.exp(-lr):.1f}x lebih mendukung {pembanding} dibanding {teratas}"
+        baris.append((faktor, NAMA_FAKTOR_PENJELASAN[faktor], lr, teks))
+    return baris
+
+
+# FUNGSI GRAFIK PROBABILITAS
+@diukur('generate_prob_chart')
+def generate_prob_chart(hasil):
+    plt = muat_pyplot()
+    labels = list(hasil.keys())
+    values = list(hasil.values())
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    bars = ax.bar(labels, values, color=["#22c55e", "#facc15", "#ef4444"])
+
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("Persentase (%)")
+    ax.set_title("Distribusi Probabilitas Risiko Stunting")
+
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(
+            bar.get_x() + bar.get_width() / 2,
+            height + 1,
+            f"{height:.2f}%",
+            ha="center",
+            fontsize=9
+        )
+
+    plt.tight_layout()
+
+    # Render ke memori, tidak ada file PNG yang tertinggal di /tmp
+    buf = io.BytesIO()
+    plt.savefig(buf, format="png", dpi=150)
+    plt.close()
+    buf.seek(0)
+
+    STATISTIK_IO_GRAFIK["grafik_dirender"] += 1
+    return buf
+
+
+# STATISTIK I/O GRAFIK
+# file_ditulis / byte_ditulis hanya bertambah pada fallback PyFPDF 1.x,
+# dengan fpdf2 keduanya tetap 0 (tidak ada I/O file per laporan)
+STATISTIK_IO_GRAFIK = {"grafik_dirender": 0, "file_ditulis": 0, "byte_ditulis": 0}
+
+# fpdf2 menerima file-like object di pdf.image, PyFPDF 1.x hanya path
+FPDF_TERIMA_BUFFER = int(FPDF_VERSION.split(".")[0]) >= 2
+
+
+def sisipkan_gambar(pdf, png_buffer, **kwargs):
+    if FPDF_TERIMA_BUFFER:
+        pdf.image(png_buffer, **kwargs)
+        return
+
+    data = png_buffer.getvalue()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmpfile:
+        tmpfile.write(data)
+    try:
+        pdf.image(tmpfile.name, **kwargs)
+    finally:
+        os.remove(tmpfile.name)
+
+    STATISTIK_IO_GRAFIK["file_ditulis"] += 1
+    STATISTIK_IO_GRAFIK["byte_ditulis"] += len(data)
+
+
+def pdf_ke_bytes(pdf):
+    # PyFPDF 1.x mengembalikan str latin-1, fpdf2 mengembalikan bytearray
+    hasil = pdf.output(dest="S")
+    if isinstance(hasil, str):
+        return hasil.encode("latin-1")
+    return bytes(hasil)
+
+
+# GRAFIK VEKTOR (PRIMITIF FPDF)
+# Batang digambar langsung di PDF tanpa matplotlib/rasterisasi
+WARNA_GRAFIK_RGB = [(34, 197, 94), (250, 204, 21), (239, 68, 68)]  # #22c55e #facc15 #ef4444
+
+# Renderer grafik PDF: "matplotlib" (PNG) atau "vektor" (primitif FPDF)
+RENDERER_GRAFIK_PDF = os.environ.get("CARESTUNT_GRAFIK_PDF", "matplotlib")
+
+
+def gambar_grafik_vektor(pdf, hasil, x=20, w=170, h=100):
+    y = pdf.get_y()
+    sumbu_x = x + 14               # ruang untuk label sumbu y
+    lebar_plot = w - 18
+    atas = y + 10                  # ruang untuk judul
+    bawah = y + h - 8              # ruang untuk label kategori
+    tinggi_plot = bawah - atas
+
+    # Judul
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", "", 11)
+    judul = "Distribusi Probabilitas Risiko Stunting"
+    pdf.text(x + (w - pdf.get_string_width(judul)) / 2, y + 6, judul)
+
+    # Grid & label sumbu y (0 - 100 %)
+    pdf.set_font("Arial", "", 8)
+    pdf.set_draw_color(220, 220, 220)
+    for persen in range(0, 101, 20):
+        gy = bawah - tinggi_plot * persen / 100
+        pdf.line(sumbu_x, gy, sumbu_x + lebar_plot, gy)
+        label = str(persen)
+        pdf.text(sumbu_x - 2 - pdf.get_string_width(label), gy + 1, label)
+
+    # Batang + nilai persen
+    n = len(hasil)
+    slot = lebar_plot / n
+    lebar_batang = slot * 0.8
+    for i, (label, nilai) in enumerate(hasil.items()):
+        bx = sumbu_x + slot * i + (slot - lebar_batang) / 2
+        tinggi = tinggi_plot * max(0, min(nilai, 100)) / 100
+        pdf.set_fill_color(*WARNA_GRAFIK_RGB[i % len(WARNA_GRAFIK_RGB)])
+        if tinggi > 0:
+            pdf.rect(bx, bawah - tinggi, lebar_batang, tinggi, "F")
+
+        pdf.set_font("Arial", "", 9)
+        teks_nilai = f"{nilai:.2f}%"
+        pdf.text(bx + (lebar_batang - pdf.get_string_width(teks_nilai)) / 2, bawah - tinggi - 1.5, teks_nilai)
+        pdf.text(bx + (lebar_batang - pdf.get_string_width(label)) / 2, bawah + 5, label)
+
+    # Sumbu
+    pdf.set_draw_color(0, 0, 0)
+    pdf.line(sumbu_x, atas, sumbu_x, bawah)
+    pdf.line(sumbu_x, bawah, sumbu_x + lebar_plot, bawah)
+
+    pdf.set_y(y + h)
+
+
+# FUNGSI PDF 
+def tulis_halaman_laporan(pdf, nama, umur, hasil, risiko, renderer=None, ketidakpastian=None,
+                          penjelasan=None):
+    # Menambahkan laporan satu balita (halaman baru) ke dokumen pdf.
+    # ketidakpastian: hasil model.interval_kredibel (opsional)
+    # penjelasan    : penjelasan dari model.inferensi_jelaskan (opsional)
+    renderer = renderer or RENDERER_GRAFIK_PDF
+    pdf.add_page()
+
+    # HEADER
+    pdf.set_fill_color(30, 64, 175)
+    pdf.rect(0, 0, 210, 40, 'F')
+
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 20, "LAPORAN HASIL ANALISIS CARESTUNT", ln=True, align="C")
+    pdf.ln(10)
+
+    # IDENTITAS
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "IDENTITAS BALITA", ln=True)
+
+    pdf.set_font("Arial", "", 11)
+    pdf.cell(40, 8, "Nama Balita", border=1)
+    pdf.cell(0, 8, f" : {nama}", border=1, ln=True)
+
+    pdf.cell(40, 8, "Umur", border=1)
+    pdf.cell(0, 8, f" : {umur} Bulan", border=1, ln=True)
+
+    # HASIL RISIKO
+    pdf.ln(5)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 10, "HASIL ANALISIS RISIKO", ln=True)
+
+    if risiko == "Tinggi":
+        pdf.set_text_color(239, 68, 68)
+    elif risiko == "Sedang":
+        pdf.set_text_color(217, 119, 6)
+    else:
+        pdf.set_text_color(22, 163, 74)
+
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, risiko.upper(), ln=True)
+    pdf.set_text_color(0, 0, 0)
+
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(5)
+
+    # GRAFIK (MATPLOTLIB / VEKTOR)
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 8, "Visualisasi Distribusi Probabilitas:", ln=True)
+    if renderer == "vektor":
+        gambar_grafik_vektor(pdf, hasil, x=20, w=170)
+    else:
+        chart_png = generate_prob_chart(hasil)
+        sisipkan_gambar(pdf, chart_png, x=20, w=170)
+    pdf.ln(5)
+
+    # DETAIL PROBABILITAS
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 8, "Detail Nilai Probabilitas:", ln=True)
+
+    pdf.set_font("Arial", "", 10)
+    for k, v in hasil.items():
+        if ketidakpastian:
+            bawah, atas = ketidakpastian['interval'][k]
+            pdf.cell(0, 6, f"- {k}: {v:.2f}%  (interval kredibel {ketidakpastian['tingkat']:.0%}: "
+                           f"{bawah:.1f}% - {atas:.1f}%)", ln=True)
+        else:
+            pdf.cell(0, 6, f"- {k}: {v:.2f}%", ln=True)
+
+    # INTERPRETASI MODEL
+    pdf.ln(6)
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 8, "Interpretasi Model Bayesian Network:", ln=True)
+
+    confidence = hasil[risiko]
+    sorted_risk = sorted(hasil.items(), key=lambda x: x[1], reverse=True)
+    second_risk, second_val = sorted_risk[1]
+    gap = confidence - second_val
+
+    if ketidakpastian:
+        # Kekuatan = seberapa sering kategori ini tetap teratas saat CPT disampel
+        stabil = ketidakpastian['peluang_teratas'][risiko]
+        if stabil >= 0.95:
+            kekuatan = "sangat kuat"
+        elif stabil >= 0.8:
+            kekuatan = "cukup kuat"
+        else:
+            kekuatan = "relatif lemah dan perlu perhatian"
+        bawah, atas = ketidakpastian['interval'][risiko]
+        dasar = (
+            f"karena kategori ini tetap menjadi yang tertinggi pada {stabil:.0%} sampel CPT "
+            f"(interval kredibel {ketidakpastian['tingkat']:.0%}: {bawah:.1f}% - {atas:.1f}%)."
+        )
+    else:
+        if gap >= 20:
+            kekuatan = "sangat kuat"
+        elif gap >= 10:
+            kekuatan = "cukup kuat"
+        else:
+            kekuatan = "relatif lemah dan perlu perhatian"
+        dasar = "berdasarkan selisih nilai probabilitas."
+
+    interpretasi = (
+        f"Berdasarkan hasil inferensi menggunakan metode Bayesian Network, "
+        f"balita berada pada kategori risiko stunting {risiko} "
+        f"dengan tingkat keyakinan sebesar {confidence:.2f}%. "
+        f"Hasil ini dinilai {kekuatan} dibandingkan kategori risiko lainnya "
+        f"{dasar}"
+    )
+
+    pdf.set_font("Arial", "", 10)
+    pdf.multi_cell(0, 7, interpretasi)
+
+    # KONTRIBUSI FAKTOR
+    if penjelasan:
+        pdf.ln(4)
+        pdf.set_x(pdf.l_margin)
+        pdf.set_font("Arial", "B", 11)
+        pdf.cell(0, 8, f"Mengapa Risiko {risiko}? (Kontribusi Faktor)", ln=True)
+        pdf.set_font("Arial", "", 10)
+        for _, nama_faktor, _, teks in rincian_kontribusi(penjelasan):
+            pdf.set_x(pdf.l_margin)
+            pdf.multi_cell(0, 6, f"- {nama_faktor}: {teks}")
+
+    # REKOMENDASI
+    pdf.ln(6)
+    pdf.set_fill_color(240, 240, 240)
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 8, "REKOMENDASI TINDAKAN", ln=True, fill=True)
+
+    pdf.set_font("Arial", "", 10)
+    for s in get_saran(risiko):
+        # fpdf2 meletakkan kursor di kanan sel setelah multi_cell
+        pdf.set_x(pdf.l_margin)
+        pdf.multi_cell(0, 7, f"- {s}")
+
+
+@diukur('generate_pdf')
+def generate_pdf(nama, umur, hasil, risiko, renderer=None, ketidakpastian=None, penjelasan=None):
+    pdf = FPDF()
+    tulis_halaman_laporan(pdf, nama, umur, hasil, risiko, renderer, ketidakpastian, penjelasan)
+    return pdf_ke_bytes(pdf)
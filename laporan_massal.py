@@ -0,0 +1,191 @@
+"""
+Pembuatan laporan PDF massal untuk satu kohort posyandu.
+
+File kohort berformat data_stunting.csv (boleh ditambah kolom "Nama")
+diskor sekaligus dengan inferensi_batch, lalu rendering PDF dibagi ke
+beberapa proses worker. Setiap worker menyiapkan FPDF/matplotlib sekali
+dan memakainya untuk semua laporan di bagiannya.
+
+Isi tiap laporan sama dengan laporan halaman Diagnosa: interval kredibel
+dan kontribusi faktor (mode penjelasan) ikut ditulis, kecuali untuk baris
+dengan label yang tidak dikenal / umur di luar 0-60 bulan.
+
+Mode:
+    per-anak  : satu file PDF per balita
+    gabungan  : PDF multi-halaman per bagian kohort, lalu semua bagian
+                digabung menjadi satu file laporan_gabungan.pdf (butuh
+                paket 'pypdf' jika kohort lebih dari satu bagian)
+
+Contoh:
+    python laporan_massal.py data_stunting.csv laporan_kohort/
+    python laporan_massal.py registri.csv laporan_kohort/ --mode gabungan --worker 8 --renderer vektor
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd  # type: ignore
+
+from model_stunting import BayesianNetworkStunting, EvidenceBalita, LEVEL_STUNTING
+from skor_massal import KOLOM_WAJIB, siapkan_evidence
+import laporan
+
+# Renderer grafik milik proses worker (diisi oleh _init_worker)
+_RENDERER = None
+
+
+def _format_umur(umur):
+    if pd.isna(umur):
+        return "-"
+    return int(umur) if float(umur).is_integer() else umur
+
+
+def _evidence_baris(umur, pola_makan, riwayat_penyakit, lingkungan):
+    # EvidenceBalita untuk interval & penjelasan, None jika label tidak valid
+    try:
+        return EvidenceBalita.dari_label(None if pd.isna(umur) else float(umur),
+                                         pola_makan, riwayat_penyakit, lingkungan)
+    except ValueError:
+        return None
+
+
+def baca_kohort(path, model=None):
+    # Hasil: list (id, nama, umur, hasil, risiko, ketidakpastian, penjelasan)
+    # siap dirender; ketidakpastian / penjelasan None jika evidence tidak valid
+    model = model or BayesianNetworkStunting()
+    df = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    kurang = [k for k in KOLOM_WAJIB if k not in df.columns]
+    if kurang:
+        raise ValueError(f"Kolom tidak ditemukan di {path}: {', '.join(kurang)}")
+
+    evidence = siapkan_evidence(df)
+    probs, _ = model.inferensi_batch(evidence, marginalkan_kosong=True)
+    nama = df['Nama'] if 'Nama' in df.columns else 'Balita ' + df['ID']
+
+    kohort = []
+    for id_, nama_, umur, pola, riwayat, lingk, baris in zip(
+            df['ID'], nama, evidence['umur_bulan'], evidence['pola_makan'],
+            evidence['riwayat_penyakit'], evidence['lingkungan'], probs.tolist()):
+        hasil = dict(zip(LEVEL_STUNTING, baris))
+        risiko = max(hasil, key=hasil.get)
+        # Interval & penjelasan di-cache model per kombinasi evidence
+        ev = _evidence_baris(umur, pola, riwayat, lingk)
+        ketidakpastian = penjelasan = None
+        if ev is not None:
+            ketidakpastian = model.interval_kredibel(ev)
+            _, _, penjelasan = model.inferensi_jelaskan(ev)
+        kohort.append((id_, nama_, _format_umur(umur), hasil, risiko, ketidakpastian, penjelasan))
+    return kohort
+
+
+def nama_file_laporan(id_, nama):
+    aman = re.sub(r'[^A-Za-z0-9_-]+', '_', str(nama)).strip('_')
+    return f"Laporan_CareStunt_{id_}_{aman}.pdf"
+
+
+def _init_worker(renderer):
+    global _RENDERER
+    _RENDERER = renderer
+    # Pemanasan: font, backend Agg dan struktur FPDF dimuat sekali per worker
+    hasil = dict.fromkeys(LEVEL_STUNTING, 100 / len(LEVEL_STUNTING))
+    laporan.generate_pdf("-", 0, hasil, LEVEL_STUNTING[0], renderer)
+
+
+def _render_per_anak(bagian, folder):
+    n_byte = 0
+    for id_, nama, umur, hasil, risiko, ketidakpastian, penjelasan in bagian:
+        data = laporan.generate_pdf(nama, umur, hasil, risiko, _RENDERER, ketidakpastian, penjelasan)
+        with open(os.path.join(folder, nama_file_laporan(id_, nama)), 'wb') as f:
+            f.write(data)
+        n_byte += len(data)
+    return len(bagian), n_byte
+
+
+def _render_gabungan(bagian, path):
+    pdf = laporan.FPDF()
+    for id_, nama, umur, hasil, risiko, ketidakpastian, penjelasan in bagian:
+        laporan.tulis_halaman_laporan(pdf, nama, umur, hasil, risiko, _RENDERER, ketidakpastian, penjelasan)
+    data = laporan.pdf_ke_bytes(pdf)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(bagian), len(data)
+
+
+def _muat_pdf_writer():
+    try:
+        from pypdf import PdfWriter  # type: ignore
+    except ImportError:
+        raise SystemExit("Mode gabungan membutuhkan paket 'pypdf' (pip install pypdf).")
+    return PdfWriter
+
+
+def _gabung_pdf(paths, path_output):
+    writer = _muat_pdf_writer()()
+    for p in paths:
+        writer.append(p)
+    with open(path_output, 'wb') as f:
+        writer.write(f)
+    for p in paths:
+        os.remove(p)
+
+
+def buat_laporan_massal(path_input, folder_output, mode='per-anak', n_worker=None,
+                        ukuran_bagian=50, renderer=None):
+    os.makedirs(folder_output, exist_ok=True)
+    renderer = renderer or laporan.RENDERER_GRAFIK_PDF
+    n_worker = n_worker or os.cpu_count() or 1
+
+    mulai = time.perf_counter()
+    kohort = baca_kohort(path_input)
+    bagian = [kohort[i:i + ukuran_bagian] for i in range(0, len(kohort), ukuran_bagian)]
+    if mode == 'gabungan' and len(bagian) > 1:
+        _muat_pdf_writer()  # gagal sebelum rendering, bukan setelah semua bagian selesai
+
+    with ProcessPoolExecutor(max_workers=n_worker, initializer=_init_worker,
+                             initargs=(renderer,)) as pool:
+        if mode == 'gabungan':
+            paths = [os.path.join(folder_output, f"laporan_gabungan_{i + 1:04d}.pdf")
+                     for i in range(len(bagian))]
+            hasil = list(pool.map(_render_gabungan, bagian, paths))
+        else:
+            hasil = list(pool.map(_render_per_anak, bagian, [folder_output] * len(bagian)))
+
+    if mode == 'gabungan' and paths:
+        path_gabungan = os.path.join(folder_output, "laporan_gabungan.pdf")
+        if len(paths) > 1:
+            _gabung_pdf(paths, path_gabungan)
+        else:
+            os.replace(paths[0], path_gabungan)  # satu bagian: tidak perlu pypdf
+
+    n_laporan = sum(n for n, _ in hasil)
+    n_byte = sum(b for _, b in hasil)
+    return n_laporan, n_byte, time.perf_counter() - mulai
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Laporan PDF massal CareStunt untuk satu kohort.")
+    parser.add_argument('input', help="file kohort berformat data_stunting.csv (pemisah ';')")
+    parser.add_argument('output', help="folder tujuan laporan PDF")
+    parser.add_argument('--mode', choices=['per-anak', 'gabungan'], default='per-anak')
+    parser.add_argument('--worker', type=int, default=None, help="jumlah proses (default: jumlah core)")
+    parser.add_argument('--ukuran-bagian', type=int, default=50,
+                        help="jumlah balita per tugas worker / per file gabungan")
+    parser.add_argument('--renderer', choices=['matplotlib', 'vektor'], default=None,
+                        help="renderer grafik PDF (default: CARESTUNT_GRAFIK_PDF)")
+    args = parser.parse_args(argv)
+
+    n_laporan, n_byte, durasi = buat_laporan_massal(
+        args.input, args.output, args.mode, args.worker, args.ukuran_bagian, args.renderer
+    )
+    kecepatan = n_laporan / durasi if durasi > 0 else float('inf')
+    print(f"{n_laporan} laporan ({n_byte / 1024:,.0f} KB) dalam {durasi:.2f} detik "
+          f"({kecepatan:,.1f} laporan/detik) -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Layanan HTTP/JSON untuk inferensi BayesianNetworkStunting (tanpa Streamlit).
+
+Endpoint:
+    POST /inferensi  satu objek atau list objek evidence
+                     {"umur_bulan": 24, "pola_makan": "Kurang",
+                      "riwayat_penyakit": "Sering Diare", "lingkungan": "Kurang"}
+                     label divalidasi (400 jika tidak dikenal), null = tidak diketahui
+    GET  /health     status layanan dan panjang antrian
+    GET  /metrics    histogram latensi per endpoint dan ukuran micro-batch
+    GET  /metrics/prometheus  latensi per endpoint dan rentang inferensi
+                     dalam format teks Prometheus
+
+Permintaan yang datang bersamaan dikumpulkan menjadi satu micro-batch
+(jendela beberapa milidetik) sebelum dihitung oleh model.
+
+Contoh:
+    python layanan_api.py --port 8080 --jendela-ms 2 --maks-batch 512
+    python layanan_api.py --cpt cpt/cpt_stunting.npy   # CPT dari file, dimuat ulang otomatis
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np  # type: ignore
+
+from instrumentasi import Histogram, REGISTRI, ke_prometheus, rentang
+from model_stunting import BayesianNetworkStunting, EvidenceBalita, LEVEL_STUNTING
+
+KOLOM_EVIDENCE = ('umur_bulan', 'pola_makan', 'riwayat_penyakit', 'lingkungan')
+
+# Batch sebesar ini atau lebih dihitung dengan inferensi_batch (numpy),
+# di bawahnya lookup tabel terkompilasi per baris lebih cepat
+_BATAS_BATCH_VEKTOR = 256
+
+_STATUS_HTTP = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+_MAKS_BODY = 8 * 1024 * 1024
+
+
+class PenggabungMikroBatch:
+    def __init__(self, model, jendela_ms=2.0, maks_batch=512):
+        self.model = model
+        self.jendela = jendela_ms / 1000
+        self.maks_batch = maks_batch
+        self.antrian = asyncio.Queue()
+        self.ukuran_batch = Histogram(bucket=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+
+    async def hitung(self, daftar_evidence):
+        future = asyncio.get_running_loop().create_future()
+        await self.antrian.put((daftar_evidence, future))
+        return await future
+
+    async def jalankan(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            permintaan = [await self.antrian.get()]
+            n_baris = len(permintaan[0][0])
+            batas_waktu = loop.time() + self.jendela
+
+            # Kumpulkan permintaan lain sampai jendela habis / batch penuh
+            while n_baris < self.maks_batch:
+                sisa = batas_waktu - loop.time()
+                if sisa <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.antrian.get(), sisa)
+                except asyncio.TimeoutError:
+                    break
+                permintaan.append(item)
+                n_baris += len(item[0])
+
+            semua = [ev for daftar, _ in permintaan for ev in daftar]
+            self.ukuran_batch.catat(len(semua))
+            try:
+                with rentang('inferensi_batch_api'):
+                    hasil = self._inferensi(semua)
+            except Exception as e:  # diteruskan ke tiap permintaan
+                for _, future in permintaan:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            awal = 0
+            for daftar, future in permintaan:
+                if not future.done():
+                    future.set_result(hasil[awal:awal + len(daftar)])
+                awal += len(daftar)
+
+    def _inferensi(self, semua):
+        # semua: list EvidenceBalita (sudah divalidasi oleh _validasi)
+        if len(semua) >= _BATAS_BATCH_VEKTOR and all(ev.lengkap() for ev in semua):
+            kode = np.array([ev.kode() for ev in semua], dtype=np.intp)
+            probs, kategori = self.model.inferensi_kode_batch(*kode.T)
+            return [
+                _format_hasil(dict(zip(LEVEL_STUNTING, baris)), kat)
+                for baris, kat in zip(probs.tolist(), kategori)
+            ]
+        return [_format_hasil(*self.model.inferensi_parsial(ev)) for ev in semua]
+
+
+def _format_hasil(posterior, kategori_umur):
+    return {
+        'posterior': posterior,
+        'kategori_umur': kategori_umur,
+        'risiko': max(posterior, key=posterior.get),
+    }
+
+
+def _validasi(data):
+    tunggal = isinstance(data, dict)
+    daftar = [data] if tunggal else data
+    if not isinstance(daftar, list) or not daftar:
+        raise ValueError("body harus berupa objek evidence atau list objek evidence")
+    for i, ev in enumerate(daftar):
+        if not isinstance(ev, dict):
+            raise ValueError(f"item {i} bukan objek")
+        kurang = [k for k in KOLOM_EVIDENCE if k not in ev]
+        if kurang:
+            raise ValueError(f"item {i} tidak memiliki field: {', '.join(kurang)}")
+    # Label dikodekan sekali di sini; null = evidence tidak diketahui (dimarginalkan)
+    evidence = []
+    for i, ev in enumerate(daftar):
+        try:
+            evidence.append(EvidenceBalita.dari_label(*(ev[k] for k in KOLOM_EVIDENCE)))
+        except ValueError as e:
+            raise ValueError(f"item {i}: {e}") from None
+    return evidence, tunggal
+
+
+# Path yang punya histogram latensi sendiri; selebihnya digabung ke 'lainnya'
+# agar jumlah kunci / label tidak membengkak oleh path sembarang dari klien
+RUTE = ('/health', '/metrics', '/metrics/prometheus', '/inferensi')
+
+
+class LayananInferensi:
+    def __init__(self, model=None, jendela_ms=2.0, maks_batch=512):
+        self.model = model or BayesianNetworkStunting()
+        self.batcher = PenggabungMikroBatch(self.model, jendela_ms, maks_batch)
+        self.latensi = {}
+        self.mulai = time.time()
+
+    async def tangani(self, metode, path, body):
+        if path == '/health':
+            return 200, {
+                'status': 'ok',
+                'versi_cpt': self.model.cpt.versi,
+                'uptime_detik': time.time() - self.mulai,
+                'antrian': self.batcher.antrian.qsize(),
+            }
+        if path == '/metrics':
+            return 200, {
+                'latensi_ms': {p: h.ringkasan() for p, h in self.latensi.items()},
+                'ukuran_batch': self.batcher.ukuran_batch.ringkasan(),
+            }
+        if path == '/metrics/prometheus':
+            return 200, ke_prometheus()
+        if path == '/inferensi':
+            if metode != 'POST':
+                return 405, {'error': 'gunakan POST'}
+            try:
+                daftar, tunggal = _validasi(json.loads(body or b'null'))
+            except ValueError as e:  # termasuk JSONDecodeError
+                return 400, {'error': str(e)}
+            hasil = await self.batcher.hitung(daftar)
+            return 200, hasil[0] if tunggal else hasil
+        return 404, {'error': f'path tidak dikenal: {path}'}
+
+    async def koneksi(self, reader, writer):
+        try:
+            while True:
+                try:
+                    kepala = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                mulai = time.perf_counter()
+
+                baris = kepala.decode('latin-1').split('\r\n')
+                metode, path, versi = (baris[0].split(' ') + ['', '', ''])[:3]
+                header = {}
+                for b in baris[1:]:
+                    if ':' in b:
+                        k, v = b.split(':', 1)
+                        header[k.strip().lower()] = v.strip()
+
+                try:
+                    panjang = int(header.get('content-length', 0) or 0)
+                except ValueError:
+                    panjang = -1
+                if panjang < 0:
+                    # Body tidak bisa dibaca dengan aman: jawab lalu tutup koneksi
+                    status, data = 400, {'error': 'content-length tidak valid'}
+                    body = None
+                elif panjang > _MAKS_BODY:
+                    status, data = 413, {'error': 'body terlalu besar'}
+                    body = None
+                else:
+                    body = await reader.readexactly(panjang) if panjang else b''
+                    path = path.split('?', 1)[0]
+                    try:
+                        status, data = await self.tangani(metode, path, body)
+                    except Exception as e:
+                        status, data = 500, {'error': repr(e)}
+
+                tetap_hidup = (versi == 'HTTP/1.1' and header.get('connection', '').lower() != 'close'
+                               and body is not None)
+                if isinstance(data, str):
+                    isi, jenis = data.encode(), 'text/plain; version=0.0.4'
+                else:
+                    isi, jenis = json.dumps(data).encode(), 'application/json'
+                writer.write(
+                    f"HTTP/1.1 {status} {_STATUS_HTTP.get(status, '')}\r\n"
+                    f"Content-Type: {jenis}\r\n"
+                    f"Content-Length: {len(isi)}\r\n"
+                    f"Connection: {'keep-alive' if tetap_hidup else 'close'}\r\n\r\n".encode() + isi
+                )
+                await writer.drain()
+
+                durasi_ms = (time.perf_counter() - mulai) * 1000
+                rute = path if path in RUTE else 'lainnya'
+                self.latensi.setdefault(rute, Histogram()).catat(durasi_ms)
+                REGISTRI.catat('carestunt_http_latensi_ms', durasi_ms, path=rute, status=status)
+                if not tetap_hidup:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        tugas_batch = asyncio.create_task(self.batcher.jalankan())
+        server = await asyncio.start_server(self.koneksi, host, port)
+        print(f"Layanan inferensi CareStunt berjalan di http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            tugas_batch.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP/JSON inferensi risiko stunting.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--jendela-ms', type=float, default=2.0, help="jendela pengumpulan micro-batch")
+    parser.add_argument('--maks-batch', type=int, default=512, help="jumlah baris maksimum per micro-batch")
+    parser.add_argument('--cpt', default=None, help="file CPT (.json / .npy) yang dipantau untuk hot reload")
+    args = parser.parse_args(argv)
+
+    model = None
+    if args.cpt:
+        from penyimpanan_cpt import muat, PengawasCPT
+        model = BayesianNetworkStunting(cpt=muat(args.cpt))
+        PengawasCPT(args.cpt, model).start()
+
+    layanan = LayananInferensi(model, jendela_ms=args.jendela_ms, maks_batch=args.maks_batch)
+    try:
+        asyncio.run(layanan.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
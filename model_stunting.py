@@ -1,72 +1,465 @@
+import itertools
+from enum import IntEnum
+from functools import lru_cache
+
+import numpy as np  # type: ignore
+
+from eliminasi_variabel import Faktor, MesinEliminasi
+
+# =================================================================
+# NILAI TIAP VARIABEL
+# urutan tuple = kode integer yang dipakai pada tabel terkompilasi
+# =================================================================
+LEVEL_STUNTING = ('Rendah', 'Sedang', 'Tinggi')
+KATEGORI_UMUR = ('18-21', '22-25', '26-29', '30-33', '34-36')
+POLA_MAKAN = ('Baik', 'Cukup', 'Kurang')
+RIWAYAT_PENYAKIT = ('Tidak Ada', 'Jarang', 'Sering Infeksi', 'Sering Diare')
+LINGKUNGAN = ('Baik', 'Cukup', 'Kurang')
+
+# Nama variabel jaringan -> daftar nilai (query umum & evidence parsial)
+VARIABEL_JARINGAN = {
+    'Umur': KATEGORI_UMUR,
+    'PolaMakan': POLA_MAKAN,
+    'Penyakit': RIWAYAT_PENYAKIT,
+    'Lingkungan': LINGKUNGAN,
+    'Stunting': LEVEL_STUNTING,
+}
+
+# P(Penyakit Spesifik | Lingkungan)
+CPT_PENYAKIT_GIVEN_LINGKUNGAN = {
+    'Baik':   {'Tidak Ada': 0.85, 'Jarang': 0.10, 'Sering Infeksi': 0.04, 'Sering Diare': 0.01}, 
+    'Cukup':  {'Tidak Ada': 0.40, 'Jarang': 0.40, 'Sering Infeksi': 0.15, 'Sering Diare': 0.05},
+    'Kurang': {'Tidak Ada': 0.05, 'Jarang': 0.15, 'Sering Infeksi': 0.30, 'Sering Diare': 0.50 } 
+}
+
+# P(Stunting | Pola Makan, Riwayat Penyakit Spesifik)
+CPT_STUNTING_GIVEN_FAKTOR_UTAMA = {
+    ('Kurang', 'Sering Diare'):   {'Rendah': 0.00, 'Sedang': 0.05, 'Tinggi': 0.95},
+    ('Kurang', 'Sering Infeksi'): {'Rendah': 0.05, 'Sedang': 0.10, 'Tinggi': 0.85},
+    ('Kurang', 'Jarang'):         {'Rendah': 0.10, 'Sedang': 0.40, 'Tinggi': 0.50},
+    ('Kurang', 'Tidak Ada'):      {'Rendah': 0.20, 'Sedang': 0.60, 'Tinggi': 0.20},
+
+    ('Cukup', 'Sering Diare'):    {'Rendah': 0.05, 'Sedang': 0.25, 'Tinggi': 0.70},
+    ('Cukup', 'Sering Infeksi'):  {'Rendah': 0.10, 'Sedang': 0.40, 'Tinggi': 0.50},
+    ('Cukup', 'Jarang'):          {'Rendah': 0.30, 'Sedang': 0.50, 'Tinggi': 0.20},
+    ('Cukup', 'Tidak Ada'):       {'Rendah': 0.60, 'Sedang': 0.35, 'Tinggi': 0.05},
+
+    ('Baik', 'Sering Diare'):     {'Rendah': 0.20, 'Sedang': 0.50, 'Tinggi': 0.30},
+    ('Baik', 'Sering Infeksi'):   {'Rendah': 0.40, 'Sedang': 0.40, 'Tinggi': 0.20},
+    ('Baik', 'Jarang'):           {'Rendah': 0.70, 'Sedang': 0.25, 'Tinggi': 0.05},
+    ('Baik', 'Tidak Ada'):        {'Rendah': 0.98, 'Sedang': 0.02, 'Tinggi': 0.00},
+}
+
+# P(Stunting | Umur)
+CPT_STUNTING_GIVEN_UMUR = {
+    '18-21': {'Rendah': 0.20, 'Sedang': 0.30, 'Tinggi': 0.50},
+    '22-25': {'Rendah': 0.25, 'Sedang': 0.35, 'Tinggi': 0.40},
+    '26-29': {'Rendah': 0.40, 'Sedang': 0.40, 'Tinggi': 0.20},
+    # Nilai pakar 0.50 / 0.40 / 0.20 (jumlah 1.1) dinormalisasi; rasionya tetap
+    '30-33': {'Rendah': 0.50 / 1.1, 'Sedang': 0.40 / 1.1, 'Tinggi': 0.20 / 1.1},
+    '34-36': {'Rendah': 0.60, 'Sedang': 0.35, 'Tinggi': 0.05}
+}
+
+# Nilai umur (bulan) yang kategorinya disimpan di tabel terkompilasi
+_UMUR_MAKS_TABEL = 60
+
+# Kode integer tiap nilai evidence. Pola makan & lingkungan yang tidak
+# dikenal mendapat kode terakhir (fallback CPT ikut terkompilasi).
+_KODE_POLA = {v: i for i, v in enumerate(POLA_MAKAN)}
+_KODE_RIWAYAT = {v: i for i, v in enumerate(RIWAYAT_PENYAKIT)}
+_KODE_LINGKUNGAN = {v: i for i, v in enumerate(LINGKUNGAN)}
+_KODE_UMUR = {v: i for i, v in enumerate(KATEGORI_UMUR)}
+_KODE_LEVEL = {v: i for i, v in enumerate(LEVEL_STUNTING)}
+# Faktor yang bisa diintervensi (analisis what-if) -> variabel jaringan
+FAKTOR_INTERVENSI = {
+    'pola_makan': 'PolaMakan',
+    'riwayat_penyakit': 'Penyakit',
+    'lingkungan': 'Lingkungan',
+}
+# Suku log-likelihood pada mode penjelasan (urutan = sumbu faktor tabel kontribusi)
+FAKTOR_PENJELASAN = {
+    'pola_makan_riwayat': 'P(Stunting | PolaMakan, Penyakit)',
+    'lingkungan': 'P(Penyakit | Lingkungan)',
+    'umur': 'P(Stunting | Umur)',
+}
+
+_KODE_VARIABEL = {
+    'Umur': _KODE_UMUR,
+    'PolaMakan': _KODE_POLA,
+    'Penyakit': _KODE_RIWAYAT,
+    'Lingkungan': _KODE_LINGKUNGAN,
+    'Stunting': _KODE_LEVEL,
+}
+# Interval kredibel: CPT disampel dari Dirichlet(KONSENTRASI * nilai pakar).
+# Konsentrasi besar = nilai pakar lebih dipercaya (interval lebih sempit).
+KONSENTRASI_DIRICHLET = 50.0
+N_SAMPEL_CPT = 4000
+_TOLERANSI_JUMLAH_CPT = 1e-6
+_POLA_TIDAK_DIKENAL = len(POLA_MAKAN)
+_LINGKUNGAN_TIDAK_DIKENAL = len(LINGKUNGAN)
+
+
+# =================================================================
+# KODE EVIDENCE
+# Nilai evidence sebagai IntEnum (nilai = kode pada tabel terkompilasi),
+# dikodekan sekali di batas input; hilir cukup memakai int kecil.
+# =================================================================
+class _Kode(IntEnum):
+    @property
+    def label(self):
+        return _NILAI_KODE[type(self)][self]
+
+
+class KodeUmur(_Kode):
+    U18_21 = 0
+    U22_25 = 1
+    U26_29 = 2
+    U30_33 = 3
+    U34_36 = 4
+
+
+class KodePola(_Kode):
+    BAIK = 0
+    CUKUP = 1
+    KURANG = 2
+
+
+class KodeRiwayat(_Kode):
+    TIDAK_ADA = 0
+    JARANG = 1
+    SERING_INFEKSI = 2
+    SERING_DIARE = 3
+
+
+class KodeLingkungan(_Kode):
+    BAIK = 0
+    CUKUP = 1
+    KURANG = 2
+
+
+class KodeLevel(_Kode):
+    RENDAH = 0
+    SEDANG = 1
+    TINGGI = 2
+
+
+_NILAI_KODE = {
+    KodeUmur: KATEGORI_UMUR,
+    KodePola: POLA_MAKAN,
+    KodeRiwayat: RIWAYAT_PENYAKIT,
+    KodeLingkungan: LINGKUNGAN,
+    KodeLevel: LEVEL_STUNTING,
+}
+
+
+def _norm_label(teks):
+    # Huruf kecil, spasi tunggal
+    return ' '.join(str(teks).split()).lower()
+
+
+# SATU-SATUNYA tabel label -> kode untuk semua varian label (nilai model,
+# opsi UI, label dataset CSV). Kunci sudah dinormalisasi dengan _norm_label.
+LABEL_EVIDENCE = {
+    'pola_makan': {
+        **{_norm_label(k.label): k for k in KodePola},
+    },
+    'riwayat_penyakit': {
+        **{_norm_label(k.label): k for k in KodeRiwayat},
+        'sering': KodeRiwayat.SERING_INFEKSI,          # opsi UI "Sering"
+        'infeksi': KodeRiwayat.SERING_INFEKSI,
+        'diare': KodeRiwayat.SERING_DIARE,
+    },
+    'lingkungan': {
+        **{_norm_label(k.label): k for k in KodeLingkungan},
+        'bersih': KodeLingkungan.BAIK,                 # label dataset
+        'cukup bersih': KodeLingkungan.CUKUP,
+        'tidak bersih': KodeLingkungan.KURANG,
+    },
+}
+_ENUM_KOLOM = {'pola_makan': KodePola, 'riwayat_penyakit': KodeRiwayat, 'lingkungan': KodeLingkungan}
+_KOLOM_VARIABEL = {'PolaMakan': 'pola_makan', 'Penyakit': 'riwayat_penyakit', 'Lingkungan': 'lingkungan'}
+
+
+@lru_cache(maxsize=1024)
+def _normalisasi_riwayat_teks(teks):
+    kode = LABEL_EVIDENCE['riwayat_penyakit'].get(_norm_label(teks))
+    if kode is not None:
+        return kode.label
+    # Teks bebas di luar tabel: aturan kata kunci lama
+    riwayat_spec = teks.title()
+    if riwayat_spec not in RIWAYAT_PENYAKIT:
+        if "Diare" in riwayat_spec: riwayat_spec = "Sering Diare"
+        elif "Infeksi" in riwayat_spec: riwayat_spec = "Sering Infeksi"
+        elif "Jarang" in riwayat_spec: riwayat_spec = "Jarang"
+        else: riwayat_spec = "Tidak Ada"
+    return riwayat_spec
+
+
+def normalisasi_riwayat(riwayat_penyakit):
+    # Teks bebas riwayat penyakit -> salah satu nilai RIWAYAT_PENYAKIT
+    return _normalisasi_riwayat_teks(str(riwayat_penyakit))
+
+
+def _kosong(nilai):
+    # Evidence yang tidak diisi: None, string kosong atau NaN
+    if nilai is None:
+        return True
+    if isinstance(nilai, str):
+        return not nilai.strip()
+    return isinstance(nilai, float) and nilai != nilai
+
+
+def _kodekan(kolom, fungsi_kode):
+    # Label -> kode integer. fungsi_kode hanya dipanggil sekali per nilai
+    # unik, pemetaan ke seluruh baris dilakukan lewat indexing array.
+    import pandas as pd  # type: ignore
+
+    kode, unik = pd.factorize(pd.Series(kolom, dtype=object), use_na_sentinel=False)
+    peta = np.array([fungsi_kode(v) for v in unik], dtype=np.intp)
+    return peta[kode]
+
+
+def kategori_umur(months):
+    if 18 <= months <= 21: return '18-21'
+    elif 22 <= months <= 25: return '22-25'
+    elif 26 <= months <= 29: return '26-29'
+    elif 30 <= months <= 33: return '30-33'
+    elif 34 <= months <= 36: return '34-36'
+    else: return '30-33'
+
+
+def kode_label(kolom, label):
+    # Validasi di batas input: label (varian apa pun di LABEL_EVIDENCE) -> IntEnum,
+    # None jika kosong. Label yang tidak dikenal -> ValueError.
+    if _kosong(label):
+        return None
+    if isinstance(label, _ENUM_KOLOM[kolom]):
+        return label
+    kode = LABEL_EVIDENCE[kolom].get(_norm_label(label))
+    if kode is None:
+        pilihan = ', '.join(k.label for k in _ENUM_KOLOM[kolom])
+        raise ValueError(f"{kolom} {label!r} tidak dikenal (pilihan: {pilihan})")
+    return kode
+
+
+def _kode_longgar(kolom, label, cadangan):
+    # Untuk data massal: label tak dikenal -> kode cadangan (fallback CPT), tanpa error
+    kode = LABEL_EVIDENCE[kolom].get(_norm_label(label))
+    return cadangan if kode is None else int(kode)
+
+
+def _kode_skalar(peta, kolom, label, cadangan):
+    # Jalur cepat untuk label kanonik; varian lain lewat LABEL_EVIDENCE
+    # (_kode_longgar), sama dengan kodekan_batch
+    kode = peta.get(label)
+    return _kode_longgar(kolom, label, cadangan) if kode is None else kode
+
+
+def kanonik(kolom, label):
+    # Varian label -> label model ('Bersih' -> 'Baik'); label tak dikenal dikembalikan apa adanya
+    kode = LABEL_EVIDENCE[kolom].get(_norm_label(label))
+    return label if kode is None else kode.label
+
+
+class EvidenceBalita:
+    # Evidence satu balita yang sudah dikodekan. Atribut kode berupa IntEnum
+    # (KodeUmur, KodePola, ...) atau None untuk evidence kosong (dimarginalkan).
+    __slots__ = ('umur_bulan', 'umur', 'pola', 'riwayat', 'lingkungan')
+
+    def __init__(self, umur_bulan, umur, pola, riwayat, lingkungan):
+        self.umur_bulan = umur_bulan
+        self.umur = umur
+        self.pola = pola
+        self.riwayat = riwayat
+        self.lingkungan = lingkungan
+
+    @classmethod
+    def dari_label(cls, umur_bulan, pola_makan=None, riwayat_penyakit=None, lingkungan=None):
+        # Satu-satunya jalan dari input mentah (form, JSON, CSV) ke kode
+        if _kosong(umur_bulan):
+            umur_bulan, umur = None, None
+        else:
+            if isinstance(umur_bulan, bool) or not isinstance(umur_bulan, (int, float, np.integer, np.floating)):
+                raise ValueError(f"umur_bulan harus berupa angka, bukan {umur_bulan!r}")
+            if not 0 <= umur_bulan <= _UMUR_MAKS_TABEL:
+                raise ValueError(f"umur_bulan harus di antara 0 dan {_UMUR_MAKS_TABEL}, bukan {umur_bulan}")
+            umur = KodeUmur(_KODE_UMUR[kategori_umur(umur_bulan)])
+        return cls(
+            umur_bulan, umur,
+            kode_label('pola_makan', pola_makan),
+            kode_label('riwayat_penyakit', riwayat_penyakit),
+            kode_label('lingkungan', lingkungan),
+        )
+
+    def kode(self):
+        # (umur, pola, riwayat, lingkungan) sebagai int / None
+        return tuple(None if k is None else int(k) for k in (self.umur, self.pola, self.riwayat, self.lingkungan))
+
+    def lengkap(self):
+        return None not in (self.umur, self.pola, self.riwayat, self.lingkungan)
+
+    def label(self):
+        # Label model per kolom (None untuk evidence kosong), mis. untuk disimpan
+        return {
+            'umur_bulan': self.umur_bulan,
+            'pola_makan': None if self.pola is None else self.pola.label,
+            'riwayat_penyakit': None if self.riwayat is None else self.riwayat.label,
+            'lingkungan': None if self.lingkungan is None else self.lingkungan.label,
+        }
+
+    def __eq__(self, lain):
+        if not isinstance(lain, EvidenceBalita):
+            return NotImplemented
+        return (self.umur_bulan, self.kode()) == (lain.umur_bulan, lain.kode())
+
+    def __hash__(self):
+        return hash((self.umur_bulan, self.kode()))
+
+    def __reduce__(self):
+        return (EvidenceBalita, (self.umur_bulan, self.umur, self.pola, self.riwayat, self.lingkungan))
+
+    def __repr__(self):
+        isi = ', '.join(f"{k}={v!r}" for k, v in self.label().items())
+        return f"EvidenceBalita({isi})"
+
+
+class TabelCPT:
+    # Ketiga CPT sebagai array float64, urutan indeks mengikuti tuple nilai:
+    #   penyakit : [lingkungan, riwayat]             P(Penyakit | Lingkungan)
+    #   utama    : [pola, riwayat, level stunting]   P(Stunting | Pola Makan, Penyakit)
+    #   umur     : [kategori umur, level stunting]   P(Stunting | Umur)
+    # Array boleh berupa view memory-map (lihat penyimpanan_cpt.py).
+    __slots__ = ('penyakit', 'utama', 'umur', 'versi')
+
+    BENTUK = {
+        'penyakit': (len(LINGKUNGAN), len(RIWAYAT_PENYAKIT)),
+        'utama': (len(POLA_MAKAN), len(RIWAYAT_PENYAKIT), len(LEVEL_STUNTING)),
+        'umur': (len(KATEGORI_UMUR), len(LEVEL_STUNTING)),
+    }
+
+    def __init__(self, penyakit, utama, umur, versi=1):
+        for nama, arr in (('penyakit', penyakit), ('utama', utama), ('umur', umur)):
+            arr = np.asarray(arr, dtype=np.float64)
+            if arr.shape != self.BENTUK[nama]:
+                raise ValueError(f"CPT {nama} harus berukuran {self.BENTUK[nama]}, bukan {arr.shape}")
+            if not np.all(np.isfinite(arr)) or np.any(arr < 0):
+                raise ValueError(f"CPT {nama} berisi nilai negatif atau bukan angka")
+            # Setiap baris distribusi bersyarat harus berjumlah 1
+            jumlah = arr.sum(axis=-1)
+            salah = np.argwhere(~np.isclose(jumlah, 1.0, rtol=0, atol=_TOLERANSI_JUMLAH_CPT))
+            if len(salah):
+                baris = tuple(int(i) for i in salah[0])
+                raise ValueError(f"baris CPT {nama} {baris} berjumlah {float(jumlah[baris]):.6g}, harus 1")
+            setattr(self, nama, arr)
+        self.versi = int(versi)
+
+    @classmethod
+    def dari_dict(cls, penyakit, utama, umur, versi=1):
+        try:
+            return cls(
+                [[penyakit[l][r] for r in RIWAYAT_PENYAKIT] for l in LINGKUNGAN],
+                [[[utama[(p, r)][s] for s in LEVEL_STUNTING] for r in RIWAYAT_PENYAKIT] for p in POLA_MAKAN],
+                [[umur[u][s] for s in LEVEL_STUNTING] for u in KATEGORI_UMUR],
+                versi,
+            )
+        except KeyError as e:
+            raise ValueError(f"CPT tidak lengkap, entri {e} tidak ada") from None
+
+    @classmethod
+    def bawaan(cls):
+        # Nilai pakar yang tertulis di modul ini
+        return cls.dari_dict(CPT_PENYAKIT_GIVEN_LINGKUNGAN, CPT_STUNTING_GIVEN_FAKTOR_UTAMA,
+                             CPT_STUNTING_GIVEN_UMUR)
+
+    def ke_dict(self):
+        return {
+            'penyakit': {l: dict(zip(RIWAYAT_PENYAKIT, map(float, self.penyakit[i])))
+                         for i, l in enumerate(LINGKUNGAN)},
+            'utama': {(p, r): dict(zip(LEVEL_STUNTING, map(float, self.utama[i, j])))
+                      for i, p in enumerate(POLA_MAKAN) for j, r in enumerate(RIWAYAT_PENYAKIT)},
+            'umur': {u: dict(zip(LEVEL_STUNTING, map(float, self.umur[i])))
+                     for i, u in enumerate(KATEGORI_UMUR)},
+        }
+
+
 class BayesianNetworkStunting:
-    def __init__(self):
-        pass
+    def __init__(self, compiled=True, cpt=None):
+        # compiled=True : seluruh posterior dihitung sekali di sini,
+        # inferensi cukup satu lookup ke tabel datar
+        # cpt           : TabelCPT (mis. hasil muat dari file), default nilai pakar
+        self.compiled = compiled
+        self.cpt = cpt if cpt is not None else TabelCPT.bawaan()
+        self.generasi_cpt = 0  # bertambah setiap ganti_cpt, dipakai sebagai kunci cache
+        if compiled:
+            self._kompilasi()
+
+    def ganti_cpt(self, cpt):
+        # Hot reload: tabel baru dibangun penuh lebih dulu, lalu referensinya
+        # ditukar. Satu panggilan inferensi hanya membaca satu tabel, jadi
+        # tidak pernah melihat campuran CPT lama dan baru.
+        baru = BayesianNetworkStunting(compiled=self.compiled, cpt=cpt)
+        if self.compiled:
+            self._tabel_np = baru._tabel_np
+            self._tabel = baru._tabel
+        self.cpt = cpt
+        self.generasi_cpt += 1
+
+    def mesin_inferensi(self):
+        # Mesin variable elimination untuk CPT yang sedang aktif, dibangun
+        # ulang otomatis setelah ganti_cpt. Faktor:
+        #   P(Stunting | PolaMakan, Penyakit) * P(Penyakit | Lingkungan) * P(Stunting | Umur)
+        # Umur, PolaMakan dan Lingkungan tanpa prior (seragam).
+        cpt, mesin = getattr(self, '_mesin_ve', (None, None))
+        if cpt is not self.cpt:
+            cpt = self.cpt
+            mesin = MesinEliminasi(
+                [
+                    Faktor(('PolaMakan', 'Penyakit', 'Stunting'), cpt.utama),
+                    Faktor(('Lingkungan', 'Penyakit'), cpt.penyakit),
+                    Faktor(('Umur', 'Stunting'), cpt.umur),
+                ],
+                {nama: len(nilai) for nama, nilai in VARIABEL_JARINGAN.items()},
+            )
+            self._mesin_ve = (cpt, mesin)
+        return mesin
 
     def get_cpt_penyakit_given_lingkungan(self, lingkungan, penyakit_specific):
         # P(Penyakit Spesifik | Lingkungan)
-        cpt = {
-            'Baik':   {'Tidak Ada': 0.85, 'Jarang': 0.10, 'Sering Infeksi': 0.04, 'Sering Diare': 0.01}, 
-            'Cukup':  {'Tidak Ada': 0.40, 'Jarang': 0.40, 'Sering Infeksi': 0.15, 'Sering Diare': 0.05},
-            'Kurang': {'Tidak Ada': 0.05, 'Jarang': 0.15, 'Sering Infeksi': 0.30, 'Sering Diare': 0.50 } 
-        }
-        return cpt.get(lingkungan, {}).get(penyakit_specific, 0.25)
+        i = _KODE_LINGKUNGAN.get(lingkungan)
+        j = _KODE_RIWAYAT.get(penyakit_specific)
+        if i is None or j is None:
+            return 0.25
+        return float(self.cpt.penyakit[i, j])
 
     def get_cpt_stunting_given_faktor_utama(self, pola_makan, penyakit_specific, stunting):
         # P(Stunting | Pola Makan, Riwayat Penyakit Spesifik)
-        key = (pola_makan, penyakit_specific)
-        
-        cpt = {
-            ('Kurang', 'Sering Diare'):   {'Rendah': 0.00, 'Sedang': 0.05, 'Tinggi': 0.95},
-            ('Kurang', 'Sering Infeksi'): {'Rendah': 0.05, 'Sedang': 0.10, 'Tinggi': 0.85},
-            ('Kurang', 'Jarang'):         {'Rendah': 0.10, 'Sedang': 0.40, 'Tinggi': 0.50},
-            ('Kurang', 'Tidak Ada'):      {'Rendah': 0.20, 'Sedang': 0.60, 'Tinggi': 0.20},
-
-            ('Cukup', 'Sering Diare'):    {'Rendah': 0.05, 'Sedang': 0.25, 'Tinggi': 0.70},
-            ('Cukup', 'Sering Infeksi'):  {'Rendah': 0.10, 'Sedang': 0.40, 'Tinggi': 0.50},
-            ('Cukup', 'Jarang'):          {'Rendah': 0.30, 'Sedang': 0.50, 'Tinggi': 0.20},
-            ('Cukup', 'Tidak Ada'):       {'Rendah': 0.60, 'Sedang': 0.35, 'Tinggi': 0.05},
-
-            ('Baik', 'Sering Diare'):     {'Rendah': 0.20, 'Sedang': 0.50, 'Tinggi': 0.30},
-            ('Baik', 'Sering Infeksi'):   {'Rendah': 0.40, 'Sedang': 0.40, 'Tinggi': 0.20},
-            ('Baik', 'Jarang'):           {'Rendah': 0.70, 'Sedang': 0.25, 'Tinggi': 0.05},
-            ('Baik', 'Tidak Ada'):        {'Rendah': 0.98, 'Sedang': 0.02, 'Tinggi': 0.00},
-        }
-        return cpt.get(key, {'Rendah':0.33, 'Sedang':0.33, 'Tinggi':0.33}).get(stunting, 0)
+        s = _KODE_LEVEL.get(stunting)
+        if s is None:
+            return 0
+        i = _KODE_POLA.get(pola_makan)
+        j = _KODE_RIWAYAT.get(penyakit_specific)
+        if i is None or j is None:
+            return 0.33
+        return float(self.cpt.utama[i, j, s])
 
     def get_cpt_stunting_given_umur(self, umur_bin, stunting):
         # P(Stunting | Umur)
-        cpt = {
-            '18-21': {'Rendah': 0.20, 'Sedang': 0.30, 'Tinggi': 0.50},
-            '22-25': {'Rendah': 0.25, 'Sedang': 0.35, 'Tinggi': 0.40},
-            '26-29': {'Rendah': 0.40, 'Sedang': 0.40, 'Tinggi': 0.20},
-            '30-33': {'Rendah': 0.50, 'Sedang': 0.40, 'Tinggi': 0.20},
-            '34-36': {'Rendah': 0.60, 'Sedang': 0.35, 'Tinggi': 0.05}
-        }
-        return cpt.get(umur_bin, {'Rendah':0.33, 'Sedang':0.33, 'Tinggi':0.33}).get(stunting, 0)
+        s = _KODE_LEVEL.get(stunting)
+        if s is None:
+            return 0
+        u = _KODE_UMUR.get(umur_bin)
+        if u is None:
+            return 0.33
+        return float(self.cpt.umur[u, s])
 
     def get_age_category(self, months):
-        if 18 <= months <= 21: return '18-21'
-        elif 22 <= months <= 25: return '22-25'
-        elif 26 <= months <= 29: return '26-29'
-        elif 30 <= months <= 33: return '30-33'
-        elif 34 <= months <= 36: return '34-36'
-        else: return '30-33'
+        return kategori_umur(months)
 
     
-    def inferensi(self, umur_bulan, pola_makan, riwayat_penyakit, lingkungan):
-        riwayat_spec = str(riwayat_penyakit).title()
-        
-        valid_keys = ["Tidak Ada", "Jarang", "Sering Diare", "Sering Infeksi"]
-        if riwayat_spec not in valid_keys:
-            if "Diare" in riwayat_spec: riwayat_spec = "Sering Diare"
-            elif "Infeksi" in riwayat_spec: riwayat_spec = "Sering Infeksi"
-            elif "Jarang" in riwayat_spec: riwayat_spec = "Jarang"
-            else: riwayat_spec = "Tidak Ada"
-
-        age_cat = self.get_age_category(umur_bulan)
+    def _hitung_posterior(self, age_cat, pola_makan, riwayat_spec, lingkungan):
         scores = {}
         
-        for level_stunting in ['Rendah', 'Sedang', 'Tinggi']:
+        for level_stunting in LEVEL_STUNTING:
             
             # P(Penyakit Spesifik | Lingkungan)
             prob_penyakit = self.get_cpt_penyakit_given_lingkungan(lingkungan, riwayat_spec)
@@ -82,12 +475,437 @@ class BayesianNetworkStunting:
         # Normalisasi
         total_score = sum(scores.values())
         if total_score == 0:
-            return {k: 0 for k in scores}, age_cat
+            return {k: 0 for k in scores}
             
         for k in scores:
             scores[k] = (scores[k] / total_score) * 100
             
-        return scores, age_cat
+        return scores
+
+    def _kompilasi(self):
+        n_pola = len(POLA_MAKAN) + 1
+        n_riwayat = len(RIWAYAT_PENYAKIT)
+        n_lingkungan = len(LINGKUNGAN) + 1
+        self._stride = (n_pola * n_riwayat * n_lingkungan, n_riwayat * n_lingkungan, n_lingkungan)
+
+        pola_list = POLA_MAKAN + (None,)
+        lingkungan_list = LINGKUNGAN + (None,)
+
+        # Tabel datar: indeks = umur*s0 + pola*s1 + riwayat*s2 + lingkungan
+        tabel = []
+        for age_cat in KATEGORI_UMUR:
+            for pola in pola_list:
+                for riwayat in RIWAYAT_PENYAKIT:
+                    for lingk in lingkungan_list:
+                        scores = self._hitung_posterior(age_cat, pola, riwayat, lingk)
+                        tabel.append(tuple(scores[k] for k in LEVEL_STUNTING))
+        self._tabel = tuple(tabel)
+
+        # Kategori umur untuk umur bulat 0.._UMUR_MAKS_TABEL
+        self._kode_umur_bulan = tuple(
+            _KODE_UMUR[self.get_age_category(m)] for m in range(_UMUR_MAKS_TABEL + 1)
+        )
+
+        # Versi array untuk inferensi_batch, dibuat di sini agar seluruh
+        # status model read-only setelah konstruksi (aman dibagi antar thread)
+        self._tabel_np = None
+        self._tabel_array()
+
+    def _indeks_umur(self, umur_bulan):
+        if type(umur_bulan) is int and 0 <= umur_bulan <= _UMUR_MAKS_TABEL:
+            return self._kode_umur_bulan[umur_bulan]
+        return _KODE_UMUR[self.get_age_category(umur_bulan)]
+
+    def _tabel_array(self):
+        # Posterior seluruh kombinasi evidence sebagai array
+        # (umur, pola, riwayat, lingkungan, level stunting)
+        if getattr(self, '_tabel_np', None) is None:
+            if self.compiled:
+                tabel = self._tabel
+            else:
+                tabel = [
+                    tuple(self._hitung_posterior(age_cat, pola, riwayat, lingk)[k] for k in LEVEL_STUNTING)
+                    for age_cat in KATEGORI_UMUR
+                    for pola in POLA_MAKAN + (None,)
+                    for riwayat in RIWAYAT_PENYAKIT
+                    for lingk in LINGKUNGAN + (None,)
+                ]
+            bentuk = (len(KATEGORI_UMUR), len(POLA_MAKAN) + 1, len(RIWAYAT_PENYAKIT),
+                      len(LINGKUNGAN) + 1, len(LEVEL_STUNTING))
+            tabel_np = np.array(tabel, dtype=np.float64).reshape(bentuk)
+            tabel_np.flags.writeable = False
+            self._tabel_np = tabel_np
+        return self._tabel_np
+
+    def kode_umur_batch(self, umur_bulan):
+        # Versi vektor dari get_age_category, menghasilkan indeks KATEGORI_UMUR
+        m = np.asarray(umur_bulan, dtype=np.float64)
+        kondisi = [
+            (18 <= m) & (m <= 21),
+            (22 <= m) & (m <= 25),
+            (26 <= m) & (m <= 29),
+            (30 <= m) & (m <= 33),
+            (34 <= m) & (m <= 36),
+        ]
+        return np.select(kondisi, [0, 1, 2, 3, 4], default=_KODE_UMUR['30-33'])
+
+    def inferensi(self, umur_bulan, pola_makan, riwayat_penyakit, lingkungan):
+        riwayat_spec = normalisasi_riwayat(riwayat_penyakit)
+
+        if not self.compiled:
+            age_cat = self.get_age_category(umur_bulan)
+            hasil = self._hitung_posterior(age_cat, kanonik('pola_makan', pola_makan), riwayat_spec,
+                                           kanonik('lingkungan', lingkungan))
+            return hasil, age_cat
+
+        # Label dikodekan seperti kodekan_batch, sehingga hasil identik dengan inferensi_batch
+        s0, s1, s2 = self._stride
+        i_umur = self._indeks_umur(umur_bulan)
+        idx = (
+            i_umur * s0
+            + _kode_skalar(_KODE_POLA, 'pola_makan', pola_makan, _POLA_TIDAK_DIKENAL) * s1
+            + _KODE_RIWAYAT[riwayat_spec] * s2
+            + _kode_skalar(_KODE_LINGKUNGAN, 'lingkungan', lingkungan, _LINGKUNGAN_TIDAK_DIKENAL)
+        )
+        return dict(zip(LEVEL_STUNTING, self._tabel[idx])), KATEGORI_UMUR[i_umur]
+
+    def _kode_label(self, variabel, label):
+        if variabel in _KOLOM_VARIABEL:
+            return int(kode_label(_KOLOM_VARIABEL[variabel], label))
+        if variabel == 'Umur' and not isinstance(label, str):
+            return self._indeks_umur(label)
+        kode = _KODE_VARIABEL[variabel].get(label)
+        if kode is None:
+            raise ValueError(f"nilai {label!r} tidak dikenal untuk variabel {variabel}")
+        return kode
+
+    def query(self, variabel, evidence=None):
+        # Distribusi posterior satu variabel jaringan, mis.
+        #   model.query('Penyakit', {'Stunting': 'Tinggi'})
+        # evidence: dict nama variabel -> label (Umur boleh berupa bulan).
+        # Evidence kosong (None / '') dimarginalkan. Hasil: dict nilai ->
+        # peluang dalam persen (0-100), seperti inferensi / inferensi_batch.
+        if variabel not in VARIABEL_JARINGAN:
+            raise ValueError(f"variabel tidak dikenal: {variabel}")
+        evidence = {k: v for k, v in (evidence or {}).items() if not _kosong(v)}
+        for k in evidence:
+            if k not in VARIABEL_JARINGAN:
+                raise ValueError(f"variabel evidence tidak dikenal: {k}")
+        if variabel in evidence:
+            raise ValueError(f"variabel {variabel} tidak boleh sekaligus menjadi evidence")
+
+        kode = {k: self._kode_label(k, v) for k, v in evidence.items()}
+        dist = self.mesin_inferensi().posterior((variabel,), kode)
+        return dict(zip(VARIABEL_JARINGAN[variabel], (dist * 100).tolist()))
+
+    def _evidence(self, umur_bulan, pola_makan, riwayat_penyakit, lingkungan):
+        # EvidenceBalita apa adanya, atau dikodekan (dan divalidasi) dari label
+        if isinstance(umur_bulan, EvidenceBalita):
+            return umur_bulan
+        return EvidenceBalita.dari_label(umur_bulan, pola_makan, riwayat_penyakit, lingkungan)
+
+    def inferensi_parsial(self, umur_bulan=None, pola_makan=None, riwayat_penyakit=None, lingkungan=None):
+        # Seperti inferensi(), tetapi evidence boleh kosong (None / '') dan
+        # label divalidasi (ValueError jika tidak dikenal). Argumen pertama
+        # boleh berupa EvidenceBalita. Evidence lengkap memakai tabel terkompilasi.
+        ev = self._evidence(umur_bulan, pola_makan, riwayat_penyakit, lingkungan)
+        if ev.lengkap():
+            if not self.compiled:
+                label = ev.label()
+                return self.inferensi(label['umur_bulan'], label['pola_makan'],
+                                      label['riwayat_penyakit'], label['lingkungan'])
+            s0, s1, s2 = self._stride
+            idx = ev.umur * s0 + ev.pola * s1 + ev.riwayat * s2 + ev.lingkungan
+            return dict(zip(LEVEL_STUNTING, self._tabel[idx])), KATEGORI_UMUR[ev.umur]
+
+        kode = {variabel: int(k) for variabel, k in zip(('Umur', 'PolaMakan', 'Penyakit', 'Lingkungan'),
+                                                         (ev.umur, ev.pola, ev.riwayat, ev.lingkungan))
+                if k is not None}
+        dist = self.mesin_inferensi().posterior(('Stunting',), kode)
+        scores = dict(zip(LEVEL_STUNTING, (dist * 100).tolist()))
+        return scores, None if ev.umur is None else KATEGORI_UMUR[ev.umur]
+
+    def _tabel_diperluas(self):
+        # Posterior (persen) seluruh grid evidence, termasuk evidence kosong:
+        # bentuk (umur, pola, penyakit, lingkungan, level stunting) dengan
+        # indeks terakhir tiap sumbu evidence = tidak diketahui (dimarginalkan).
+        # Dibangun sekali per CPT dari rencana variable elimination.
+        cpt, tabel, hasil = getattr(self, '_intervensi', (None, None, None))
+        if cpt is self.cpt:
+            return tabel, hasil
+
+        cpt, mesin = self.cpt, self.mesin_inferensi()
+        nama = ('Umur', 'PolaMakan', 'Penyakit', 'Lingkungan')
+        kard = [len(VARIABEL_JARINGAN[v]) for v in nama]
+        tabel = np.empty([k + 1 for k in kard] + [len(LEVEL_STUNTING)])
+        for diamati in itertools.product((True, False), repeat=len(nama)):
+            idx = tuple(slice(0, k) if d else k for k, d in zip(kard, diamati))
+            if all(diamati):
+                tabel[idx] = self._tabel_array()[:, :kard[1], :, :kard[3]]  # jalur terkompilasi
+            else:
+                obs = tuple(v for v, d in zip(nama, diamati) if d)
+                tabel[idx] = mesin.rencana(('Stunting',), obs) * 100
+        tabel.flags.writeable = False
+        self._intervensi = (cpt, tabel, {})
+        return tabel, self._intervensi[2]
+
+    def analisis_intervensi(self, umur_bulan, pola_makan=None, riwayat_penyakit=None, lingkungan=None,
+                            level='Tinggi', maks_perubahan=2, hanya_perbaikan=False):
+        # What-if: semua intervensi satu faktor dan pasangan faktor (pola makan,
+        # riwayat penyakit, lingkungan) dihitung sekaligus dari grid evidence.
+        # Hasil: list dict diurutkan dari penurunan risiko `level` terbesar:
+        #   {'perubahan': {'pola_makan': ('Kurang', 'Cukup')},
+        #    'posterior': {...}, 'delta': -12.3}   # delta dalam poin persen
+        # Evidence kosong (None / '') dimarginalkan dan argumen pertama boleh
+        # berupa EvidenceBalita, seperti inferensi_parsial.
+        # hanya_perbaikan=True: hanya perubahan ke nilai yang lebih baik (urutan
+        # nilai tiap faktor dari terbaik ke terburuk) atau mengisi evidence kosong.
+        tabel, cache = self._tabel_diperluas()
+        ev = self._evidence(umur_bulan, pola_makan, riwayat_penyakit, lingkungan)
+        kode = tuple(len(nilai) if k is None else k for k, nilai in zip(
+            ev.kode(), (KATEGORI_UMUR, POLA_MAKAN, RIWAYAT_PENYAKIT, LINGKUNGAN)))
+        kunci = (kode, level, maks_perubahan, hanya_perbaikan)
+        hasil = cache.get(kunci)
+        if hasil is None:
+            hasil = cache[kunci] = self._hitung_intervensi(
+                tabel, kode, _KODE_LEVEL[level], maks_perubahan, hanya_perbaikan)
+        return hasil
+
+    @staticmethod
+    def _hitung_intervensi(tabel, kode, j_level, maks_perubahan, hanya_perbaikan):
+        i_umur, kode_faktor = kode[0], kode[1:]
+        nilai = [VARIABEL_JARINGAN[v] for v in FAKTOR_INTERVENSI.values()]
+
+        # Kandidat per faktor: semua nilai yang dikenal (+ nilai sekarang jika kosong)
+        kandidat = [np.arange(len(n)) if k < len(n) else np.append(np.arange(len(n)), k)
+                    for n, k in zip(nilai, kode_faktor)]
+        grid = tabel[i_umur][np.ix_(*kandidat)]             # (pola, penyakit, lingkungan, level)
+        sekarang = tabel[(i_umur,) + kode_faktor]
+
+        def sumbu(a, x):
+            return x.reshape([-1 if a == b else 1 for b in range(3)])
+
+        berubah = sum(sumbu(a, k != lama) for a, (k, lama) in enumerate(zip(kandidat, kode_faktor)))
+        delta = grid[..., j_level] - sekarang[j_level]
+        pilih = (berubah >= 1) & (berubah <= maks_perubahan)
+        if hanya_perbaikan:
+            for a, (k, lama) in enumerate(zip(kandidat, kode_faktor)):
+                pilih &= sumbu(a, k <= lama)  # kode kosong = len(nilai), selalu lebih besar
+
+        posisi = np.argwhere(pilih)
+        d, n = delta[pilih], berubah[pilih]
+        urutan = np.lexsort((n, d))  # penurunan terbesar dulu, lalu perubahan paling sedikit
+
+        hasil = []
+        for i in urutan.tolist():
+            perubahan = {}
+            for (faktor, n_nilai), cand, kode_lama, p in zip(
+                    zip(FAKTOR_INTERVENSI, nilai), kandidat, kode_faktor, posisi[i]):
+                baru = int(cand[p])
+                if baru != kode_lama:
+                    lama = n_nilai[kode_lama] if kode_lama < len(n_nilai) else None
+                    perubahan[faktor] = (lama, n_nilai[baru])
+            hasil.append({
+                'perubahan': perubahan,
+                'posterior': dict(zip(LEVEL_STUNTING, grid[tuple(posisi[i])].tolist())),
+                'delta': float(d[i]),
+            })
+        return hasil
+
+    def _tabel_kontribusi(self):
+        # Log tiap suku rantai Bayesian Network untuk seluruh grid evidence:
+        # bentuk (umur, pola, penyakit, lingkungan, faktor, level stunting),
+        # indeks terakhir tiap sumbu evidence = tidak diketahui (dijumlahkan,
+        # prior seragam seperti mesin VE). Jumlah suku = log skor tak
+        # ternormalisasi, sehingga posterior langsung didapat dari tabel ini.
+        # Riwayat penyakit kosong: suku utama = log sum_r utama * sum_l penyakit,
+        # suku lingkungan = selisih log skor saat lingkungan diketahui.
+        # Dibangun sekali per CPT; nilai pakar 0 -> -inf.
+        cpt, tabel, hasil = getattr(self, '_kontribusi', (None, None, None))
+        if cpt is self.cpt:
+            return tabel, hasil
+
+        cpt = self.cpt
+        utama = np.concatenate([cpt.utama, cpt.utama.sum(axis=0, keepdims=True)])              # (pola, riwayat, level)
+        penyakit = np.concatenate([cpt.penyakit, cpt.penyakit.sum(axis=0, keepdims=True)])   # (lingkungan, riwayat)
+        umur = np.concatenate([cpt.umur, cpt.umur.sum(axis=0, keepdims=True)])               # (umur, level)
+        bentuk = (umur.shape[0], utama.shape[0], utama.shape[1] + 1, penyakit.shape[0],
+                  len(FAKTOR_PENJELASAN), len(LEVEL_STUNTING))
+
+        tabel = np.empty(bentuk)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tabel[:, :, :-1, :, 0] = np.log(utama)[None, :, :, None, :]
+            tabel[:, :, :-1, :, 1] = np.log(penyakit).T[None, None, :, :, None]
+            gabung = np.log(np.einsum('prk,lr->plk', utama, penyakit))    # (pola, lingkungan, level)
+            dasar = gabung[:, -1:]                                         # lingkungan kosong
+            tabel[:, :, -1, :, 0] = dasar[None]
+            tabel[:, :, -1, :, 1] = np.where(np.isneginf(dasar), 0.0, gabung - dasar)[None]
+            tabel[..., 2, :] = np.log(umur)[:, None, None, None, :]
+        tabel.flags.writeable = False
+        self._kontribusi = (cpt, tabel, {})
+        return tabel, self._kontribusi[2]
+
+    def inferensi_jelaskan(self, umur_bulan=None, pola_makan=None, riwayat_penyakit=None, lingkungan=None):
+        # Mode penjelasan: posterior seperti inferensi_parsial beserta kontribusi
+        # log-likelihood tiap faktor, dari satu lookup ke tabel kontribusi
+        # (posterior = normalisasi exp(jumlah suku), tanpa inferensi kedua).
+        # Hasil: (scores, kategori umur, penjelasan) dengan
+        #   penjelasan = {
+        #     'kontribusi': {'pola_makan_riwayat': {'Rendah': -2.3, ...}, 'lingkungan': {...}, 'umur': {...}},
+        #     'log_skor': {'Rendah': ..., ...},        # jumlah suku per level
+        #     'teratas': 'Tinggi', 'pembanding': 'Sedang',
+        #     'log_rasio': {'pola_makan_riwayat': 2.1, ...},  # suku[teratas] - suku[pembanding]
+        #   }
+        # Jumlah log_rasio = log(posterior teratas / posterior pembanding);
+        # faktor dengan log_rasio terbesar paling mendorong kategori teratas.
+        # Log natural; -inf = nilai CPT 0 (level mustahil menurut faktor itu).
+        tabel, cache = self._tabel_kontribusi()
+        ev = self._evidence(umur_bulan, pola_makan, riwayat_penyakit, lingkungan)
+        kode = tuple(len(nilai) if k is None else k for k, nilai in zip(
+            ev.kode(), (KATEGORI_UMUR, POLA_MAKAN, RIWAYAT_PENYAKIT, LINGKUNGAN)))
+        hasil = cache.get(kode)
+        if hasil is None:
+            hasil = cache[kode] = self._hitung_penjelasan(tabel[kode])
+        scores, penjelasan = hasil
+        return dict(scores), None if ev.umur is None else KATEGORI_UMUR[ev.umur], penjelasan
+
+    @staticmethod
+    def _hitung_penjelasan(suku):
+        # suku: (faktor, level) -> (scores persen, dict penjelasan)
+        log_skor = suku.sum(axis=0)
+        puncak = log_skor.max()
+        if np.isneginf(puncak):
+            post = np.zeros_like(log_skor)
+        else:
+            skor = np.exp(log_skor - puncak)
+            post = skor / skor.sum() * 100
+
+        urutan = np.argsort(-post, kind='stable')
+        teratas, pembanding = int(urutan[0]), int(urutan[1])
+        with np.errstate(invalid='ignore'):
+            rasio = suku[:, teratas] - suku[:, pembanding]
+        rasio = np.where(np.isnan(rasio), 0.0, rasio)  # -inf - -inf: faktor tidak membedakan
+
+        penjelasan = {
+            'kontribusi': {f: dict(zip(LEVEL_STUNTING, baris.tolist()))
+                           for f, baris in zip(FAKTOR_PENJELASAN, suku)},
+            'log_skor': dict(zip(LEVEL_STUNTING, log_skor.tolist())),
+            'teratas': LEVEL_STUNTING[teratas],
+            'pembanding': LEVEL_STUNTING[pembanding],
+            'log_rasio': dict(zip(FAKTOR_PENJELASAN, rasio.tolist())),
+        }
+        return dict(zip(LEVEL_STUNTING, post.tolist())), penjelasan
+
+    def _sampel_cpt(self, n_sampel, konsentrasi, seed):
+        # n_sampel set CPT sekaligus: setiap baris CPT ~ Dirichlet(konsentrasi *
+        # baris pakar), lewat Gamma lalu normalisasi (semua baris dalam satu
+        # operasi array). Nilai pakar 0 tetap 0. Disimpan per CPT aktif.
+        kunci = (self.cpt, n_sampel, konsentrasi, seed)
+        simpanan = getattr(self, '_ketidakpastian', None)
+        if simpanan is not None and simpanan[0] == kunci:
+            return simpanan[1], simpanan[2]
+
+        rng = np.random.default_rng(seed)
+        sampel = []
+        for arr in (self.cpt.utama, self.cpt.penyakit, self.cpt.umur):
+            alpha = konsentrasi * arr / arr.sum(axis=-1, keepdims=True)
+            g = rng.standard_gamma(alpha, size=(n_sampel,) + arr.shape)
+            sampel.append(g / g.sum(axis=-1, keepdims=True))
+        self._ketidakpastian = (kunci, tuple(sampel), {})
+        return self._ketidakpastian[1], self._ketidakpastian[2]
+
+    @staticmethod
+    def _posterior_sampel(sampel, kode):
+        # Posterior Stunting untuk setiap set CPT: (n_sampel, level).
+        # kode None = evidence kosong, dijumlahkan (prior seragam seperti mesin VE).
+        utama, penyakit, umur = sampel
+        i_umur, i_pola, i_riwayat, i_lingkungan = kode
+        f_umur = umur.sum(axis=1) if i_umur is None else umur[:, i_umur]                    # (S, level)
+        f_utama = utama.sum(axis=1) if i_pola is None else utama[:, i_pola]               # (S, riwayat, level)
+        f_penyakit = penyakit.sum(axis=1) if i_lingkungan is None else penyakit[:, i_lingkungan]  # (S, riwayat)
+        if i_riwayat is None:
+            skor = np.einsum('srk,sr->sk', f_utama, f_penyakit)
+        else:
+            skor = f_utama[:, i_riwayat] * f_penyakit[:, i_riwayat, None]
+        skor = skor * f_umur
+        total = skor.sum(axis=1, keepdims=True)
+        return np.divide(skor, total, out=np.zeros_like(skor), where=total > 0)
+
+    def interval_kredibel(self, umur_bulan, pola_makan=None, riwayat_penyakit=None, lingkungan=None, tingkat=0.9,
+                          n_sampel=N_SAMPEL_CPT, konsentrasi=KONSENTRASI_DIRICHLET, seed=0):
+        # Ketidakpastian posterior akibat ketidakpastian nilai CPT pakar.
+        # Hasil (persen), di-cache per kombinasi evidence:
+        #   {'interval': {'Rendah': (bawah, atas), ...},   # interval kredibel `tingkat`
+        #    'peluang_teratas': {'Rendah': 0.02, ...},     # fraksi sampel level ini terbesar
+        #    'tingkat': 0.9, 'n_sampel': 4000}
+        # Evidence kosong (None / '') dimarginalkan dan argumen pertama boleh
+        # berupa EvidenceBalita, seperti inferensi_parsial.
+        sampel, cache = self._sampel_cpt(n_sampel, konsentrasi, seed)
+        kode = self._evidence(umur_bulan, pola_makan, riwayat_penyakit, lingkungan).kode()
+        kunci = (kode, tingkat)
+        hasil = cache.get(kunci)
+        if hasil is None:
+            post = self._posterior_sampel(sampel, kode) * 100
+            ekor = (1 - tingkat) / 2
+            batas = np.quantile(post, (ekor, 1 - ekor), axis=0)
+            teratas = np.bincount(post.argmax(axis=1), minlength=len(LEVEL_STUNTING)) / n_sampel
+            hasil = cache[kunci] = {
+                'interval': {level: (float(batas[0, j]), float(batas[1, j]))
+                             for j, level in enumerate(LEVEL_STUNTING)},
+                'peluang_teratas': dict(zip(LEVEL_STUNTING, teratas.tolist())),
+                'tingkat': tingkat,
+                'n_sampel': n_sampel,
+            }
+        return hasil
+
+    def kodekan_batch(self, data):
+        # Kolom evidence -> 4 array kode integer (umur, pola, riwayat, lingkungan).
+        # Pola makan / lingkungan yang tidak dikenal mendapat kode
+        # len(POLA_MAKAN) / len(LINGKUNGAN).
+        umur = self.kode_umur_batch(data['umur_bulan'])
+        pola = _kodekan(data['pola_makan'], lambda v: _kode_longgar('pola_makan', v, _POLA_TIDAK_DIKENAL))
+        riwayat = _kodekan(data['riwayat_penyakit'], lambda v: _KODE_RIWAYAT[normalisasi_riwayat(v)])
+        lingkungan = _kodekan(data['lingkungan'],
+                              lambda v: _kode_longgar('lingkungan', v, _LINGKUNGAN_TIDAK_DIKENAL))
+        return umur, pola, riwayat, lingkungan
+
+    def kosong_batch(self, data):
+        # 4 mask boolean (umur, pola, riwayat, lingkungan): True = evidence
+        # tidak diisi (umur NaN, '' / None / NaN)
+        return [np.isnan(np.asarray(data['umur_bulan'], dtype=np.float64))] + [
+            _kodekan(data[k], _kosong).astype(bool) for k in ('pola_makan', 'riwayat_penyakit', 'lingkungan')]
+
+    def inferensi_batch(self, data, marginalkan_kosong=False):
+        # data: DataFrame / dict kolom 'umur_bulan', 'pola_makan',
+        # 'riwayat_penyakit', 'lingkungan'.
+        # Hasil: matriks N x 3 (urutan LEVEL_STUNTING, dalam persen) dan
+        # array kategori umur, identik dengan inferensi() per baris.
+        # marginalkan_kosong=True: baris dengan evidence kosong (umur NaN,
+        # '' / None / NaN) dimarginalkan seperti inferensi_parsial, lewat grid
+        # evidence diperluas; kategori umurnya None jika umur kosong. Pada
+        # baris itu label yang tidak dikenal juga dimarginalkan. Baris lengkap
+        # tetap identik dengan inferensi().
+        kode = self.kodekan_batch(data)
+        probs, kategori = self.inferensi_kode_batch(*kode)
+        if not marginalkan_kosong:
+            return probs, kategori
+
+        kosong = self.kosong_batch(data)
+        baris = np.flatnonzero(np.logical_or.reduce(kosong))
+        if len(baris):
+            tabel, _ = self._tabel_diperluas()
+            kard = (len(KATEGORI_UMUR), len(POLA_MAKAN), len(RIWAYAT_PENYAKIT), len(LINGKUNGAN))
+            # Kode tak dikenal (pola / lingkungan) = indeks terakhir grid = dimarginalkan
+            idx = tuple(np.where(k[baris], n, np.minimum(c[baris], n)) for c, k, n in zip(kode, kosong, kard))
+            probs = probs.copy()
+            probs[baris] = tabel[idx]
+            kategori[kosong[0]] = None
+        return probs, kategori
+
+    def inferensi_kode_batch(self, umur, pola, riwayat, lingkungan):
+        # Seperti inferensi_batch, langsung dari array kode (mis. EvidenceBalita.kode())
+        probs = self._tabel_array()[umur, pola, riwayat, lingkungan]
+        return probs, np.array(KATEGORI_UMUR, dtype=object)[umur]
     
     
 # =================================================================
@@ -117,6 +935,8 @@ P(Total) = P(Stunting|Utama) * P(Penyakit|Lingkungan) * P(Stunting|Umur)
 
 2. Buat object modelnya:
    model = BayesianNetworkStunting()
+   (semua posterior langsung dikompilasi ke tabel; pakai
+    BayesianNetworkStunting(compiled=False) untuk menghitung CPT tiap panggilan)
 
 3. Siapkan data input dari form user :
    - Umur: Integer 
@@ -124,6 +944,13 @@ P(Total) = P(Stunting|Utama) * P(Penyakit|Lingkungan) * P(Stunting|Umur)
    - Riwayat Penyakit: String "Tidak Ada", "Jarang", "Sering Diare", atau "Sering Infeksi"
    - Lingkungan: String persis "Baik", "Cukup", atau "Kurang"
 
+   Input dari form / API sebaiknya dikodekan sekali (sekaligus divalidasi,
+   ValueError jika label tidak dikenal) menjadi EvidenceBalita. Semua varian
+   label ("Sering", "Bersih", "Tidak Bersih", huruf kecil, ...) ada di
+   satu tabel LABEL_EVIDENCE; None = tidak diketahui (dimarginalkan):
+    ev = EvidenceBalita.dari_label(24, "Kurang", "Sering", "Tidak Bersih")
+    hasil_diagnosa, kategori_umur = model.inferensi_parsial(ev)
+
 4. Panggil fungsi prediksi:
     contoh
     hasil_diagnosa, kategori_umur = model.inferensi(24, "Kurang", "Sering Diare", "Kurang")
@@ -131,6 +958,30 @@ P(Total) = P(Stunting|Utama) * P(Penyakit|Lingkungan) * P(Stunting|Umur)
 5. Contoh Output 'hasil_diagnosa' yang akan kamu terima:
    {'Rendah': 1.5, 'Sedang': 8.5, 'Tinggi': 90.0}
 
+   Untuk banyak balita sekaligus (DataFrame kolom umur_bulan, pola_makan,
+   riwayat_penyakit, lingkungan):
+    probs, kategori = model.inferensi_batch(df)
+   probs berukuran N x 3 dengan urutan kolom LEVEL_STUNTING.
+
+   Simulasi perbaikan (what-if) satu / dua faktor, diurutkan dari
+   penurunan risiko Tinggi terbesar:
+    saran = model.analisis_intervensi(24, "Kurang", "Sering Diare", "Kurang", hanya_perbaikan=True)
+    saran[0]  # {'perubahan': {'pola_makan': ('Kurang', 'Baik'), ...}, 'posterior': {...}, 'delta': -95.6}
+
+   Interval kredibel 90% tiap level (CPT disampel dari Dirichlet di sekitar
+   nilai pakar) dan fraksi sampel di mana tiap level menjadi yang terbesar:
+    ci = model.interval_kredibel(24, "Kurang", "Sering Diare", "Kurang")
+    ci['interval']['Tinggi']         # (bawah, atas) dalam persen
+    ci['peluang_teratas']['Tinggi']  # mis. 0.99
+
+   Mode penjelasan: posterior + kontribusi log tiap faktor (pola makan x
+   riwayat penyakit, lingkungan, umur) per level, dari satu lookup:
+    hasil, kategori, pj = model.inferensi_jelaskan(24, "Kurang", "Sering Diare", "Kurang")
+    pj['log_rasio']  # {'pola_makan_riwayat': 2.94, 'lingkungan': 0.0, 'umur': 0.13}
+   log_rasio = seberapa kuat faktor mendukung kategori teratas dibanding
+   kategori kedua (exp(2.94) ~ 19x); lingkungan 0 karena pengaruhnya lewat
+   riwayat penyakit yang sudah diketahui.
+
 6. Cara menampilkan di Web:
    Ambil nilai terbesar dari dictionary tersebut untuk menentukan label akhir.
    Contoh logic tampilan:
@@ -0,0 +1,416 @@
+"""
+Pelacakan risiko stunting per balita dari kunjungan ke kunjungan.
+
+Model: HMM sederhana di atas CPT yang sudah ada.
+    - status tersembunyi : level stunting (Rendah / Sedang / Tinggi)
+    - transisi per bulan : MATRIKS_TRANSISI (risiko cenderung bertahan),
+                           dipangkatkan dengan selisih umur antar kunjungan
+    - emisi              : posterior satu kunjungan dari BayesianNetworkStunting
+                           (prior seragam, jadi sebanding dengan likelihood)
+    belief_t ∝ (belief_{t-1} · T^selang) * posterior_kunjungan_t
+
+Setiap balita menyimpan belief terakhir di tabel status_anak, sehingga
+kunjungan baru hanya butuh satu langkah filter (bukan skor ulang seluruh
+riwayat). Kunjungan yang datang terlambat (umur lebih kecil dari kunjungan
+terakhir) hanya memfilter ulang kunjungan sesudahnya. Kunjungan dengan umur
+yang sama untuk balita yang sama menggantikan kunjungan lama (diagnosa yang
+dikirim ulang tidak menghitung observasi yang sama dua kali).
+
+Contoh:
+    python pelacakan_anak.py tambah pelacakan_anak.db kunjungan_posyandu.csv
+    python pelacakan_anak.py tren pelacakan_anak.db --risiko Tinggi --tren naik
+    python pelacakan_anak.py anak pelacakan_anak.db A-0012
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np  # type: ignore
+
+from model_stunting import BayesianNetworkStunting, LEVEL_STUNTING, _kosong
+from riwayat_diagnosa import buka_koneksi
+
+# Peluang pindah level stunting dalam satu bulan (baris = asal)
+MATRIKS_TRANSISI = (
+    (0.90, 0.08, 0.02),
+    (0.07, 0.86, 0.07),
+    (0.02, 0.08, 0.90),
+)
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS kunjungan (
+    id               INTEGER PRIMARY KEY,
+    id_anak          TEXT    NOT NULL,
+    umur_bulan       REAL    NOT NULL,
+    waktu            TEXT    NOT NULL,
+    pola_makan       TEXT,
+    riwayat_penyakit TEXT,
+    lingkungan       TEXT,
+    p_rendah         REAL    NOT NULL,   -- posterior kunjungan (persen)
+    p_sedang         REAL    NOT NULL,
+    p_tinggi         REAL    NOT NULL,
+    f_rendah         REAL    NOT NULL,   -- hasil filter (persen)
+    f_sedang         REAL    NOT NULL,
+    f_tinggi         REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_kunjungan_anak ON kunjungan (id_anak, umur_bulan, id);
+
+CREATE TABLE IF NOT EXISTS status_anak (
+    id_anak          TEXT    PRIMARY KEY,
+    umur_terakhir    REAL    NOT NULL,
+    b_rendah         REAL    NOT NULL,
+    b_sedang         REAL    NOT NULL,
+    b_tinggi         REAL    NOT NULL,
+    b_tinggi_sebelum REAL,
+    risiko           TEXT    NOT NULL,
+    tren             TEXT    NOT NULL,   -- naik / turun / tetap / baru
+    n_kunjungan      INTEGER NOT NULL,
+    diperbarui       TEXT    NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_status_risiko ON status_anak (risiko, tren, b_tinggi);
+"""
+
+_KOLOM_KUNJUNGAN = ('id', 'umur_bulan', 'waktu', 'pola_makan', 'riwayat_penyakit', 'lingkungan',
+                    'p_rendah', 'p_sedang', 'p_tinggi', 'f_rendah', 'f_sedang', 'f_tinggi')
+_KOLOM_STATUS = ('id_anak', 'umur_terakhir', 'b_rendah', 'b_sedang', 'b_tinggi', 'b_tinggi_sebelum',
+                 'risiko', 'tren', 'n_kunjungan', 'diperbarui')
+
+_SQL_KUNJUNGAN = (
+    "INSERT INTO kunjungan (id_anak, umur_bulan, waktu, pola_makan, riwayat_penyakit, lingkungan,"
+    " p_rendah, p_sedang, p_tinggi, f_rendah, f_sedang, f_tinggi)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_STATUS = f"INSERT OR REPLACE INTO status_anak ({', '.join(_KOLOM_STATUS)}) VALUES ({', '.join('?' * 10)})"
+
+
+class PelacakAnak:
+    def __init__(self, path, model=None, transisi=MATRIKS_TRANSISI, ambang_tren=5.0, maks_selang=60):
+        self.model = model or BayesianNetworkStunting()
+        self.ambang_tren = ambang_tren
+        self.kon = buka_koneksi(path)
+        self.kon.executescript(SKEMA)
+        self._kunci = threading.Lock()  # satu koneksi dipakai bersama thread sesi Streamlit
+
+        # T^k untuk selang 0..maks_selang bulan, dihitung sekali
+        t = np.asarray(transisi, dtype=np.float64)
+        self._transisi = np.stack([np.linalg.matrix_power(t, k) for k in range(maks_selang + 1)])
+
+    # LANGKAH FILTER
+    def _posterior_kunjungan(self, umur_bulan, pola_makan, riwayat_penyakit, lingkungan):
+        hasil, _ = self.model.inferensi_parsial(umur_bulan, pola_makan, riwayat_penyakit, lingkungan)
+        return np.array([hasil[k] for k in LEVEL_STUNTING]) / 100
+
+    def _langkah(self, belief, selang, posterior):
+        # belief None = kunjungan pertama (prior seragam)
+        if belief is None:
+            prior = np.full(len(LEVEL_STUNTING), 1 / len(LEVEL_STUNTING))
+        else:
+            k = min(max(int(round(selang)), 0), len(self._transisi) - 1)
+            prior = belief @ self._transisi[k]
+        baru = prior * posterior
+        total = baru.sum()
+        return baru / total if total > 0 else prior
+
+    def _tren(self, sebelum, sesudah):
+        if sebelum is None:
+            return 'baru'
+        selisih = sesudah - sebelum
+        if selisih >= self.ambang_tren:
+            return 'naik'
+        if selisih <= -self.ambang_tren:
+            return 'turun'
+        return 'tetap'
+
+    def _status(self, id_anak):
+        baris = self.kon.execute(
+            f"SELECT {', '.join(_KOLOM_STATUS)} FROM status_anak WHERE id_anak = ?", (id_anak,)
+        ).fetchone()
+        return dict(zip(_KOLOM_STATUS, baris)) if baris else None
+
+    def _baris_status(self, id_anak, umur, belief, b_tinggi_sebelum, n_kunjungan, waktu):
+        b = (belief * 100).tolist()
+        return (id_anak, umur, *b, b_tinggi_sebelum, LEVEL_STUNTING[int(np.argmax(belief))],
+                self._tren(b_tinggi_sebelum, b[2]), n_kunjungan, waktu)
+
+    # PEMBARUAN
+    def tambah_kunjungan(self, id_anak, umur_bulan, pola_makan=None, riwayat_penyakit=None,
+                         lingkungan=None, hasil=None, waktu=None):
+        # Satu kunjungan baru; hasil (opsional) = posterior kunjungan (persen)
+        # yang sudah dihitung. Kembali: status balita setelah kunjungan ini.
+        waktu = waktu or time.strftime('%Y-%m-%d %H:%M:%S')
+        if hasil is None:
+            posterior = self._posterior_kunjungan(umur_bulan, pola_makan, riwayat_penyakit, lingkungan)
+        else:
+            posterior = np.array([hasil[k] for k in LEVEL_STUNTING]) / 100
+        with self._kunci:
+            return self._tambah_kunjungan(id_anak, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,
+                                          posterior, waktu)
+
+    def _tambah_kunjungan(self, id_anak, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,
+                          posterior, waktu):
+        with self.kon:
+            # Kunci tulis diambil sebelum status dibaca: aman jika beberapa
+            # proses (peluncur pre-fork) mencatat balita yang sama bersamaan
+            self.kon.execute("BEGIN IMMEDIATE")
+            status = self._status(id_anak)
+            if status is None or umur_bulan > status['umur_terakhir']:
+                # Kasus umum: cukup satu langkah dari belief terakhir
+                belief_lama = None if status is None else np.array(
+                    [status['b_rendah'], status['b_sedang'], status['b_tinggi']]) / 100
+                selang = 0 if status is None else umur_bulan - status['umur_terakhir']
+                belief = self._langkah(belief_lama, selang, posterior)
+                self.kon.execute(_SQL_KUNJUNGAN, (
+                    id_anak, umur_bulan, waktu, pola_makan, riwayat_penyakit, lingkungan,
+                    *(posterior * 100).tolist(), *(belief * 100).tolist()))
+                self.kon.execute(_SQL_STATUS, self._baris_status(
+                    id_anak, umur_bulan, belief, None if status is None else status['b_tinggi'],
+                    1 if status is None else status['n_kunjungan'] + 1, waktu))
+            else:
+                self._sisipkan_lama(id_anak, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,
+                                    posterior, status, waktu)
+        return self._status(id_anak)
+
+    def _sisipkan_lama(self, id_anak, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,
+                       posterior, status, waktu):
+        # Kunjungan pada / sebelum umur terakhir: kunjungan lama dengan umur
+        # yang sama diganti, lalu filter ulang mulai dari umur itu
+        dihapus = self.kon.execute(
+            "DELETE FROM kunjungan WHERE id_anak = ? AND umur_bulan = ?", (id_anak, umur_bulan)).rowcount
+        self.kon.execute(_SQL_KUNJUNGAN, (
+            id_anak, umur_bulan, waktu, pola_makan, riwayat_penyakit, lingkungan,
+            *(posterior * 100).tolist(), 0.0, 0.0, 0.0))
+        self._filter_ulang(id_anak, umur_bulan, status['n_kunjungan'] + 1 - dihapus, waktu)
+
+    def _filter_ulang(self, id_anak, umur_mulai, n_kunjungan, waktu):
+        # Kunjungan terlambat: filter ulang mulai dari kunjungan sebelum umur_mulai
+        sebelum = self.kon.execute(
+            "SELECT umur_bulan, f_rendah, f_sedang, f_tinggi FROM kunjungan"
+            " WHERE id_anak = ? AND umur_bulan < ? ORDER BY umur_bulan DESC, id DESC LIMIT 1",
+            (id_anak, umur_mulai),
+        ).fetchone()
+        belief = None if sebelum is None else np.array(sebelum[1:]) / 100
+        umur_lalu = None if sebelum is None else sebelum[0]
+
+        sisa = self.kon.execute(
+            "SELECT id, umur_bulan, p_rendah, p_sedang, p_tinggi FROM kunjungan"
+            " WHERE id_anak = ? AND umur_bulan >= ? ORDER BY umur_bulan, id",
+            (id_anak, umur_mulai),
+        ).fetchall()
+        pembaruan, b_tinggi_sebelum = [], None
+        for id_, umur, *p in sisa:
+            b_tinggi_sebelum = None if belief is None else belief[2] * 100
+            belief = self._langkah(belief, 0 if umur_lalu is None else umur - umur_lalu, np.array(p) / 100)
+            pembaruan.append((*(belief * 100).tolist(), id_))
+            umur_lalu = umur
+        self.kon.executemany(
+            "UPDATE kunjungan SET f_rendah = ?, f_sedang = ?, f_tinggi = ? WHERE id = ?", pembaruan)
+        self.kon.execute(_SQL_STATUS, self._baris_status(
+            id_anak, umur_lalu, belief, b_tinggi_sebelum, n_kunjungan, waktu))
+
+    def _status_banyak(self, daftar_anak, ukuran=500):
+        # Status terakhir banyak balita sekaligus (query IN per potongan)
+        hasil = {}
+        for i in range(0, len(daftar_anak), ukuran):
+            potong = daftar_anak[i:i + ukuran]
+            baris = self.kon.execute(
+                f"SELECT {', '.join(_KOLOM_STATUS)} FROM status_anak"
+                f" WHERE id_anak IN ({', '.join('?' * len(potong))})", potong,
+            ).fetchall()
+            hasil.update((b[0], dict(zip(_KOLOM_STATUS, b))) for b in baris)
+        return hasil
+
+    def tambah_batch(self, id_anak, umur_bulan, posterior, evidence=None, waktu=None):
+        with self._kunci:
+            return self._tambah_batch(id_anak, umur_bulan, posterior, evidence, waktu)
+
+    def _tambah_batch(self, id_anak, umur_bulan, posterior, evidence, waktu):
+        # Banyak kunjungan sekaligus (registri): posterior N x 3 (persen) dari
+        # inferensi_batch. Kunjungan diurutkan per balita; langkah filter ke-r
+        # dijalankan serentak untuk semua balita (vektor), mulai dari status
+        # terakhir masing-masing. Satu transaksi untuk semua.
+        waktu = waktu or time.strftime('%Y-%m-%d %H:%M:%S')
+        evidence = evidence or {}
+        kolom_ev = [list(evidence.get(k, [None] * len(id_anak)))
+                    for k in ('pola_makan', 'riwayat_penyakit', 'lingkungan')]
+
+        try:
+            umur = np.asarray(umur_bulan, dtype=np.float64)
+        except (TypeError, ValueError):
+            umur = np.array([np.nan if _kosong(u) else float(u) for u in umur_bulan], dtype=np.float64)
+        posterior = np.asarray(posterior, dtype=np.float64) / 100
+        ids = np.asarray(id_anak, dtype=object).astype(str)
+        valid = np.flatnonzero(~np.isnan(umur))
+        urutan = valid[np.lexsort((umur[valid], ids[valid]))]
+        # Beberapa kunjungan balita yang sama pada umur yang sama: yang
+        # terakhir di input dipakai (lexsort stabil)
+        if len(urutan) > 1:
+            sama = (ids[urutan][1:] == ids[urutan][:-1]) & (umur[urutan][1:] == umur[urutan][:-1])
+            urutan = urutan[np.append(~sama, True)]
+
+        anak_unik, awal, inv = np.unique(ids[urutan], return_index=True, return_inverse=True)
+
+        with self.kon:
+            # Status dibaca di dalam transaksi tulis yang sama (seperti
+            # _tambah_kunjungan): proses lain tidak bisa menyela di antaranya
+            self.kon.execute("BEGIN IMMEDIATE")
+            status = self._status_banyak(anak_unik.tolist())
+            kunjungan, status_baru, terlambat = self._filter_batch(
+                anak_unik, inv, urutan, ids, umur, posterior, kolom_ev, status, waktu)
+            self.kon.executemany(_SQL_KUNJUNGAN, kunjungan)
+            self.kon.executemany(_SQL_STATUS, status_baru)
+            for i in urutan[terlambat].tolist():
+                self._sisipkan_lama(ids[i], float(umur[i]), kolom_ev[0][i], kolom_ev[1][i], kolom_ev[2][i],
+                                    posterior[i], self._status(ids[i]), waktu)
+        return len(urutan)
+
+    def _filter_batch(self, anak_unik, inv, urutan, ids, umur, posterior, kolom_ev, status, waktu):
+        # Langkah filter vektor untuk _tambah_batch. Hasil: baris kunjungan &
+        # status baru, serta mask kunjungan (urutan) yang perlu filter ulang
+        n_level = len(LEVEL_STUNTING)
+
+        # Keadaan per balita: belief, umur & peluang Tinggi terakhir, jumlah kunjungan
+        n_anak = len(anak_unik)
+        belief = np.full((n_anak, n_level), np.nan)
+        umur_akhir = np.full(n_anak, -np.inf)
+        tinggi_sebelum = np.full(n_anak, np.nan)
+        n_kunjungan = np.zeros(n_anak, dtype=np.int64)
+        for j, anak in enumerate(anak_unik.tolist()):
+            s = status.get(anak)
+            if s is not None:
+                belief[j] = (s['b_rendah'] / 100, s['b_sedang'] / 100, s['b_tinggi'] / 100)
+                umur_akhir[j] = s['umur_terakhir']
+                n_kunjungan[j] = s['n_kunjungan']
+
+        # Kunjungan tidak lebih baru dari status tersimpan (terlambat atau
+        # mengganti kunjungan pada umur yang sama) -> filter ulang per balita
+        terlambat = umur[urutan] <= umur_akhir[inv]
+        tepat, inv_tepat = urutan[~terlambat], inv[~terlambat]
+        peringkat = np.arange(len(tepat)) - np.searchsorted(inv_tepat, inv_tepat)
+
+        hasil_filter = np.zeros((len(tepat), n_level))
+        seragam = np.full(n_level, 1 / n_level)
+        for r in range(int(peringkat.max()) + 1 if len(tepat) else 0):
+            sel = np.flatnonzero(peringkat == r)
+            anak, baris = inv_tepat[sel], tepat[sel]
+            lama = belief[anak]
+            baru_anak = np.isnan(lama[:, 0])
+            k = np.clip(np.rint(umur[baris] - umur_akhir[anak]), 0, len(self._transisi) - 1)
+            k = np.where(baru_anak, 0, k).astype(np.int64)
+            prior = np.einsum('ci,cij->cj', np.where(baru_anak[:, None], seragam, lama), self._transisi[k])
+            prior[baru_anak] = seragam
+            b = prior * posterior[baris]
+            total = b.sum(axis=1, keepdims=True)
+            b = np.where(total > 0, b / np.where(total > 0, total, 1), prior)
+
+            hasil_filter[sel] = b
+            tinggi_sebelum[anak] = lama[:, 2] * 100
+            belief[anak] = b
+            umur_akhir[anak] = umur[baris]
+            n_kunjungan[anak] += 1
+
+        daftar_id, daftar_umur = ids.tolist(), umur.tolist()
+        p_persen, f_persen = (posterior[tepat] * 100).tolist(), (hasil_filter * 100).tolist()
+        kunjungan = [
+            (daftar_id[i], daftar_umur[i], waktu, kolom_ev[0][i], kolom_ev[1][i], kolom_ev[2][i], *p, *f)
+            for i, p, f in zip(tepat.tolist(), p_persen, f_persen)
+        ]
+        diperbarui = np.unique(inv_tepat)
+        status_baru = [
+            self._baris_status(anak_unik[j], float(umur_akhir[j]), belief[j],
+                               None if np.isnan(tinggi_sebelum[j]) else float(tinggi_sebelum[j]),
+                               int(n_kunjungan[j]), waktu)
+            for j in diperbarui.tolist()
+        ]
+        return kunjungan, status_baru, terlambat
+
+    def tambah_dari_csv(self, path, chunksize=100_000, kolom_id='ID Anak'):
+        # File berformat data_stunting.csv + kolom id balita (default "ID Anak")
+        import pandas as pd  # type: ignore
+        from skor_massal import siapkan_evidence
+
+        n = 0
+        for chunk in pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str,
+                                 keep_default_na=False, chunksize=chunksize):
+            if kolom_id not in chunk:
+                raise ValueError(f"Kolom '{kolom_id}' tidak ditemukan di {path}")
+            evidence = siapkan_evidence(chunk)
+            probs, _ = self.model.inferensi_batch(evidence, marginalkan_kosong=True)
+            n += self.tambah_batch(
+                chunk[kolom_id].tolist(), evidence['umur_bulan'].tolist(), probs,
+                {k: evidence[k].tolist() for k in ('pola_makan', 'riwayat_penyakit', 'lingkungan')},
+            )
+        return n
+
+    # PEMBACAAN
+    def riwayat(self, id_anak):
+        # Semua kunjungan satu balita (urut umur) beserta posterior mentah & hasil filter
+        with self._kunci:
+            baris = self.kon.execute(
+                f"SELECT {', '.join(_KOLOM_KUNJUNGAN)} FROM kunjungan WHERE id_anak = ?"
+                " ORDER BY umur_bulan, id", (id_anak,),
+            ).fetchall()
+        return [dict(zip(_KOLOM_KUNJUNGAN, b)) for b in baris]
+
+    def status(self, id_anak):
+        with self._kunci:
+            return self._status(id_anak)
+
+    def daftar_tren(self, risiko=None, tren=None, n=50):
+        # Balita dengan status terakhir tertentu, peluang Tinggi terbesar dulu
+        syarat, param = [], []
+        if risiko:
+            syarat.append("risiko = ?")
+            param.append(risiko)
+        if tren:
+            syarat.append("tren = ?")
+            param.append(tren)
+        sql = f"SELECT {', '.join(_KOLOM_STATUS)} FROM status_anak"
+        if syarat:
+            sql += " WHERE " + " AND ".join(syarat)
+        sql += " ORDER BY b_tinggi DESC LIMIT ?"
+        with self._kunci:
+            baris = self.kon.execute(sql, param + [n]).fetchall()
+        return [dict(zip(_KOLOM_STATUS, b)) for b in baris]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pelacakan risiko stunting per balita antar kunjungan.")
+    sub = parser.add_subparsers(dest='perintah', required=True)
+
+    p_tambah = sub.add_parser('tambah', help="tambahkan kunjungan dari file CSV")
+    p_tambah.add_argument('db')
+    p_tambah.add_argument('input', nargs='+')
+    p_tambah.add_argument('--kolom-id', default='ID Anak')
+
+    p_tren = sub.add_parser('tren', help="daftar balita menurut risiko / tren terakhir")
+    p_tren.add_argument('db')
+    p_tren.add_argument('--risiko', choices=LEVEL_STUNTING, default=None)
+    p_tren.add_argument('--tren', choices=['naik', 'turun', 'tetap', 'baru'], default=None)
+    p_tren.add_argument('--n', type=int, default=20)
+
+    p_anak = sub.add_parser('anak', help="riwayat kunjungan satu balita")
+    p_anak.add_argument('db')
+    p_anak.add_argument('id_anak')
+    args = parser.parse_args(argv)
+
+    pelacak = PelacakAnak(args.db)
+    if args.perintah == 'tambah':
+        for path in args.input:
+            mulai = time.perf_counter()
+            n = pelacak.tambah_dari_csv(path, kolom_id=args.kolom_id)
+            print(f"{path}: {n} kunjungan dalam {time.perf_counter() - mulai:.2f} detik")
+    elif args.perintah == 'tren':
+        for s in pelacak.daftar_tren(args.risiko, args.tren, args.n):
+            print(f"{s['id_anak']:<16} {s['umur_terakhir']:>4.0f} bln  {s['risiko']:<6} {s['tren']:<5} "
+                  f"Tinggi {s['b_tinggi']:.1f}%  ({s['n_kunjungan']} kunjungan)")
+    else:
+        for k in pelacak.riwayat(args.id_anak):
+            print(f"{k['umur_bulan']:>4.0f} bln  kunjungan Tinggi {k['p_tinggi']:5.1f}%  "
+                  f"-> terfilter Tinggi {k['f_tinggi']:5.1f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Pelatihan CPT dari data berlabel (kolom "Risiko Stunting") secara inkremental.
+
+Yang disimpan hanya statistik cukup (jumlah kemunculan):
+    n_penyakit [lingkungan, riwayat]
+    n_utama    [pola, riwayat, level stunting]
+    n_umur     [kategori umur, level stunting]
+sehingga data bulan baru cukup ditambahkan ke hitungan lama, tanpa membaca
+ulang seluruh riwayat registri.
+Tiap tabel hanya menghitung baris yang mengamati semua variabelnya (mis.
+umur kosong tidak masuk n_umur, riwayat kosong tidak masuk n_utama /
+n_penyakit).
+
+Estimasi tiap baris CPT = rata-rata posterior Dirichlet:
+    (hitungan + kekuatan_prior * baris_pakar_ternormalisasi + alpha) / total
+kekuatan_prior = bobot nilai pakar dalam "jumlah data semu", alpha = Laplace.
+
+Contoh:
+    python pelatih_cpt.py perbarui statistik_cpt.npz data_stunting.csv
+    python pelatih_cpt.py estimasi statistik_cpt.npz cpt/cpt_terlatih.json --kekuatan-prior 20
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+from model_stunting import (
+    BayesianNetworkStunting, KATEGORI_UMUR, LEVEL_STUNTING, LINGKUNGAN, POLA_MAKAN,
+    RIWAYAT_PENYAKIT, TabelCPT,
+)
+from skor_massal import siapkan_evidence
+
+_KODE_LEVEL = {v: i for i, v in enumerate(LEVEL_STUNTING)}
+
+
+class PelatihCPT:
+    def __init__(self):
+        self.n_penyakit = np.zeros((len(LINGKUNGAN), len(RIWAYAT_PENYAKIT)), dtype=np.int64)
+        self.n_utama = np.zeros((len(POLA_MAKAN), len(RIWAYAT_PENYAKIT), len(LEVEL_STUNTING)), dtype=np.int64)
+        self.n_umur = np.zeros((len(KATEGORI_UMUR), len(LEVEL_STUNTING)), dtype=np.int64)
+        self.n_baris = 0
+        self.n_dilewati = 0
+        self._model = BayesianNetworkStunting(compiled=False)
+
+    @classmethod
+    def muat(cls, path):
+        pelatih = cls()
+        if os.path.exists(path):
+            with np.load(path) as data:
+                pelatih.n_penyakit = data['n_penyakit'].copy()
+                pelatih.n_utama = data['n_utama'].copy()
+                pelatih.n_umur = data['n_umur'].copy()
+                pelatih.n_baris = int(data['n_baris'])
+                pelatih.n_dilewati = int(data['n_dilewati'])
+        return pelatih
+
+    def simpan(self, path):
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, n_penyakit=self.n_penyakit, n_utama=self.n_utama, n_umur=self.n_umur,
+                 n_baris=self.n_baris, n_dilewati=self.n_dilewati)
+        os.replace(tmp, path)
+
+    def perbarui(self, evidence, label):
+        # evidence: kolom seperti inferensi_batch, label: nilai LEVEL_STUNTING
+        umur, pola, riwayat, lingkungan = self._model.kodekan_batch(evidence)
+        stunting = pd.Series(label, dtype=object).map(_KODE_LEVEL).to_numpy()
+        kosong_umur, _, kosong_riwayat, _ = self._model.kosong_batch(evidence)
+
+        # Mask per faktor: tiap CPT hanya menghitung baris yang mengamati
+        # semua variabelnya. Umur kosong / di luar 18-36 bulan (kategori
+        # fallback) dan riwayat kosong tidak ikut dihitung.
+        umur_bulan = np.asarray(evidence['umur_bulan'], dtype=np.float64)
+        ada_umur = ~kosong_umur & (umur_bulan >= 18) & (umur_bulan <= 36)
+        ada_label = ~pd.isna(stunting)
+        ada_pola = pola < len(POLA_MAKAN)
+        ada_riwayat = ~kosong_riwayat
+        ada_lingkungan = lingkungan < len(LINGKUNGAN)
+        stunting = np.where(ada_label, stunting, 0).astype(np.intp)
+
+        valid_penyakit = ada_lingkungan & ada_riwayat
+        valid_utama = ada_pola & ada_riwayat & ada_label
+        valid_umur = ada_umur & ada_label
+
+        # Penjumlahan lewat bincount pada indeks datar (biaya O(baris baru))
+        self.n_penyakit += np.bincount(
+            np.ravel_multi_index((lingkungan[valid_penyakit], riwayat[valid_penyakit]), self.n_penyakit.shape),
+            minlength=self.n_penyakit.size).reshape(self.n_penyakit.shape)
+        self.n_utama += np.bincount(
+            np.ravel_multi_index((pola[valid_utama], riwayat[valid_utama], stunting[valid_utama]),
+                                 self.n_utama.shape),
+            minlength=self.n_utama.size).reshape(self.n_utama.shape)
+        self.n_umur += np.bincount(
+            np.ravel_multi_index((umur[valid_umur], stunting[valid_umur]), self.n_umur.shape),
+            minlength=self.n_umur.size).reshape(self.n_umur.shape)
+
+        # Baris terpakai = dihitung oleh minimal satu CPT
+        valid = valid_penyakit | valid_utama | valid_umur
+        n_valid = int(valid.sum())
+        self.n_baris += n_valid
+        self.n_dilewati += len(valid) - n_valid
+        return n_valid
+
+    def perbarui_dari_csv(self, path, chunksize=100_000):
+        n = 0
+        for chunk in pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str,
+                                 keep_default_na=False, chunksize=chunksize):
+            n += self.perbarui(siapkan_evidence(chunk), chunk['Risiko Stunting'].str.strip())
+        return n
+
+    def estimasi(self, prior=None, kekuatan_prior=20.0, alpha=1.0, versi=None):
+        prior = prior if prior is not None else TabelCPT.bawaan()
+
+        def posterior(hitungan, pakar):
+            pakar = pakar / pakar.sum(axis=-1, keepdims=True)
+            semu = hitungan + kekuatan_prior * pakar + alpha
+            return semu / semu.sum(axis=-1, keepdims=True)
+
+        return TabelCPT(
+            posterior(self.n_penyakit, prior.penyakit),
+            posterior(self.n_utama, prior.utama),
+            posterior(self.n_umur, prior.umur),
+            versi if versi is not None else prior.versi + 1,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pelatihan CPT inkremental dari data berlabel.")
+    sub = parser.add_subparsers(dest='perintah', required=True)
+
+    p_perbarui = sub.add_parser('perbarui', help="tambahkan hitungan dari file CSV baru")
+    p_perbarui.add_argument('statistik', help="file statistik .npz (dibuat jika belum ada)")
+    p_perbarui.add_argument('input', nargs='+', help="file CSV berformat data_stunting.csv")
+
+    p_estimasi = sub.add_parser('estimasi', help="tulis CPT hasil estimasi (.json / .npy)")
+    p_estimasi.add_argument('statistik')
+    p_estimasi.add_argument('output')
+    p_estimasi.add_argument('--prior', default=None, help="file CPT pakar (default: nilai bawaan)")
+    p_estimasi.add_argument('--kekuatan-prior', type=float, default=20.0)
+    p_estimasi.add_argument('--alpha', type=float, default=1.0, help="smoothing Laplace")
+    p_estimasi.add_argument('--versi', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    import penyimpanan_cpt
+
+    if args.perintah == 'perbarui':
+        pelatih = PelatihCPT.muat(args.statistik)
+        for path in args.input:
+            n = pelatih.perbarui_dari_csv(path)
+            print(f"{path}: {n} baris ditambahkan")
+        pelatih.simpan(args.statistik)
+        print(f"Total {pelatih.n_baris} baris ({pelatih.n_dilewati} dilewati) -> {args.statistik}")
+    else:
+        pelatih = PelatihCPT.muat(args.statistik)
+        prior = penyimpanan_cpt.muat(args.prior) if args.prior else None
+        cpt = pelatih.estimasi(prior, args.kekuatan_prior, args.alpha, args.versi)
+        if args.output.endswith('.npy'):
+            penyimpanan_cpt.simpan_npy(cpt, args.output)
+        else:
+            penyimpanan_cpt.simpan_json(cpt, args.output)
+        print(f"CPT versi {cpt.versi} dari {pelatih.n_baris} baris -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
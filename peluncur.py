@@ -0,0 +1,373 @@
+"""
+Peluncur multi-proses (pre-fork) untuk app.py.
+
+Proses induk memuat modul berat (streamlit, numpy, pandas, matplotlib,
+fpdf, laporan) dan membangun model beserta seluruh tabelnya (posterior,
+grid intervensi, tabel kontribusi, sampel CPT) satu kali, lalu gc.freeze()
+dan fork N worker Streamlit. Halaman memori hasil pra-muat dibagi
+copy-on-write oleh semua worker, sehingga tiap worker tambahan hanya
+menambah memori privatnya sendiri (sesi, cache).
+
+Setiap worker mendengarkan port sendiri (port, port+1, ...) di belakang
+load balancer. Load balancer harus sticky per sesi (websocket dan file
+media Streamlit disimpan per proses). Worker yang mati di-fork ulang
+dari induk (dengan jeda bertahap jika berulang kali gagal saat start).
+
+Endpoint status di proses induk (--port-status):
+    GET /health              200 jika semua worker sehat, selain itu 503
+    GET /workers             pid, port, uptime, restart, kesehatan
+                             (/_stcore/health worker) dan memori per worker
+                             (RSS, PSS, bersama, privat dari /proc/<pid>/smaps_rollup)
+    GET /metrics/prometheus  metrik yang sama dalam format teks Prometheus
+
+Laporan PDF dirender di thread worker (CARESTUNT_LAPORAN_MODE=thread,
+kecuali diatur lain) agar memakai modul yang sudah dibagi, bukan proses
+spawn baru per worker. Hanya untuk Linux/Unix (os.fork).
+
+Contoh:
+    python peluncur.py --worker 4 --port 8501 --host 0.0.0.0
+    python peluncur.py --worker 2 --cpt cpt/cpt_stunting.npy --port-status 8599
+    curl http://127.0.0.1:8599/workers
+"""
+
+import argparse
+import gc
+import json
+import os
+import signal
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Model yang dibangun induk sebelum fork (None jika app.py tidak lewat peluncur)
+_MODEL = None
+
+# Field /proc/<pid>/smaps_rollup (kB) yang dilaporkan
+_FIELD_MEMORI = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap')
+
+# Worker yang mati sebelum selang ini dianggap gagal start (jeda fork ulang bertambah)
+_MIN_HIDUP_DETIK = 10.0
+_MAKS_JEDA_DETIK = 30.0
+
+
+def model_pra_muat():
+    return _MODEL
+
+
+def pra_muat(path_cpt=None):
+    # Semua yang dibagi antar worker dibuat di sini, sebelum fork. GC
+    # dimatikan selama pra-muat lalu objeknya dibekukan, sehingga siklus GC
+    # di worker tidak menulis ke header objek bersama (halaman tetap dibagi).
+    global _MODEL
+    gc.disable()
+
+    import numpy  # noqa: F401  # type: ignore
+    import pandas  # noqa: F401  # type: ignore
+    import streamlit  # noqa: F401  # type: ignore
+    import streamlit.web.cli  # noqa: F401  # type: ignore
+
+    import laporan
+    laporan.muat_pyplot()
+    import antrian_laporan  # noqa: F401
+    import kubus_kohort  # noqa: F401
+    import pelacakan_anak  # noqa: F401
+    import riwayat_diagnosa  # noqa: F401
+    from model_stunting import BayesianNetworkStunting, EvidenceBalita
+
+    if path_cpt:
+        from penyimpanan_cpt import muat
+        model = BayesianNetworkStunting(cpt=muat(path_cpt))
+    else:
+        model = BayesianNetworkStunting()
+
+    # Tabel turunan dibangun per CPT saat pertama dipakai: picu semuanya
+    ev = EvidenceBalita.dari_label(24, 'Kurang', 'Sering Diare', 'Kurang')
+    hasil, _, penjelasan = model.inferensi_jelaskan(ev)
+    model.analisis_intervensi(ev, hanya_perbaikan=True)
+    ketidakpastian = model.interval_kredibel(ev)
+    model.inferensi_parsial(EvidenceBalita.dari_label(24, 'Kurang'))
+    # Font, backend Agg dan struktur FPDF (seperti pemanasan worker antrian_laporan)
+    laporan.generate_pdf("-", 0, hasil, 'Tinggi', None, ketidakpastian, penjelasan)
+
+    _MODEL = model
+    gc.collect()
+    gc.freeze()
+    return model
+
+
+def statistik_memori(pid):
+    # Memori proses (kB) atau None jika tidak tersedia. PSS membagi halaman
+    # bersama rata antar proses yang memakainya: jumlah PSS semua worker =
+    # memori sebenarnya yang terpakai.
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            baris = f.read().splitlines()
+    except OSError:
+        return None
+    nilai = {}
+    for b in baris:
+        bagian = b.split()
+        if len(bagian) >= 2 and bagian[0].rstrip(':') in _FIELD_MEMORI:
+            nilai[bagian[0].rstrip(':')] = int(bagian[1])
+    return {
+        'rss_kb': nilai.get('Rss', 0),
+        'pss_kb': nilai.get('Pss', 0),
+        'bersama_kb': nilai.get('Shared_Clean', 0) + nilai.get('Shared_Dirty', 0),
+        'privat_kb': nilai.get('Private_Clean', 0) + nilai.get('Private_Dirty', 0),
+        'swap_kb': nilai.get('Swap', 0),
+    }
+
+
+def cek_kesehatan(host, port, timeout=1.0):
+    # Endpoint kesehatan bawaan Streamlit, "ok" jika server siap
+    from urllib.request import urlopen
+    try:
+        with urlopen(f"http://{host}:{port}/_stcore/health", timeout=timeout) as r:
+            return r.status == 200 and r.read().strip() == b'ok'
+    except OSError:
+        return False
+
+
+class Worker:
+    def __init__(self, indeks, port):
+        self.indeks = indeks
+        self.port = port
+        self.pid = None
+        self.mulai = None
+        self.restart = 0
+        self.gagal_beruntun = 0
+        self.tunda_sampai = 0.0
+
+
+class PeluncurPraFork:
+    def __init__(self, app='app.py', n_worker=2, host='127.0.0.1', port=8501,
+                 host_status='127.0.0.1', port_status=8599, opsi_streamlit=(), batas_henti=10.0):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("peluncur pre-fork membutuhkan os.fork (Linux/Unix)")
+        # http.server baru diimpor di sini: app.py mengimpor modul ini di setiap worker
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        self.app = os.path.abspath(app)
+        self.host = host
+        self.host_cek = '127.0.0.1' if host in ('0.0.0.0', '') else host
+        self.opsi_streamlit = list(opsi_streamlit)
+        self.batas_henti = batas_henti
+        self.workers = [Worker(i, port + i) for i in range(n_worker)]
+        self.mulai = time.time()
+        self._berhenti = False
+
+        peluncur = self
+
+        class Penangan(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, data = peluncur.tangani(self.path.split('?', 1)[0])
+                if isinstance(data, str):
+                    isi, jenis = data.encode(), 'text/plain; version=0.0.4'
+                else:
+                    isi, jenis = json.dumps(data).encode(), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', jenis)
+                self.send_header('Content-Length', str(len(isi)))
+                self.end_headers()
+                self.wfile.write(isi)
+
+            def log_message(self, *args):
+                pass
+
+        # Satu thread: permintaan status dilayani di sela pemeriksaan worker,
+        # sehingga induk tidak pernah fork saat ada thread lain
+        self.server = HTTPServer((host_status, port_status), Penangan)
+        self.server.timeout = 0.5
+
+    # WORKER
+    def _fork(self, w):
+        pid = os.fork()
+        if pid:
+            w.pid, w.mulai = pid, time.monotonic()
+            return
+        # Proses anak
+        kode = 1
+        try:
+            self.server.socket.close()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            gc.enable()
+            os.environ['CARESTUNT_WORKER'] = str(w.indeks)
+            from streamlit.web import cli as stcli  # type: ignore
+            stcli.main(args=[
+                'run', self.app,
+                '--server.port', str(w.port), '--server.address', self.host,
+                '--server.headless', 'true', '--server.fileWatcherType', 'none',
+                '--browser.gatherUsageStats', 'false',
+                *self.opsi_streamlit,
+            ], prog_name='streamlit')
+            kode = 0
+        except SystemExit as e:
+            kode = e.code if isinstance(e.code, int) else 0
+        except BaseException as e:
+            print(f"Worker {w.indeks} berhenti karena galat: {e!r}", file=sys.stderr)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(kode)
+
+    def _periksa_worker(self):
+        # Kumpulkan worker yang mati, fork ulang setelah jedanya lewat
+        sekarang = time.monotonic()
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            for w in self.workers:
+                if w.pid == pid:
+                    umur = sekarang - w.mulai
+                    w.gagal_beruntun = w.gagal_beruntun + 1 if umur < _MIN_HIDUP_DETIK else 0
+                    w.tunda_sampai = sekarang + min(2 ** w.gagal_beruntun - 1, _MAKS_JEDA_DETIK)
+                    w.pid = None
+                    if not self._berhenti:
+                        print(f"Worker {w.indeks} (pid {pid}) berhenti dengan status "
+                              f"{os.waitstatus_to_exitcode(status)}, di-fork ulang", file=sys.stderr)
+        for w in self.workers:
+            if w.pid is None and not self._berhenti and sekarang >= w.tunda_sampai:
+                if w.mulai is not None:
+                    w.restart += 1
+                self._fork(w)
+
+    def _hentikan_worker(self):
+        hidup = [w.pid for w in self.workers if w.pid]
+        for pid in hidup:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        batas = time.monotonic() + self.batas_henti
+        while hidup and time.monotonic() < batas:
+            for pid in list(hidup):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        hidup.remove(pid)
+                except ChildProcessError:
+                    hidup.remove(pid)
+            time.sleep(0.1)
+        for pid in hidup:  # tidak berhenti dalam batas waktu
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+
+    # STATUS
+    def status_worker(self):
+        sekarang = time.monotonic()
+        hasil = []
+        for w in self.workers:
+            hidup = w.pid is not None
+            hasil.append({
+                'worker': w.indeks,
+                'pid': w.pid,
+                'port': w.port,
+                'sehat': hidup and cek_kesehatan(self.host_cek, w.port),
+                'uptime_detik': sekarang - w.mulai if hidup else 0.0,
+                'restart': w.restart,
+                'memori': statistik_memori(w.pid) if hidup else None,
+            })
+        return hasil
+
+    def tangani(self, path):
+        if path == '/health':
+            workers = self.status_worker()
+            n_sehat = sum(w['sehat'] for w in workers)
+            return (200 if n_sehat == len(workers) else 503), {
+                'status': 'ok' if n_sehat == len(workers) else 'terganggu',
+                'worker_sehat': n_sehat,
+                'worker_total': len(workers),
+            }
+        if path == '/workers':
+            workers = self.status_worker()
+            return 200, {
+                'induk': {'pid': os.getpid(), 'uptime_detik': time.time() - self.mulai,
+                          'memori': statistik_memori(os.getpid())},
+                'workers': workers,
+                'total_pss_kb': sum((w['memori'] or {}).get('pss_kb', 0) for w in workers)
+                + ((statistik_memori(os.getpid()) or {}).get('pss_kb', 0)),
+            }
+        if path == '/metrics/prometheus':
+            return 200, self.ke_prometheus()
+        return 404, {'error': f'path tidak dikenal: {path}'}
+
+    def ke_prometheus(self):
+        baris = [
+            "# HELP carestunt_worker_sehat Worker Streamlit menjawab /_stcore/health (1/0)",
+            "# TYPE carestunt_worker_sehat gauge",
+        ]
+        workers = self.status_worker()
+        for w in workers:
+            baris.append(f'carestunt_worker_sehat{{worker="{w["worker"]}",port="{w["port"]}"}} {int(w["sehat"])}')
+        baris += ["# HELP carestunt_worker_restart_total Jumlah fork ulang worker",
+                  "# TYPE carestunt_worker_restart_total counter"]
+        for w in workers:
+            baris.append(f'carestunt_worker_restart_total{{worker="{w["worker"]}"}} {w["restart"]}')
+        baris += ["# HELP carestunt_worker_uptime_detik Lama worker berjalan sejak fork terakhir",
+                  "# TYPE carestunt_worker_uptime_detik gauge"]
+        for w in workers:
+            baris.append(f'carestunt_worker_uptime_detik{{worker="{w["worker"]}"}} {w["uptime_detik"]:.1f}')
+        baris += ["# HELP carestunt_worker_memori_kb Memori proses dari smaps_rollup (kB)",
+                  "# TYPE carestunt_worker_memori_kb gauge"]
+        semua = [('induk', statistik_memori(os.getpid()))] + [(str(w['worker']), w['memori']) for w in workers]
+        for nama, memori in semua:
+            for jenis, nilai in (memori or {}).items():
+                baris.append(f'carestunt_worker_memori_kb{{worker="{nama}",jenis="{jenis[:-3]}"}} {nilai}')
+        return '\n'.join(baris) + '\n'
+
+    # LOOP UTAMA
+    def _sinyal_berhenti(self, signum, frame):
+        self._berhenti = True
+
+    def jalankan(self):
+        signal.signal(signal.SIGTERM, self._sinyal_berhenti)
+        signal.signal(signal.SIGINT, self._sinyal_berhenti)
+        host_status, port_status = self.server.server_address[:2]
+        print(f"Peluncur CareStunt: {len(self.workers)} worker di port "
+              f"{self.workers[0].port}-{self.workers[-1].port}, status di http://{host_status}:{port_status}")
+        try:
+            while not self._berhenti:
+                self._periksa_worker()
+                self.server.handle_request()
+        finally:
+            self._hentikan_worker()
+            self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan app.py sebagai beberapa worker Streamlit pre-fork.")
+    parser.add_argument('--worker', type=int, default=os.cpu_count() or 1, help="jumlah proses Streamlit")
+    parser.add_argument('--host', default='127.0.0.1', help="alamat server worker")
+    parser.add_argument('--port', type=int, default=8501, help="port worker pertama (worker ke-i: port + i)")
+    parser.add_argument('--host-status', default='127.0.0.1')
+    parser.add_argument('--port-status', type=int, default=8599, help="port endpoint status induk")
+    parser.add_argument('--cpt', default=None, help="file CPT (.json / .npy), dipantau tiap worker untuk hot reload")
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'))
+    parser.add_argument('opsi_streamlit', nargs=argparse.REMAINDER,
+                        help="opsi tambahan untuk streamlit run setelah --, mis. -- --server.maxUploadSize 50")
+    args = parser.parse_args(argv)
+
+    if args.cpt:
+        os.environ['CARESTUNT_CPT'] = args.cpt
+    os.environ.setdefault('CARESTUNT_LAPORAN_MODE', 'thread')
+    os.chdir(os.path.dirname(os.path.abspath(args.app)))  # app.py memuat CSS dengan path relatif
+
+    mulai = time.perf_counter()
+    pra_muat(os.environ.get('CARESTUNT_CPT'))
+    print(f"Pra-muat model & modul selesai dalam {time.perf_counter() - mulai:.1f} detik")
+
+    opsi = args.opsi_streamlit[1:] if args.opsi_streamlit[:1] == ['--'] else args.opsi_streamlit
+    PeluncurPraFork(args.app, args.worker, args.host, args.port, args.host_status,
+                    args.port_status, opsi).jalankan()
+    return 0
+
+
+if __name__ == '__main__':
+    # Lewat modul `peluncur` (bukan __main__) agar app.py yang mengimpor
+    # peluncur melihat model hasil pra-muat yang sama
+    import peluncur
+    sys.exit(peluncur.main())
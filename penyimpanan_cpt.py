@@ -0,0 +1,176 @@
+"""
+Penyimpanan CPT di luar kode, plus hot reload tanpa restart layanan.
+
+Format JSON (mudah diedit, contoh: cpt/cpt_stunting.json):
+    {"versi": 1,
+     "penyakit_given_lingkungan":   {"Baik": {"Tidak Ada": 0.85, ...}, ...},
+     "stunting_given_faktor_utama": {"Kurang": {"Sering Diare": {"Rendah": 0.0, ...}, ...}, ...},
+     "stunting_given_umur":         {"18-21": {"Rendah": 0.2, ...}, ...}}
+
+Format biner (.npy, satu array float64 1-D):
+    [FORMAT_BINER, versi, penyakit (3x4), utama (3x4x3), umur (5x3)]
+    Dibuka dengan np.load(mmap_mode='r'): semua proses worker di satu host
+    membaca halaman file yang sama lewat page cache, bukan salinan masing-masing.
+
+Penulisan selalu atomik (file sementara lalu os.replace), sehingga pembaca
+tidak pernah melihat file setengah jadi.
+
+Contoh:
+    python penyimpanan_cpt.py ekspor cpt/cpt_stunting.json
+    python penyimpanan_cpt.py kompilasi cpt/cpt_stunting.json cpt/cpt_stunting.npy
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import traceback
+
+import numpy as np  # type: ignore
+
+from model_stunting import POLA_MAKAN, TabelCPT
+
+FORMAT_BINER = 1
+_UKURAN = {nama: int(np.prod(bentuk)) for nama, bentuk in TabelCPT.BENTUK.items()}
+_PANJANG_BINER = 2 + sum(_UKURAN.values())
+
+
+def _tulis_atomik(path, tulis):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.cpt-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            tulis(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def ke_json_dict(cpt):
+    d = cpt.ke_dict()
+    utama = {p: {} for p in POLA_MAKAN}
+    for (p, r), baris in d['utama'].items():
+        utama[p][r] = baris
+    return {
+        'versi': cpt.versi,
+        'penyakit_given_lingkungan': d['penyakit'],
+        'stunting_given_faktor_utama': utama,
+        'stunting_given_umur': d['umur'],
+    }
+
+
+def dari_json_dict(data):
+    try:
+        utama = {(p, r): baris for p, isi in data['stunting_given_faktor_utama'].items()
+                 for r, baris in isi.items()}
+        return TabelCPT.dari_dict(
+            data['penyakit_given_lingkungan'], utama, data['stunting_given_umur'], data.get('versi', 1)
+        )
+    except (KeyError, AttributeError) as e:
+        raise ValueError(f"format JSON CPT tidak valid: {e}") from None
+
+
+def muat_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return dari_json_dict(json.load(f))
+
+
+def simpan_json(cpt, path):
+    isi = json.dumps(ke_json_dict(cpt), indent=2, ensure_ascii=False).encode('utf-8')
+    _tulis_atomik(path, lambda f: f.write(isi + b'\n'))
+
+
+def simpan_npy(cpt, path):
+    data = np.concatenate([
+        np.array([FORMAT_BINER, cpt.versi], dtype=np.float64),
+        cpt.penyakit.ravel(), cpt.utama.ravel(), cpt.umur.ravel(),
+    ])
+    _tulis_atomik(path, lambda f: np.save(f, data))
+
+
+def muat_npy(path):
+    # Array CPT yang dikembalikan adalah view ke memory-map (tanpa salinan)
+    data = np.load(path, mmap_mode='r')
+    if data.ndim != 1 or data.shape[0] != _PANJANG_BINER or data.dtype != np.float64:
+        raise ValueError(f"{path} bukan file CPT biner yang valid")
+    if int(data[0]) != FORMAT_BINER:
+        raise ValueError(f"format CPT biner {int(data[0])} tidak didukung")
+
+    bagian, awal = {}, 2
+    for nama, bentuk in TabelCPT.BENTUK.items():
+        bagian[nama] = data[awal:awal + _UKURAN[nama]].reshape(bentuk)
+        awal += _UKURAN[nama]
+    return TabelCPT(bagian['penyakit'], bagian['utama'], bagian['umur'], int(data[1]))
+
+
+def muat(path):
+    if str(path).endswith('.npy'):
+        return muat_npy(path)
+    return muat_json(path)
+
+
+class PengawasCPT(threading.Thread):
+    # Memantau file CPT (polling mtime/ukuran/inode) dan menukar CPT model
+    # begitu file berubah. File yang rusak dilaporkan, CPT lama tetap dipakai.
+    def __init__(self, path, model, interval=2.0):
+        super().__init__(name='pengawas-cpt', daemon=True)
+        self.path = path
+        self.model = model
+        self.interval = interval
+        self._berhenti = threading.Event()
+        self._tanda = self._tanda_file()
+
+    def _tanda_file(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def periksa(self):
+        tanda = self._tanda_file()
+        if tanda is None or tanda == self._tanda:
+            return False
+        self._tanda = tanda
+        try:
+            self.model.ganti_cpt(muat(self.path))
+        except Exception:
+            print(f"Gagal memuat ulang CPT dari {self.path}, CPT lama tetap dipakai:", file=sys.stderr)
+            traceback.print_exc()
+            return False
+        return True
+
+    def run(self):
+        while not self._berhenti.wait(self.interval):
+            self.periksa()
+
+    def berhenti(self):
+        self._berhenti.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor / kompilasi file CPT CareStunt.")
+    sub = parser.add_subparsers(dest='perintah', required=True)
+
+    p_ekspor = sub.add_parser('ekspor', help="tulis CPT pakar bawaan ke file JSON")
+    p_ekspor.add_argument('output')
+
+    p_kompilasi = sub.add_parser('kompilasi', help="JSON -> biner .npy (memory-map)")
+    p_kompilasi.add_argument('input')
+    p_kompilasi.add_argument('output')
+    args = parser.parse_args(argv)
+
+    if args.perintah == 'ekspor':
+        simpan_json(TabelCPT.bawaan(), args.output)
+    else:
+        simpan_npy(muat_json(args.input), args.output)
+    print(f"CPT ditulis ke {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
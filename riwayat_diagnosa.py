@@ -0,0 +1,201 @@
+"""
+Riwayat diagnosa CareStunt di SQLite (mode WAL).
+
+Setiap diagnosa dicatat lewat antrian: catat() langsung kembali, satu thread
+penulis mengumpulkan baris dan menulisnya per batch dalam satu transaksi,
+sehingga thread UI Streamlit tidak pernah menunggu disk.
+
+Pembacaan memakai keyset pagination (WHERE (waktu, id) < kursor), bukan
+OFFSET, sehingga halaman ke-1000 sama cepatnya dengan halaman pertama.
+Indeks: nama (tanpa beda huruf besar/kecil), waktu, dan risiko.
+
+Contoh:
+    python riwayat_diagnosa.py riwayat_diagnosa.db --nama Budi
+    python riwayat_diagnosa.py riwayat_diagnosa.db --risiko Tinggi --n 50
+"""
+
+import argparse
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from model_stunting import LEVEL_STUNTING
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS diagnosa (
+    id               INTEGER PRIMARY KEY,
+    waktu            TEXT    NOT NULL,
+    nama             TEXT    NOT NULL,
+    umur_bulan       REAL,
+    pola_makan       TEXT,
+    riwayat_penyakit TEXT,
+    lingkungan       TEXT,
+    p_rendah         REAL    NOT NULL,
+    p_sedang         REAL    NOT NULL,
+    p_tinggi         REAL    NOT NULL,
+    risiko           TEXT    NOT NULL,
+    versi_cpt        INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_diagnosa_nama   ON diagnosa (nama COLLATE NOCASE, waktu, id);
+CREATE INDEX IF NOT EXISTS idx_diagnosa_waktu  ON diagnosa (waktu, id);
+CREATE INDEX IF NOT EXISTS idx_diagnosa_risiko ON diagnosa (risiko, waktu, id);
+"""
+
+KOLOM = ('id', 'waktu', 'nama', 'umur_bulan', 'pola_makan', 'riwayat_penyakit', 'lingkungan',
+         'p_rendah', 'p_sedang', 'p_tinggi', 'risiko', 'versi_cpt')
+
+_SQL_TAMBAH = (
+    "INSERT INTO diagnosa (waktu, nama, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,"
+    " p_rendah, p_sedang, p_tinggi, risiko, versi_cpt) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SELESAI = object()
+
+
+def buka_koneksi(path):
+    kon = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    kon.execute("PRAGMA journal_mode=WAL")
+    kon.execute("PRAGMA synchronous=NORMAL")  # aman untuk WAL, fsync hanya saat checkpoint
+    return kon
+
+
+def waktu_sekarang():
+    # Teks ISO lokal, urutannya sama dengan urutan waktu
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class PenyimpanRiwayat:
+    def __init__(self, path, ukuran_batch=200, interval=0.5):
+        self.path = path
+        self.ukuran_batch = ukuran_batch
+        self.interval = interval
+        self._antrian = queue.Queue()
+        self._lokal = threading.local()
+
+        kon = buka_koneksi(path)
+        kon.executescript(SKEMA)
+        kon.close()
+
+        self._penulis = threading.Thread(target=self._jalankan_penulis, name='penulis-riwayat', daemon=True)
+        self._penulis.start()
+
+    # PENULISAN
+    def catat(self, nama, umur_bulan, pola_makan, riwayat_penyakit, lingkungan, hasil, risiko,
+              versi_cpt=None, waktu=None):
+        # hasil: dict posterior (persen) seperti keluaran model.inferensi
+        self._antrian.put((
+            waktu or waktu_sekarang(), nama, umur_bulan, pola_makan, riwayat_penyakit, lingkungan,
+            *(hasil[level] for level in LEVEL_STUNTING), risiko, versi_cpt,
+        ))
+
+    def _jalankan_penulis(self):
+        kon = buka_koneksi(self.path)
+        selesai = False
+        while not selesai:
+            baris = [self._antrian.get()]
+            batas_waktu = time.monotonic() + self.interval
+            # Kumpulkan baris lain sampai batch penuh / interval habis
+            while len(baris) < self.ukuran_batch:
+                sisa = batas_waktu - time.monotonic()
+                try:
+                    baris.append(self._antrian.get(timeout=max(sisa, 0)) if sisa > 0
+                                 else self._antrian.get_nowait())
+                except queue.Empty:
+                    break
+
+            data = [b for b in baris if b is not _SELESAI]
+            selesai = len(data) != len(baris)
+            try:
+                if data:
+                    with kon:
+                        kon.executemany(_SQL_TAMBAH, data)
+            except sqlite3.Error as e:
+                print(f"Gagal menulis {len(data)} riwayat diagnosa: {e}", file=sys.stderr)
+            finally:
+                for _ in baris:
+                    self._antrian.task_done()
+        kon.close()
+
+    def flush(self):
+        # Tunggu sampai semua catatan di antrian tertulis
+        self._antrian.join()
+
+    def tutup(self):
+        self._antrian.put(_SELESAI)
+        self._penulis.join()
+
+    # PEMBACAAN
+    def _koneksi_baca(self):
+        kon = getattr(self._lokal, 'kon', None)
+        if kon is None:
+            kon = self._lokal.kon = buka_koneksi(self.path)
+        return kon
+
+    def halaman(self, kursor=None, n=20, nama=None, risiko=None, dari=None, sampai=None):
+        # Satu halaman riwayat, terbaru dulu. kursor = (waktu, id) baris
+        # terakhir halaman sebelumnya. Hasil: (list dict, kursor berikutnya / None)
+        syarat, param = [], []
+        if nama:
+            syarat.append("nama = ? COLLATE NOCASE")
+            param.append(nama)
+        if risiko:
+            syarat.append("risiko = ?")
+            param.append(risiko)
+        if dari:
+            syarat.append("waktu >= ?")
+            param.append(dari)
+        if sampai:
+            syarat.append("waktu < ?")
+            param.append(sampai)
+        if kursor is not None:
+            syarat.append("(waktu, id) < (?, ?)")
+            param.extend(kursor)
+
+        sql = f"SELECT {', '.join(KOLOM)} FROM diagnosa"
+        if syarat:
+            sql += " WHERE " + " AND ".join(syarat)
+        sql += " ORDER BY waktu DESC, id DESC LIMIT ?"
+        baris = self._koneksi_baca().execute(sql, param + [n + 1]).fetchall()
+
+        berikutnya = None
+        if len(baris) > n:
+            baris = baris[:n]
+            berikutnya = (baris[-1][1], baris[-1][0])
+        return [dict(zip(KOLOM, b)) for b in baris], berikutnya
+
+    def tren(self, nama, batas=500):
+        # Riwayat satu balita, urut waktu (lama -> baru), untuk grafik tren
+        baris = self._koneksi_baca().execute(
+            f"SELECT {', '.join(KOLOM)} FROM diagnosa WHERE nama = ? COLLATE NOCASE"
+            f" ORDER BY waktu DESC, id DESC LIMIT ?",
+            (nama, batas),
+        ).fetchall()
+        return [dict(zip(KOLOM, b)) for b in reversed(baris)]
+
+    def jumlah(self):
+        return self._koneksi_baca().execute("SELECT COUNT(*) FROM diagnosa").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tampilkan riwayat diagnosa CareStunt.")
+    parser.add_argument('db', help="file SQLite riwayat")
+    parser.add_argument('--nama', default=None)
+    parser.add_argument('--risiko', choices=LEVEL_STUNTING, default=None)
+    parser.add_argument('--n', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    riwayat = PenyimpanRiwayat(args.db)
+    mulai = time.perf_counter()
+    baris, _ = riwayat.halaman(n=args.n, nama=args.nama, risiko=args.risiko)
+    durasi = (time.perf_counter() - mulai) * 1000
+    for b in baris:
+        print(f"{b['waktu']}  {b['nama']:<20} {b['umur_bulan'] or '-':>4} bln  "
+              f"{b['risiko']:<6} (Tinggi {b['p_tinggi']:.1f}%)")
+    print(f"{len(baris)} baris dalam {durasi:.1f} ms")
+    riwayat.tutup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Skoring massal file registri berformat data_stunting.csv.
+
+File dibaca per chunk (memori tetap walau jutaan baris), setiap chunk
+dihitung dengan BayesianNetworkStunting.inferensi_batch lalu langsung
+ditulis ke file keluaran CSV atau Parquet. Umur (dan kolom terstruktur yang
+kosong) diambil dari kolom "Data Teks" lewat ekstraktor_teks; evidence yang
+tetap kosong dimarginalkan (seperti inferensi_parsial), bukan diisi nilai
+fallback.
+
+Contoh:
+    python skor_massal.py data_stunting.csv hasil_skor.csv
+    python skor_massal.py registri_kabupaten.csv hasil.parquet --chunksize 200000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+from ekstraktor_teks import ekstrak_batch
+from model_stunting import BayesianNetworkStunting, LEVEL_STUNTING, kanonik
+
+KOLOM_WAJIB = ['ID', 'Data Teks']
+# Kolom terstruktur; jika tidak ada / kosong, nilai diambil dari petunjuk di "Data Teks"
+KOLOM_STRUKTUR = {
+    'pola_makan': 'Pola Makan',
+    'riwayat_penyakit': 'Riwayat Penyakit',
+    'lingkungan': 'Lingkungan',
+}
+
+
+def siapkan_evidence(chunk):
+    dari_teks = ekstrak_batch(chunk['Data Teks'])
+    evidence = pd.DataFrame({'umur_bulan': dari_teks['umur_bulan']})
+    for kolom, nama in KOLOM_STRUKTUR.items():
+        if nama not in chunk:
+            evidence[kolom] = dari_teks[kolom]
+            continue
+        # Varian label dataset ('Bersih', 'Tidak Bersih', ...) -> label model,
+        # satu kali per nilai unik
+        nilai = chunk[nama].str.strip()
+        unik = nilai.unique()
+        nilai = nilai.map(dict(zip(unik, (kanonik(kolom, u) for u in unik))))
+        evidence[kolom] = nilai.mask(nilai == '', dari_teks[kolom])
+    return evidence
+
+
+def skor_chunk(model, chunk):
+    evidence = siapkan_evidence(chunk)
+    probs, kategori = model.inferensi_batch(evidence, marginalkan_kosong=True)
+
+    hasil = pd.DataFrame({
+        'ID': chunk['ID'].to_numpy(),
+        'Umur Bulan': evidence['umur_bulan'].to_numpy(),
+        'Kategori Umur': kategori,
+    })
+    for j, level in enumerate(LEVEL_STUNTING):
+        hasil[level] = probs[:, j]
+    hasil['Risiko Prediksi'] = np.array(LEVEL_STUNTING, dtype=object)[probs.argmax(axis=1)]
+    if 'Risiko Stunting' in chunk:
+        hasil['Risiko Stunting'] = chunk['Risiko Stunting'].to_numpy()
+    return hasil
+
+
+class PenulisCSV:
+    def __init__(self, path):
+        self.path = path
+        self._header = True
+
+    def tulis(self, df):
+        df.to_csv(self.path, sep=';', index=False, header=self._header,
+                  mode='w' if self._header else 'a')
+        self._header = False
+
+    def tutup(self):
+        pass
+
+
+class PenulisParquet:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa  # type: ignore
+            import pyarrow.parquet as pq  # type: ignore
+        except ImportError:
+            raise SystemExit("Output Parquet membutuhkan paket 'pyarrow' (pip install pyarrow).")
+        self._pa = pa
+        self._pq = pq
+        self.path = path
+        self._writer = None
+
+    def tulis(self, df):
+        if self._writer is None:
+            tabel = self._pa.Table.from_pandas(df, preserve_index=False)
+            self._writer = self._pq.ParquetWriter(self.path, tabel.schema)
+        else:
+            tabel = self._pa.Table.from_pandas(df, preserve_index=False, schema=self._writer.schema)
+        self._writer.write_table(tabel)
+
+    def tutup(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def buat_penulis(path, format_keluaran=None):
+    format_keluaran = format_keluaran or ('parquet' if str(path).endswith('.parquet') else 'csv')
+    if format_keluaran == 'parquet':
+        return PenulisParquet(path)
+    return PenulisCSV(path)
+
+
+def skor_file(path_input, path_output, chunksize=100_000, format_keluaran=None, model=None):
+    model = model or BayesianNetworkStunting()
+    penulis = buat_penulis(path_output, format_keluaran)
+
+    reader = pd.read_csv(
+        path_input,
+        sep=';',
+        encoding='utf-8-sig',
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunksize,
+    )
+
+    n_baris = 0
+    mulai = time.perf_counter()
+    try:
+        for chunk in reader:
+            kurang = [k for k in KOLOM_WAJIB if k not in chunk.columns]
+            if kurang:
+                raise ValueError(f"Kolom tidak ditemukan di {path_input}: {', '.join(kurang)}")
+            penulis.tulis(skor_chunk(model, chunk))
+            n_baris += len(chunk)
+    finally:
+        penulis.tutup()
+    durasi = time.perf_counter() - mulai
+
+    return n_baris, durasi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skoring massal risiko stunting dari file registri CSV.")
+    parser.add_argument('input', help="file CSV berformat data_stunting.csv (pemisah ';')")
+    parser.add_argument('output', help="file hasil (.csv atau .parquet)")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="jumlah baris per chunk")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help="format keluaran (default: dari ekstensi file output)")
+    args = parser.parse_args(argv)
+
+    n_baris, durasi = skor_file(args.input, args.output, args.chunksize, args.format)
+    kecepatan = n_baris / durasi if durasi > 0 else float('inf')
+    print(f"{n_baris} baris diskor dalam {durasi:.2f} detik ({kecepatan:,.0f} baris/detik) -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())